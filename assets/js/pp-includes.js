@@ -32,23 +32,28 @@
     }
   }
 
-  async function loadIncludes() {
-    const slots = Array.from(document.querySelectorAll('[data-pp-include]'));
-    for (const slot of slots) {
-      const url = slot.getAttribute('data-pp-include');
-      if (!url || slot.dataset.ppLoaded === '1') continue;
-      slot.dataset.ppLoaded = '1';
-      try {
-        slot.innerHTML = await fetchText(url);
-        executeScripts(slot);
-      } catch (error) {
-        slot.className = 'pp-include-error';
-        slot.textContent = error.message;
-        console.warn(error.message);
-      }
+  async function loadSlot(slot) {
+    const url = slot.getAttribute('data-pp-include');
+    slot.dataset.ppLoaded = '1';
+    try {
+      slot.innerHTML = await fetchText(url);
+      executeScripts(slot);
+    } catch (error) {
+      slot.className = 'pp-include-error';
+      slot.textContent = error.message;
+      console.warn(error.message);
     }
   }
 
+  function loadIncludes() {
+    // Built pages already carry their partials (sitebuild/includes.py marks
+    // them data-pp-loaded="1"); only fetch what the build step missed, all at once.
+    const slots = Array.from(document.querySelectorAll('[data-pp-include]')).filter(
+      (slot) => slot.getAttribute('data-pp-include') && slot.dataset.ppLoaded !== '1'
+    );
+    return Promise.all(slots.map(loadSlot));
+  }
+
   loadHeadsection();
   if (document.readyState === 'loading') {
     document.addEventListener('DOMContentLoaded', loadIncludes);
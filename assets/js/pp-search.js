@@ -0,0 +1,115 @@
+(function () {
+  'use strict';
+
+  // Reads the index written by sitebuild/search.py. Only docs.json and the
+  // shards for the query's terms are fetched, and each is fetched once.
+  // A shard that is missing just has no hits; a missing docs.json means
+  // there is no index at all.
+  const BASE = '/assets/search/';
+  const PREFIX_LEN = 2;
+  const K1 = 1.2;
+  const B = 0.75;
+
+  const cache = new Map();
+
+  function fetchJson(url) {
+    if (!cache.has(url)) {
+      cache.set(url, fetch(url).then((response) => (response.ok ? response.json() : null)).catch(() => null));
+    }
+    return cache.get(url);
+  }
+
+  function loadIndex() {
+    return fetchJson(BASE + 'docs.json').then((meta) => (meta && meta.docs ? meta : null));
+  }
+
+  // Same rules as tokenize() in nlp/cosine.py.
+  function tokenize(text) {
+    return text
+      .toLowerCase()
+      .replace(/[^a-z0-9\s\u0900-\u097F]/g, ' ')
+      .split(/\s+/)
+      .filter((token) => token.length >= 2);
+  }
+
+  // Must match shard_key() in sitebuild/search.py.
+  function shardKey(term) {
+    return Array.from(term.slice(0, PREFIX_LEN))
+      .map((ch) => (ch.charCodeAt(0) < 128 ? ch : 'u' + ch.charCodeAt(0).toString(16)))
+      .join('');
+  }
+
+  // Resolves to null when the index cannot be loaded.
+  async function search(query, limit = 10) {
+    const meta = await loadIndex();
+    if (!meta) return null;
+    const terms = Array.from(new Set(tokenize(query)));
+    if (!terms.length) return [];
+
+    const shards = await Promise.all(
+      terms.map((term) => fetchJson(BASE + 'shards/' + shardKey(term) + '.json'))
+    );
+
+    // BM25 over the postings [docId, tf, docId, tf, ...]
+    const scores = new Map();
+    terms.forEach((term, i) => {
+      const postings = (shards[i] || {})[term];
+      if (!postings) return;
+      const df = postings.length / 2;
+      const idf = Math.log(1 + (meta.n - df + 0.5) / (df + 0.5));
+      for (let p = 0; p < postings.length; p += 2) {
+        const doc = postings[p];
+        const tf = postings[p + 1];
+        const length = meta.docs[doc][2];
+        const score = (idf * tf * (K1 + 1)) / (tf + K1 * (1 - B + (B * length) / meta.avgdl));
+        scores.set(doc, (scores.get(doc) || 0) + score);
+      }
+    });
+
+    return Array.from(scores.entries())
+      .sort((a, b) => b[1] - a[1])
+      .slice(0, limit)
+      .map(([doc, score]) => ({ url: meta.docs[doc][0], title: meta.docs[doc][1], score }));
+  }
+
+  // <input data-pp-search="#results"> renders hits into the element it names.
+  // A surrounding [data-pp-search-section] stays hidden unless the index
+  // loads, so without one the page looks and works as it did before.
+  async function bindInputs() {
+    const inputs = document.querySelectorAll('input[data-pp-search]');
+    if (!inputs.length || !(await loadIndex())) return;
+    for (const input of inputs) {
+      const output = document.querySelector(input.getAttribute('data-pp-search'));
+      if (!output) continue;
+      const section = input.closest('[data-pp-search-section]');
+      if (section) section.hidden = false;
+      let timer = null;
+      let latest = 0;
+      input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(async () => {
+          // A slow shard fetch must not overwrite the hits of a newer query.
+          const request = ++latest;
+          const hits = (await search(input.value)) || [];
+          if (request !== latest) return;
+          output.innerHTML = '';
+          for (const hit of hits) {
+            const link = document.createElement('a');
+            link.href = hit.url;
+            link.textContent = hit.title;
+            const item = document.createElement('li');
+            item.appendChild(link);
+            output.appendChild(item);
+          }
+        }, 150);
+      });
+    }
+  }
+
+  window.ppSearch = search;
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', bindInputs);
+  } else {
+    bindInputs();
+  }
+})();
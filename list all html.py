@@ -1,10 +1,7 @@
-import os
+# Superseded by the cached indexer in sitebuild/; kept so the old habit still works.
+# Writes sitemap.xml as UTF-8 (pass --list to print the page URLs instead).
+import sys
 
-BASE = "https://aiml.learnwithchampak.live"
+from sitebuild.sitemap import main
 
-for root, dirs, files in os.walk("."):
-    for file in files:
-        if file.endswith(".html"):
-            path = os.path.join(root, file).replace("\\", "/")
-            url = BASE + "/" + path.lstrip("./")
-            print(url)
\ No newline at end of file
+sys.exit(main(sys.argv[1:]))
@@ -7,7 +7,7 @@ def tokenize(text: str):
     We keep letters+numbers. (Simple tokenizer)
     """
     text = text.lower()
-    text = re.sub(r"[^a-z0-9\\s\\u0900-\\u097F]", " ", text)  # keep English + Devanagari
+    text = re.sub(r"[^a-z0-9\s\u0900-\u097F]", " ", text)  # keep English + Devanagari
     tokens = [t for t in text.split() if t]
     return tokens
 
@@ -35,37 +35,38 @@ def cosine_similarity(a, b):
         return 0.0
     return dot(a, b) / denom
 
-S1="Piyush kidnapped Avinash"
-S2="Avinash was kidnapped by Piyush"
-t1 = tokenize(S1)
-t2 = tokenize(S2)
-vocab = make_vocab(t1, t2)
-A = vectorize(t1, vocab)
-B = vectorize(t2, vocab)
-score = cosine_similarity(A, B)
+if __name__ == "__main__":
+    S1="Piyush kidnapped Avinash"
+    S2="Avinash was kidnapped by Piyush"
+    t1 = tokenize(S1)
+    t2 = tokenize(S2)
+    vocab = make_vocab(t1, t2)
+    A = vectorize(t1, vocab)
+    B = vectorize(t2, vocab)
+    score = cosine_similarity(A, B)
 
-label = ("✅ Very similar" if score > 0.8 else
-         "🙂 Moderately similar" if score > 0.5 else
-         "😕 Not similar")
+    label = ("✅ Very similar" if score > 0.8 else
+             "🙂 Moderately similar" if score > 0.5 else
+             "😕 Not similar")
 
-report = []
-report.append("STEP 1) Tokens")
-report.append(f"  S1 tokens: {t1}")
-report.append(f"  S2 tokens: {t2}\\n")
+    report = []
+    report.append("STEP 1) Tokens")
+    report.append(f"  S1 tokens: {t1}")
+    report.append(f"  S2 tokens: {t2}\\n")
 
-report.append("STEP 2) Vocabulary (unique words)")
-report.append(f"  V = {vocab}\\n")
+    report.append("STEP 2) Vocabulary (unique words)")
+    report.append(f"  V = {vocab}\\n")
 
-report.append("STEP 3) Count vectors (aligned to V)")
-report.append(f"  A = {A}")
-report.append(f"  B = {B}\\n")
+    report.append("STEP 3) Count vectors (aligned to V)")
+    report.append(f"  A = {A}")
+    report.append(f"  B = {B}\\n")
 
-report.append("STEP 4) Dot product and magnitudes")
-report.append(f"  A·B = {dot(A,B)}")
-report.append(f"  ||A|| = {magnitude(A):.4f}")
-report.append(f"  ||B|| = {magnitude(B):.4f}\\n")
+    report.append("STEP 4) Dot product and magnitudes")
+    report.append(f"  A·B = {dot(A,B)}")
+    report.append(f"  ||A|| = {magnitude(A):.4f}")
+    report.append(f"  ||B|| = {magnitude(B):.4f}\\n")
 
-report.append("STEP 5) Cosine Similarity")
-report.append(f"  score = {score:.4f}  {label}")
+    report.append("STEP 5) Cosine Similarity")
+    report.append(f"  score = {score:.4f}  {label}")
 
-print(report)
\ No newline at end of file
+    print(report)
@@ -1,7 +1,7 @@
 (function () {
   async function includePartial(node) {
     const url = node.getAttribute('data-pp-include');
-    if (!url) return;
+    if (!url || node.dataset.ppLoaded === '1') return;
     try {
       const res = await fetch(url, { cache: 'no-cache' });
       if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
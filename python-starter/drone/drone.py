@@ -1,11 +1,27 @@
 import math
 import time
 import tkinter as tk
-from dataclasses import dataclass, field
-
-
-W, H = 980, 640
-ARENA_PAD = 20
+from tkinter import filedialog
+
+from drone_engine import (ARENA_PAD, DEFAULT_SCRIPT, DT, H, W, DroneEngine,
+                          deg_to_rad, generate_obstacles)
+
+# Swarm mode needs NumPy; the single drone simulator does not.
+try:
+    import numpy as np
+    from drone_swarm import SwarmEngine
+except ImportError:
+    SwarmEngine = None
+
+# At most this many steps are caught up in one frame after a stall, so
+# the window stays responsive instead of replaying seconds of backlog.
+MAX_STEPS_PER_FRAME = 30
+# Obstacles in a random arena (G key).
+RANDOM_ARENA_OBSTACLES = 1500
+# Drones in swarm mode (S key), and obstacles in its random arena: the
+# single drone's arena leaves room for only a few dozen of them.
+SWARM_DRONES = 300
+SWARM_ARENA_OBSTACLES = 60
 
 BG = "#fff7e6"
 CARD = "#ffffff"
@@ -16,59 +32,29 @@ BRAND2 = "#f59e0b"
 BORDER = "#eadcc5"
 OK = "#166534"
 DANGER = "#b91c1c"
-
-
-def clamp(v, a, b):
-    return max(a, min(b, v))
-
-
-def deg_to_rad(d):
-    return d * math.pi / 180.0
-
-
-def rad_to_deg(r):
-    return r * 180.0 / math.pi
-
-
-@dataclass
-class Drone:
-    x: float = 180.0
-    y: float = 300.0
-    heading_deg: float = 0.0     # 0 = east, 90 = north
-    speed: float = 120.0         # px per second (forward motion)
-    turn_speed: float = 120.0    # deg per second
-    altitude: float = 0.0        # "virtual altitude"
-    flying: bool = False
-    battery: float = 100.0       # %
-    home: tuple = (180.0, 300.0)
-    path: list = field(default_factory=list)
-
-    def reset(self):
-        self.x, self.y = self.home
-        self.heading_deg = 0.0
-        self.altitude = 0.0
-        self.flying = False
-        self.battery = 100.0
-        self.path = [(self.x, self.y)]
+# Swarm drone fill by state: ground, flying, ground and too close, flying and too close.
+SWARM_COLOURS = (MUTED, BRAND, DANGER, DANGER)
 
 
 class Simulator:
+    """Tk front end: forwards input to a DroneEngine and draws its state."""
+
     def __init__(self, root: tk.Tk):
         self.root = root
         root.title("Drone Programming Simulator — Python (Tkinter)")
 
-        self.drone = Drone()
-        self.drone.path = [(self.drone.x, self.drone.y)]
+        self.engine = DroneEngine()
+        self.drone = self.engine.drone
+        self.arena_seed = 0
+        # Swarm mode swaps in a SwarmEngine; keys and buttons drive
+        # whichever of the two is current.
+        self.swarm = None
+        self.current = self.engine
 
-        self.running = False
-        self.last_t = time.time()
-
-        self.obstacles = [
-            # rectangles: (x1,y1,x2,y2)
-            (420, 140, 580, 240),
-            (700, 360, 880, 500),
-            (330, 420, 520, 560),
-        ]
+        self.last_t = time.perf_counter()
+        self.lag = 0.0
+        self.shown_message = None
+        self.shown_hud = None
 
         # UI layout
         self.frame = tk.Frame(root, bg=BG)
@@ -89,20 +75,21 @@ class Simulator:
         self.make_panel()
 
         # Bindings
-        root.bind("<space>", lambda e: self.toggle_run())
-        root.bind("<Escape>", lambda e: self.stop())
+        root.bind("<space>", lambda e: self.current.toggle_run())
+        root.bind("<Escape>", lambda e: self.current.stop())
         root.bind("r", lambda e: self.reset())
-        root.bind("t", lambda e: self.takeoff())
-        root.bind("l", lambda e: self.land())
-        root.bind("h", lambda e: self.return_home())
+        root.bind("t", lambda e: self.current.takeoff())
+        root.bind("l", lambda e: self.current.land())
+        root.bind("h", lambda e: self.current.return_home())
+        root.bind("g", lambda e: self.random_arena())
+        root.bind("s", lambda e: self.toggle_swarm())
 
-        # Script queue (each item is a generator step)
-        self.command_queue = []
-        self.status(
+        self.engine.status(
             "Ready. Space = Run/Pause • T=Takeoff • L=Land • R=Reset • H=Home • Esc=Stop")
 
         self.draw_static()
-        self.redraw()
+        self.create_drone_items()
+        self.render()
 
         self.tick()
 
@@ -134,7 +121,8 @@ class Simulator:
                              font=("Segoe UI", 10, "bold"), cursor="hand2")
 
         b("Run Script", self.run_script).pack(side="left", padx=(0, 8))
-        b("Run/Pause (Space)", self.toggle_run, col=BRAND).pack(side="left")
+        b("Run/Pause (Space)", lambda: self.current.toggle_run(), col=BRAND).pack(side="left", padx=(0, 8))
+        b("Export Path", self.export_path, col=BRAND).pack(side="left")
 
         btns2 = tk.Frame(self.right, bg=BG)
         btns2.pack(fill="x", pady=(0, 10))
@@ -143,9 +131,9 @@ class Simulator:
                                             bg="#ffffff", fg=BRAND, activebackground="#fff2d6",
                                             font=("Segoe UI", 10, "bold"), cursor="hand2",
                                             highlightthickness=1, highlightbackground=BORDER)
-        b2("Takeoff (T)", self.takeoff).pack(side="left", padx=(0, 8))
-        b2("Land (L)", self.land).pack(side="left", padx=(0, 8))
-        b2("Home (H)", self.return_home).pack(side="left", padx=(0, 8))
+        b2("Takeoff (T)", lambda: self.current.takeoff()).pack(side="left", padx=(0, 8))
+        b2("Land (L)", lambda: self.current.land()).pack(side="left", padx=(0, 8))
+        b2("Home (H)", lambda: self.current.return_home()).pack(side="left", padx=(0, 8))
         b2("Reset (R)", self.reset).pack(side="left")
 
         # HUD / status
@@ -163,11 +151,14 @@ class Simulator:
                 "  Space: Run/Pause\n"
                 "  T: Takeoff   L: Land\n"
                 "  H: Return Home\n"
-                "  R: Reset     Esc: Stop\n\n"
+                "  R: Reset     Esc: Stop\n"
+                "  G: Random arena\n"
+                "  S: Swarm mode on/off\n\n"
                 "Mission tips:\n"
                 "  MOVE uses current heading\n"
                 "  TURN positive=left, negative=right\n"
                 "  GOTO x y goes to coordinate\n"
+                "  Swarm: a --- line starts the next team's script\n"
             ),
             bg="#fff2d6", fg=INK, justify="left", padx=10, pady=10,
             highlightthickness=1, highlightbackground=BORDER
@@ -175,21 +166,7 @@ class Simulator:
         help_box.pack(fill="x", pady=(10, 0))
 
     def default_script(self):
-        return (
-            "TAKEOFF\n"
-            "SETSPEED 140\n"
-            "MOVE 160\n"
-            "TURN 90\n"
-            "MOVE 90\n"
-            "TURN -45\n"
-            "MOVE 140\n"
-            "WAIT 0.4\n"
-            "HOME\n"
-            "LAND\n"
-        )
-
-    def status(self, msg):
-        self.status_label.config(text=msg)
+        return DEFAULT_SCRIPT
 
     # ---------- Drawing ----------
     def draw_static(self):
@@ -202,11 +179,13 @@ class Simulator:
         )
 
         # Obstacles
-        for (x1, y1, x2, y2) in self.obstacles:
+        for (x1, y1, x2, y2) in self.engine.obstacles:
             self.canvas.create_rectangle(
                 x1, y1, x2, y2, fill="#fff2d6", outline=BORDER, width=2, tags=("static",))
-            self.canvas.create_text((x1+x2)/2, (y1+y2)/2, text="OBSTACLE",
-                                    fill=MUTED, font=("Segoe UI", 9, "bold"), tags=("static",))
+            # only label the ones big enough to hold the text
+            if x2 - x1 >= 80:
+                self.canvas.create_text((x1+x2)/2, (y1+y2)/2, text="OBSTACLE",
+                                        fill=MUTED, font=("Segoe UI", 9, "bold"), tags=("static",))
 
         # Home marker
         hx, hy = self.drone.home
@@ -215,289 +194,189 @@ class Simulator:
         self.canvas.create_text(
             hx+36, hy, text="HOME", fill=OK, font=("Segoe UI", 10, "bold"), tags=("static",))
 
-    def redraw(self):
-        self.canvas.delete("dyn")
+        # Keep the arena under the path and drone when it is redrawn.
+        self.canvas.tag_lower("static")
+
+    def render(self):
+        """Draw the engine's current state; called once per frame."""
+        if self.current.message != self.shown_message:
+            self.shown_message = self.current.message
+            self.status_label.config(text=self.shown_message)
+        hud = self.swarm_hud_text() if self.swarm else self.hud_text()
+        if hud != self.shown_hud:
+            self.shown_hud = hud
+            self.hud.config(text=hud)
+        if self.swarm:
+            self.redraw_swarm()
+        else:
+            self.redraw()
+
+    def create_drone_items(self):
+        # Created once and then moved with coords(); new path pieces are
+        # slipped in below the body so it stays on top.
+        self.body = self.canvas.create_oval(
+            0, 0, 0, 0, fill=BRAND, outline="", tags=("dyn",))
+        self.arrow = self.canvas.create_line(
+            0, 0, 0, 0, fill="white", width=3, arrow="last", tags=("dyn",))
+        self.label = self.canvas.create_text(
+            0, 0, font=("Segoe UI", 10, "bold"), tags=("dyn",))
+        self.label_flying = None
+        self.tail_line = None
+        self.drawn_path = None
+        self.drawn_version = None
+        self.drawn_coords = 0
 
-        # Path
-        if len(self.drone.path) > 1:
-            for i in range(1, len(self.drone.path)):
-                x1, y1 = self.drone.path[i-1]
-                x2, y2 = self.drone.path[i]
-                self.canvas.create_line(
-                    x1, y1, x2, y2, fill=BRAND2, width=2, tags=("dyn",))
+    def redraw(self):
+        # Path: the simplified polyline from Trajectory. Committed vertices
+        # only ever grow, so just the new ones are drawn, as one line
+        # joined to the previous piece; the short moving tail is a single
+        # line whose coords are replaced each frame.
+        path = self.drone.path
+        if path is not self.drawn_path or path.version != self.drawn_version:
+            self.canvas.delete("path")
+            self.drawn_path = path
+            self.drawn_version = path.version
+            self.drawn_coords = 0
+            self.tail_line = self.canvas.create_line(
+                0, 0, 0, 0, fill=BRAND2, width=2, tags=("dyn", "path"))
+            self.canvas.tag_lower(self.tail_line, self.body)
+
+        committed = path.committed()
+        if len(committed) > max(2, self.drawn_coords):
+            start = max(0, self.drawn_coords - 2)
+            line = self.canvas.create_line(
+                *committed[start:], fill=BRAND2, width=2, tags=("dyn", "path"))
+            self.canvas.tag_lower(line, self.body)
+            self.drawn_coords = len(committed)
+
+        tail = path.tail()
+        if len(tail) >= 4:
+            self.canvas.coords(self.tail_line, *tail)
 
         # Drone body
         x, y = self.drone.x, self.drone.y
         r = 14 if self.drone.flying else 12
-        self.canvas.create_oval(
-            x-r, y-r, x+r, y+r, fill=BRAND, outline="", tags=("dyn",))
+        self.canvas.coords(self.body, x-r, y-r, x+r, y+r)
 
         # Heading arrow
         ang = deg_to_rad(self.drone.heading_deg)
         # screen y grows down, so use -sin for "up"
         ax = x + math.cos(ang) * 24
         ay = y - math.sin(ang) * 24
-        self.canvas.create_line(
-            x, y, ax, ay, fill="white", width=3, arrow="last", tags=("dyn",))
+        self.canvas.coords(self.arrow, x, y, ax, ay)
 
         # Drone label
-        self.canvas.create_text(x, y-26, text="DRONE" if self.drone.flying else "DRONE (GROUND)",
-                                fill=INK if self.drone.flying else MUTED, font=("Segoe UI", 10, "bold"), tags=("dyn",))
-
-    # ---------- Physics / Safety ----------
-    def in_bounds(self, x, y):
-        return (ARENA_PAD+10) <= x <= (W-ARENA_PAD-10) and (ARENA_PAD+10) <= y <= (H-ARENA_PAD-10)
-
-    def hits_obstacle(self, x, y):
-        # treat drone as a small circle
-        rr = 12
-        for (x1, y1, x2, y2) in self.obstacles:
-            # clamp point to rect
-            cx = clamp(x, x1, x2)
-            cy = clamp(y, y1, y2)
-            dx = x - cx
-            dy = y - cy
-            if dx*dx + dy*dy <= rr*rr:
-                return True
-        return False
-
-    def battery_drain(self, dt):
-        if self.drone.flying:
-            self.drone.battery = max(
-                0.0, self.drone.battery - (0.4 * dt))  # % per second
-            if self.drone.battery <= 5.0:
-                self.status("Battery critically low! Auto-landing…")
-                self.land()
-
-    # ---------- Actions (instant) ----------
+        self.canvas.coords(self.label, x, y-26)
+        if self.drone.flying != self.label_flying:
+            self.label_flying = self.drone.flying
+            self.canvas.itemconfig(self.label, text="DRONE" if self.drone.flying else "DRONE (GROUND)",
+                                   fill=INK if self.drone.flying else MUTED)
+
+    def create_swarm_items(self):
+        # One oval per drone, created once. Each frame only the drones that
+        # moved at least half a pixel get a coords() call, and only those
+        # whose state changed get an itemconfig().
+        self.canvas.delete("swarm")
+        self.swarm_items = [self.canvas.create_oval(0, 0, 0, 0, outline="", tags=("swarm",))
+                            for _ in range(self.swarm.count)]
+        self.swarm_drawn = None
+        self.swarm_state = None
+
+    def redraw_swarm(self):
+        swarm = self.swarm
+        shown = np.round(np.stack([swarm.x, swarm.y]) * 2) / 2
+        state = swarm.flying + 2 * swarm.near
+        if self.swarm_drawn is None:
+            moved = np.ones(swarm.count, dtype=bool)
+            changed = moved
+        else:
+            moved = (shown != self.swarm_drawn).any(axis=0)
+            changed = state != self.swarm_state
+        self.swarm_drawn = shown
+        self.swarm_state = state
+
+        coords = self.canvas.coords
+        items = self.swarm_items
+        xs, ys, states = shown[0].tolist(), shown[1].tolist(), state.tolist()
+        for i in np.flatnonzero(moved | changed).tolist():
+            x, y = xs[i], ys[i]
+            r = 7 if states[i] & 1 else 5
+            coords(items[i], x-r, y-r, x+r, y+r)
+        for i in np.flatnonzero(changed).tolist():
+            self.canvas.itemconfig(items[i], fill=SWARM_COLOURS[states[i]])
+
+    # ---------- Actions ----------
     def reset(self):
-        self.stop()
-        self.drone.reset()
+        self.current.reset()
         self.draw_static()
-        self.redraw()
-        self.status("Reset complete.")
-
-    def stop(self):
-        self.running = False
-        self.command_queue.clear()
-        self.status("Stopped. (Queue cleared)")
 
-    def toggle_run(self):
-        self.running = not self.running
-        self.status("Running…" if self.running else "Paused.")
-
-    def takeoff(self):
-        if self.drone.flying:
-            self.status("Already flying.")
-            return
-        if self.drone.battery <= 2:
-            self.status("Battery too low. Reset or recharge (sim).")
+    def random_arena(self):
+        self.arena_seed += 1
+        count = SWARM_ARENA_OBSTACLES if self.swarm else RANDOM_ARENA_OBSTACLES
+        self.engine.set_obstacles(generate_obstacles(count, self.arena_seed, self.drone.home))
+        message = f"Random arena #{self.arena_seed}: {count} obstacles."
+        if self.swarm and not self.start_swarm():
+            message = self.engine.message
+            self.toggle_swarm()
+        self.reset()
+        self.current.status(message)
+
+    def start_swarm(self):
+        """Fly a swarm in the current arena; False if it does not fit."""
+        try:
+            swarm = SwarmEngine(SWARM_DRONES, self.engine.obstacles, self.drone.home)
+        except ValueError as e:
+            self.engine.status(str(e))
+            return False
+        self.swarm = swarm
+        self.current = swarm
+        self.create_swarm_items()
+        return True
+
+    def toggle_swarm(self):
+        if self.swarm:
+            self.swarm = None
+            self.current = self.engine
+            self.canvas.delete("swarm")
+            self.canvas.itemconfig("dyn", state="normal")
+            self.engine.status("Single drone mode.")
             return
-        self.drone.flying = True
-        self.drone.altitude = 1.0
-        self.drone.path.append((self.drone.x, self.drone.y))
-        self.status("Takeoff ✅")
-        self.redraw()
-
-    def land(self):
-        if not self.drone.flying:
-            self.status("Already on ground.")
+        if SwarmEngine is None:
+            self.engine.status("Swarm mode needs NumPy (pip install numpy).")
             return
-        self.drone.flying = False
-        self.drone.altitude = 0.0
-        self.status("Landing ✅")
-        self.redraw()
+        self.engine.stop()
+        if self.start_swarm():
+            self.canvas.itemconfig("dyn", state="hidden")
 
-    def return_home(self):
-        # add a GOTO to home
-        hx, hy = self.drone.home
-        self.command_queue.append(self.cmd_goto(hx, hy))
-        self.status("Queued: Return Home")
-
-    # ---------- Command Generators ----------
-    def cmd_wait(self, seconds: float):
-        start = time.time()
-        while time.time() - start < seconds:
-            yield
-
-    def cmd_turn(self, degrees: float):
-        if not self.drone.flying:
-            self.status("TURN ignored (not flying).")
-            return
-            yield  # never reached
-        remaining = degrees
-        while abs(remaining) > 0.5:
-            dt = self.dt
-            step = math.copysign(
-                min(abs(remaining), self.drone.turn_speed * dt), remaining)
-            self.drone.heading_deg = (self.drone.heading_deg + step) % 360
-            remaining -= step
-            yield
-
-    def cmd_move(self, distance: float):
-        if not self.drone.flying:
-            self.status("MOVE ignored (not flying).")
-            return
-            yield
-        remaining = distance
-        while abs(remaining) > 0.8:
-            dt = self.dt
-            step = math.copysign(
-                min(abs(remaining), self.drone.speed * dt), remaining)
-            ang = deg_to_rad(self.drone.heading_deg)
-            nx = self.drone.x + math.cos(ang) * step
-            # minus because screen y-down
-            ny = self.drone.y - math.sin(ang) * step
-
-            # Safety: boundaries + obstacles
-            if not self.in_bounds(nx, ny):
-                self.status("⚠️ Boundary reached. Movement stopped.")
-                return
-            if self.hits_obstacle(nx, ny):
-                self.status(
-                    "⚠️ Obstacle collision detected. Movement stopped.")
-                return
-
-            self.drone.x, self.drone.y = nx, ny
-            self.drone.path.append((self.drone.x, self.drone.y))
-            remaining -= step
-            yield
-
-    def cmd_goto(self, x: float, y: float):
-        if not self.drone.flying:
-            self.status("GOTO ignored (not flying).")
-            return
-            yield
-        # move in small turns + forward steps (simple steering)
-        while True:
-            dx = x - self.drone.x
-            dy = self.drone.y - y  # invert for "math y-up"
-            dist = math.hypot(dx, dy)
-            if dist < 10:
-                return
-
-            target = (rad_to_deg(math.atan2(dy, dx))) % 360
-            # shortest turn
-            cur = self.drone.heading_deg
-            diff = (target - cur + 540) % 360 - 180
-
-            # turn a bit toward target
-            if abs(diff) > 3:
-                # one tick of turn
-                dt = self.dt
-                step = math.copysign(
-                    min(abs(diff), self.drone.turn_speed * dt), diff)
-                self.drone.heading_deg = (self.drone.heading_deg + step) % 360
-                yield
-                continue
-
-            # move forward a bit
-            move_step = min(dist, self.drone.speed * self.dt)
-            ang = deg_to_rad(self.drone.heading_deg)
-            nx = self.drone.x + math.cos(ang) * move_step
-            ny = self.drone.y - math.sin(ang) * move_step
-
-            if not self.in_bounds(nx, ny):
-                self.status("⚠️ Boundary reached during GOTO. Stopping.")
-                return
-            if self.hits_obstacle(nx, ny):
-                self.status("⚠️ Obstacle hit during GOTO. Stopping.")
-                return
-
-            self.drone.x, self.drone.y = nx, ny
-            self.drone.path.append((self.drone.x, self.drone.y))
-            yield
-
-    # ---------- Script Parser ----------
     def run_script(self):
-        txt = self.script.get("1.0", "end").strip()
-        if not txt:
-            self.status("No script to run.")
-            return
+        self.current.run_script(self.script.get("1.0", "end"))
 
-        self.command_queue.clear()
-
-        lines = [ln.strip() for ln in txt.splitlines() if ln.strip()
-                 and not ln.strip().startswith("#")]
-        for i, ln in enumerate(lines, start=1):
-            parts = ln.split()
-            cmd = parts[0].upper()
-
-            def bad():
-                self.status(f"Script error on line {i}: {ln}")
-            try:
-                if cmd == "TAKEOFF":
-                    self.command_queue.append(self._wrap_instant(self.takeoff))
-                elif cmd == "LAND":
-                    self.command_queue.append(self._wrap_instant(self.land))
-                elif cmd == "HOME":
-                    hx, hy = self.drone.home
-                    self.command_queue.append(self.cmd_goto(hx, hy))
-                elif cmd == "WAIT":
-                    sec = float(parts[1])
-                    self.command_queue.append(self.cmd_wait(sec))
-                elif cmd == "TURN":
-                    deg = float(parts[1])
-                    self.command_queue.append(self.cmd_turn(deg))
-                elif cmd == "MOVE":
-                    dist = float(parts[1])
-                    self.command_queue.append(self.cmd_move(dist))
-                elif cmd == "GOTO":
-                    x = float(parts[1])
-                    y = float(parts[2])
-                    self.command_queue.append(self.cmd_goto(x, y))
-                elif cmd == "SETSPEED":
-                    sp = float(parts[1])
-                    self.command_queue.append(
-                        self._wrap_instant(lambda: self.set_speed(sp)))
-                else:
-                    bad()
-                    return
-            except Exception:
-                bad()
-                return
-
-        self.running = True
-        self.status(
-            f"Script queued: {len(self.command_queue)} commands. Running…")
-
-    def _wrap_instant(self, fn):
-        # generator that runs once
-        def gen():
-            fn()
-            yield
-        return gen()
-
-    def set_speed(self, sp):
-        self.drone.speed = clamp(sp, 40, 300)
-        self.status(f"Speed set to {self.drone.speed:.0f}")
+    def export_path(self):
+        if self.swarm:
+            self.swarm.status("Export Path works on the single drone (S to switch back).")
+            return
+        filename = filedialog.asksaveasfilename(
+            title="Export Flight Path", defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")])
+        if not filename:
+            return
+        self.drone.path.write_csv(filename)
+        self.engine.status(f"Exported {len(self.drone.path)} path points.")
 
     # ---------- Main Loop ----------
     def tick(self):
-        now = time.time()
-        self.dt = now - self.last_t
+        # The engine always advances in fixed DT steps; wall time only
+        # decides how many steps are due before the next frame.
+        now = time.perf_counter()
+        self.lag += now - self.last_t
         self.last_t = now
 
-        # battery drain when flying
-        self.battery_drain(self.dt)
-
-        # execute queue
-        if self.running and self.command_queue:
-            try:
-                # advance current command one step per frame
-                cur = self.command_queue[0]
-                next(cur)
-            except StopIteration:
-                self.command_queue.pop(0)
-                if not self.command_queue:
-                    self.status("Mission complete ✅ (Queue empty)")
-                    self.running = False
+        due = int(self.lag / DT)
+        for _ in range(min(due, MAX_STEPS_PER_FRAME)):
+            self.current.step()
+        self.lag -= due * DT
 
-        # update HUD
-        self.hud.config(text=self.hud_text())
-
-        # redraw
-        self.redraw()
+        self.render()
 
         # schedule
         self.root.after(16, self.tick)  # ~60 FPS
@@ -509,7 +388,18 @@ class Simulator:
             f"Heading: {self.drone.heading_deg:.1f}°\n"
             f"Speed: {self.drone.speed:.0f}px/s\n"
             f"Battery: {self.drone.battery:.1f}%\n"
-            f"Queue: {len(self.command_queue)} commands"
+            f"Queue: {len(self.engine.command_queue)} commands"
+        )
+
+    def swarm_hud_text(self):
+        swarm = self.swarm
+        return (
+            f"Swarm: {swarm.count} drones\n"
+            f"Flying: {int(swarm.flying.sum())}\n"
+            f"Too close: {int(swarm.near.sum())} drones\n"
+            f"Battery: {swarm.battery.mean():.1f}% avg, {swarm.battery.min():.1f}% min\n"
+            f"Blocked moves: {swarm.stops}\n"
+            f"Sim time: {swarm.sim_time:.1f}s"
         )
 
 
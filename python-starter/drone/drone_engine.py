@@ -0,0 +1,749 @@
+"""Headless engine for the drone simulator.
+
+The engine owns the drone, the arena and the mission queue, and moves
+them forward in fixed steps of DT seconds. Nothing here reads the clock,
+so a mission gives bit-identical results on every run and can be run as
+fast as the CPU allows. drone.py draws whatever state the engine is in.
+
+Run a mission without a window:
+
+    python drone_engine.py mission.txt
+    python drone_engine.py mission.txt --repeat 100
+
+It prints the final state, the simulated and wall time, and a digest of
+the whole trajectory, which must be the same on every repeat. --export
+writes the full-resolution trajectory as CSV, --obstacles N flies in a
+generated arena, and --bench times collision checks against arenas of
+growing size.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import random
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+
+
+W, H = 980, 640
+ARENA_PAD = 20
+
+# Simulation step: 60 steps per simulated second, whatever the frame rate.
+DT = 1.0 / 60.0
+# Headless runs stop after this much simulated time.
+MAX_MISSION_SECONDS = 3600.0
+
+# Display simplification of the trajectory (see Trajectory): vertices may
+# be off the true path by up to SIMPLIFY_EPSILON px, points are committed
+# in chunks of SIMPLIFY_CHUNK, and the tolerance doubles whenever the
+# committed polyline would pass MAX_DISPLAY_VERTICES.
+SIMPLIFY_EPSILON = 0.5
+SIMPLIFY_CHUNK = 64
+MAX_DISPLAY_VERTICES = 2000
+
+# Obstacles are bucketed in a uniform grid of GRID_CELL px squares, and
+# the drone is a circle of DRONE_RADIUS px swept along each step.
+GRID_CELL = 40
+DRONE_RADIUS = 12
+# Generated arenas leave this much room around home.
+HOME_CLEARANCE = 50
+
+DEFAULT_SCRIPT = (
+    "TAKEOFF\n"
+    "SETSPEED 140\n"
+    "MOVE 160\n"
+    "TURN 90\n"
+    "MOVE 90\n"
+    "TURN -45\n"
+    "MOVE 140\n"
+    "WAIT 0.4\n"
+    "HOME\n"
+    "LAND\n"
+)
+
+
+def clamp(v, a, b):
+    return max(a, min(b, v))
+
+
+def deg_to_rad(d):
+    return d * math.pi / 180.0
+
+
+def rad_to_deg(r):
+    return r * 180.0 / math.pi
+
+
+def simplify(coords, first, last, epsilon):
+    """Douglas-Peucker over points first..last of a flat [x0, y0, ...]
+    sequence; returns the indices of the points to keep, in order.
+
+    Distances are to the segment, not the infinite line, so a path that
+    doubles back on itself keeps its turning point."""
+    keep = {first, last}
+    stack = [(first, last)]
+    limit = epsilon * epsilon
+    while stack:
+        a, b = stack.pop()
+        ax, ay, bx, by = coords[2*a], coords[2*a+1], coords[2*b], coords[2*b+1]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx*dx + dy*dy or 1e-12
+        worst, worst_i = limit, None
+        for i in range(a + 1, b):
+            px, py = coords[2*i] - ax, coords[2*i+1] - ay
+            t = (px*dx + py*dy) / length_sq
+            t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+            ex, ey = px - t*dx, py - t*dy
+            d = ex*ex + ey*ey
+            if d > worst:
+                worst, worst_i = d, i
+        if worst_i is not None:
+            keep.add(worst_i)
+            stack.append((a, worst_i))
+            stack.append((worst_i, b))
+    return sorted(keep)
+
+
+def segment_hits_rect(x0, y0, x1, y1, rect):
+    """Whether the segment crosses the rectangle (slab test)."""
+    rx1, ry1, rx2, ry2 = rect
+    t0, t1 = 0.0, 1.0
+    for p, q in ((x0 - x1, x0 - rx1), (x1 - x0, rx2 - x0),
+                 (y0 - y1, y0 - ry1), (y1 - y0, ry2 - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+    return True
+
+
+def sweep_hits_rect(x0, y0, x1, y1, r, rect):
+    """Whether a circle of radius r moving from (x0, y0) to (x1, y1)
+    touches the rectangle at any point on the way."""
+    rx1, ry1, rx2, ry2 = rect
+    # Quick reject on the bounding boxes.
+    if (min(x0, x1) - r > rx2 or max(x0, x1) + r < rx1
+            or min(y0, y1) - r > ry2 or max(y0, y1) + r < ry1):
+        return False
+    if segment_hits_rect(x0, y0, x1, y1, rect):
+        return True
+    # Otherwise the closest approach is at an end of the segment or at a
+    # corner of the rectangle.
+    rr = r * r
+    for px, py in ((x0, y0), (x1, y1)):
+        dx = px - clamp(px, rx1, rx2)
+        dy = py - clamp(py, ry1, ry2)
+        if dx*dx + dy*dy <= rr:
+            return True
+    dx, dy = x1 - x0, y1 - y0
+    length_sq = dx*dx + dy*dy
+    if length_sq == 0:
+        return False
+    for cx, cy in ((rx1, ry1), (rx1, ry2), (rx2, ry1), (rx2, ry2)):
+        t = clamp(((cx - x0)*dx + (cy - y0)*dy) / length_sq, 0.0, 1.0)
+        ex, ey = cx - (x0 + t*dx), cy - (y0 + t*dy)
+        if ex*ex + ey*ey <= rr:
+            return True
+    return False
+
+
+class ObstacleGrid:
+    """Uniform grid over the arena: cell -> indices of the obstacles that
+    overlap it. A query only looks at the cells its box touches, so its
+    cost depends on how crowded that spot is, not on the obstacle count."""
+
+    def __init__(self, obstacles, cell=GRID_CELL):
+        self.obstacles = obstacles
+        self.cell = cell
+        self.cells = {}
+        for i, (x1, y1, x2, y2) in enumerate(obstacles):
+            for key in self._keys(x1, y1, x2, y2):
+                self.cells.setdefault(key, []).append(i)
+
+    def _keys(self, x1, y1, x2, y2):
+        c = self.cell
+        for gx in range(int(x1 // c), int(x2 // c) + 1):
+            for gy in range(int(y1 // c), int(y2 // c) + 1):
+                yield gx, gy
+
+    def query(self, x1, y1, x2, y2):
+        """Indices of obstacles whose cells meet the box, each once."""
+        found = set()
+        for key in self._keys(x1, y1, x2, y2):
+            found.update(self.cells.get(key, ()))
+        return found
+
+    def sweep_hits(self, x0, y0, x1, y1, r):
+        candidates = self.query(min(x0, x1) - r, min(y0, y1) - r,
+                                max(x0, x1) + r, max(y0, y1) + r)
+        # Sorted so the same obstacle is reported first on every run.
+        for i in sorted(candidates):
+            if sweep_hits_rect(x0, y0, x1, y1, r, self.obstacles[i]):
+                return True
+        return False
+
+
+def generate_obstacles(count, seed=0, home=(180.0, 300.0), bounds=None, side=None):
+    """``count`` random rectangles inside ``bounds`` (default: the arena),
+    keeping clear of home. Unless ``side`` is given, their size is chosen
+    so they cover about a fifth of the area. The same seed always gives
+    the same arena."""
+    rng = random.Random(seed)
+    left, top, right, bottom = bounds or (ARENA_PAD + 10, ARENA_PAD + 10,
+                                          W - ARENA_PAD - 10, H - ARENA_PAD - 10)
+    if side is None:
+        side = max(4.0, math.sqrt((right - left) * (bottom - top) * 0.2 / max(1, count)))
+    obstacles = []
+    while len(obstacles) < count:
+        w = rng.uniform(0.5, 1.5) * side
+        h = rng.uniform(0.5, 1.5) * side
+        x = rng.uniform(left, right - w)
+        y = rng.uniform(top, bottom - h)
+        rect = (x, y, x + w, y + h)
+        if sweep_hits_rect(home[0], home[1], home[0], home[1], HOME_CLEARANCE, rect):
+            continue
+        obstacles.append(rect)
+    return obstacles
+
+
+class Trajectory:
+    """The drone's path as packed doubles x0, y0, x1, y1, ...
+
+    16 bytes a point (about 22 with spare capacity) instead of about 64 for
+    a list of tuples plus 48 for its two floats; the buffer doubles when it
+    is full. Indexing and iteration give (x, y) tuples.
+
+    For drawing, committed() and tail() give a Douglas-Peucker simplified
+    polyline that is kept up to date incrementally: every SIMPLIFY_CHUNK
+    points the newest stretch is simplified once and appended to the
+    committed vertices, so only the short tail is simplified per frame.
+    ``version`` changes when the committed vertices are rebuilt with a
+    coarser tolerance.
+    """
+
+    def __init__(self, points=(), capacity=256):
+        self._data = array("d", bytes(16 * capacity))
+        self._n = 0
+        self.epsilon = SIMPLIFY_EPSILON
+        self.version = 0
+        self._kept = array("d")
+        self._anchor = 0
+        self._tail = None
+        for point in points:
+            self.append(point)
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("trajectory index out of range")
+        return self._data[2*i], self._data[2*i+1]
+
+    def __iter__(self):
+        data = self._data
+        for i in range(self._n):
+            yield data[2*i], data[2*i+1]
+
+    def append(self, point):
+        x, y = point
+        n = self._n
+        if 2*n == len(self._data):
+            self._data.extend(array("d", bytes(8 * len(self._data))))
+        self._data[2*n] = x
+        self._data[2*n+1] = y
+        self._n = n + 1
+        self._tail = None
+        if n == 0:
+            self._kept.extend((x, y))
+        elif n - self._anchor >= SIMPLIFY_CHUNK:
+            self._commit()
+
+    def coords(self):
+        """The full-resolution points as a flat array('d')."""
+        return self._data[:2*self._n]
+
+    def nbytes(self):
+        return self._data.itemsize * len(self._data) + self._kept.itemsize * len(self._kept)
+
+    def _commit(self):
+        last = self._n - 1
+        for i in simplify(self._data, self._anchor, last, self.epsilon)[1:]:
+            self._kept.extend((self._data[2*i], self._data[2*i+1]))
+        self._anchor = last
+        while len(self._kept) // 2 > MAX_DISPLAY_VERTICES:
+            self.epsilon *= 2
+            kept = self._kept
+            self._kept = array("d")
+            for i in simplify(kept, 0, len(kept) // 2 - 1, self.epsilon):
+                self._kept.extend((kept[2*i], kept[2*i+1]))
+            self.version += 1
+
+    def committed(self):
+        """Simplified vertices up to the last committed point (append-only
+        until ``version`` changes)."""
+        return self._kept
+
+    def tail(self):
+        """Simplified vertices from the last committed point to the newest."""
+        if self._tail is None:
+            if self._n == 0:
+                self._tail = array("d")
+            else:
+                last = self._n - 1
+                self._tail = array("d", (self._data[2*i + k]
+                                         for i in simplify(self._data, self._anchor, last, self.epsilon)
+                                         for k in (0, 1)))
+        return self._tail
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["x", "y"])
+            writer.writerows(self)
+
+
+@dataclass
+class Drone:
+    x: float = 180.0
+    y: float = 300.0
+    heading_deg: float = 0.0     # 0 = east, 90 = north
+    speed: float = 120.0         # px per second (forward motion)
+    turn_speed: float = 120.0    # deg per second
+    altitude: float = 0.0        # "virtual altitude"
+    flying: bool = False
+    battery: float = 100.0       # %
+    home: tuple = (180.0, 300.0)
+    path: Trajectory = field(default_factory=Trajectory)
+
+    def reset(self):
+        self.x, self.y = self.home
+        self.heading_deg = 0.0
+        self.altitude = 0.0
+        self.flying = False
+        self.battery = 100.0
+        self.path = Trajectory([(self.x, self.y)])
+
+
+class DroneEngine:
+    def __init__(self, obstacles=None):
+        self.drone = Drone()
+        self.drone.path = Trajectory([(self.drone.x, self.drone.y)])
+
+        self.set_obstacles(obstacles if obstacles is not None else [
+            # rectangles: (x1,y1,x2,y2)
+            (420, 140, 580, 240),
+            (700, 360, 880, 500),
+            (330, 420, 520, 560),
+        ])
+
+        self.dt = DT
+        self.steps = 0
+        self.running = False
+
+        # Script queue (each item is a generator step)
+        self.command_queue = []
+        self.message = ""
+
+    @property
+    def sim_time(self):
+        return self.steps * self.dt
+
+    def status(self, msg):
+        # The UI shows the latest message; see Simulator.render().
+        self.message = msg
+
+    # ---------- Physics / Safety ----------
+    def in_bounds(self, x, y):
+        return (ARENA_PAD+10) <= x <= (W-ARENA_PAD-10) and (ARENA_PAD+10) <= y <= (H-ARENA_PAD-10)
+
+    def set_obstacles(self, obstacles):
+        self.obstacles = obstacles
+        self.grid = ObstacleGrid(obstacles)
+
+    def hits_obstacle(self, x, y, nx=None, ny=None):
+        # treat drone as a small circle, swept from (x, y) to (nx, ny)
+        if nx is None:
+            nx, ny = x, y
+        return self.grid.sweep_hits(x, y, nx, ny, DRONE_RADIUS)
+
+    def battery_drain(self, dt):
+        if self.drone.flying:
+            self.drone.battery = max(
+                0.0, self.drone.battery - (0.4 * dt))  # % per second
+            if self.drone.battery <= 5.0:
+                self.status("Battery critically low! Auto-landing…")
+                self.land()
+
+    # ---------- Actions (instant) ----------
+    def reset(self):
+        self.stop()
+        self.drone.reset()
+        self.status("Reset complete.")
+
+    def stop(self):
+        self.running = False
+        self.command_queue.clear()
+        self.status("Stopped. (Queue cleared)")
+
+    def toggle_run(self):
+        self.running = not self.running
+        self.status("Running…" if self.running else "Paused.")
+
+    def takeoff(self):
+        if self.drone.flying:
+            self.status("Already flying.")
+            return
+        if self.drone.battery <= 2:
+            self.status("Battery too low. Reset or recharge (sim).")
+            return
+        self.drone.flying = True
+        self.drone.altitude = 1.0
+        self.drone.path.append((self.drone.x, self.drone.y))
+        self.status("Takeoff ✅")
+
+    def land(self):
+        if not self.drone.flying:
+            self.status("Already on ground.")
+            return
+        self.drone.flying = False
+        self.drone.altitude = 0.0
+        self.status("Landing ✅")
+
+    def return_home(self):
+        # add a GOTO to home
+        hx, hy = self.drone.home
+        self.command_queue.append(self.cmd_goto(hx, hy))
+        self.status("Queued: Return Home")
+
+    def set_speed(self, sp):
+        self.drone.speed = clamp(sp, 40, 300)
+        self.status(f"Speed set to {self.drone.speed:.0f}")
+
+    # ---------- Command Generators ----------
+    def cmd_wait(self, seconds: float):
+        # Counted in steps, so a WAIT lasts the same simulated time on any machine.
+        for _ in range(max(0, round(seconds / self.dt))):
+            yield
+
+    def cmd_turn(self, degrees: float):
+        if not self.drone.flying:
+            self.status("TURN ignored (not flying).")
+            return
+            yield  # never reached
+        remaining = degrees
+        while abs(remaining) > 0.5:
+            dt = self.dt
+            step = math.copysign(
+                min(abs(remaining), self.drone.turn_speed * dt), remaining)
+            self.drone.heading_deg = (self.drone.heading_deg + step) % 360
+            remaining -= step
+            yield
+
+    def cmd_move(self, distance: float):
+        if not self.drone.flying:
+            self.status("MOVE ignored (not flying).")
+            return
+            yield
+        remaining = distance
+        while abs(remaining) > 0.8:
+            dt = self.dt
+            step = math.copysign(
+                min(abs(remaining), self.drone.speed * dt), remaining)
+            ang = deg_to_rad(self.drone.heading_deg)
+            nx = self.drone.x + math.cos(ang) * step
+            # minus because screen y-down
+            ny = self.drone.y - math.sin(ang) * step
+
+            # Safety: boundaries + obstacles
+            if not self.in_bounds(nx, ny):
+                self.status("⚠️ Boundary reached. Movement stopped.")
+                return
+            if self.hits_obstacle(self.drone.x, self.drone.y, nx, ny):
+                self.status(
+                    "⚠️ Obstacle collision detected. Movement stopped.")
+                return
+
+            self.drone.x, self.drone.y = nx, ny
+            self.drone.path.append((self.drone.x, self.drone.y))
+            remaining -= step
+            yield
+
+    def cmd_goto(self, x: float, y: float):
+        if not self.drone.flying:
+            self.status("GOTO ignored (not flying).")
+            return
+            yield
+        # move in small turns + forward steps (simple steering)
+        while True:
+            dx = x - self.drone.x
+            dy = self.drone.y - y  # invert for "math y-up"
+            dist = math.hypot(dx, dy)
+            if dist < 10:
+                return
+
+            target = (rad_to_deg(math.atan2(dy, dx))) % 360
+            # shortest turn
+            cur = self.drone.heading_deg
+            diff = (target - cur + 540) % 360 - 180
+
+            # turn a bit toward target
+            if abs(diff) > 3:
+                # one tick of turn
+                dt = self.dt
+                step = math.copysign(
+                    min(abs(diff), self.drone.turn_speed * dt), diff)
+                self.drone.heading_deg = (self.drone.heading_deg + step) % 360
+                yield
+                continue
+
+            # move forward a bit
+            move_step = min(dist, self.drone.speed * self.dt)
+            ang = deg_to_rad(self.drone.heading_deg)
+            nx = self.drone.x + math.cos(ang) * move_step
+            ny = self.drone.y - math.sin(ang) * move_step
+
+            if not self.in_bounds(nx, ny):
+                self.status("⚠️ Boundary reached during GOTO. Stopping.")
+                return
+            if self.hits_obstacle(self.drone.x, self.drone.y, nx, ny):
+                self.status("⚠️ Obstacle hit during GOTO. Stopping.")
+                return
+
+            self.drone.x, self.drone.y = nx, ny
+            self.drone.path.append((self.drone.x, self.drone.y))
+            yield
+
+    # ---------- Script Parser ----------
+    def run_script(self, txt):
+        """Queue a mission and start it; returns False on a script error."""
+        txt = txt.strip()
+        if not txt:
+            self.status("No script to run.")
+            return False
+
+        self.command_queue.clear()
+
+        lines = [ln.strip() for ln in txt.splitlines() if ln.strip()
+                 and not ln.strip().startswith("#")]
+        for i, ln in enumerate(lines, start=1):
+            parts = ln.split()
+            cmd = parts[0].upper()
+
+            def bad():
+                self.status(f"Script error on line {i}: {ln}")
+            try:
+                if cmd == "TAKEOFF":
+                    self.command_queue.append(self._wrap_instant(self.takeoff))
+                elif cmd == "LAND":
+                    self.command_queue.append(self._wrap_instant(self.land))
+                elif cmd == "HOME":
+                    hx, hy = self.drone.home
+                    self.command_queue.append(self.cmd_goto(hx, hy))
+                elif cmd == "WAIT":
+                    sec = float(parts[1])
+                    self.command_queue.append(self.cmd_wait(sec))
+                elif cmd == "TURN":
+                    deg = float(parts[1])
+                    self.command_queue.append(self.cmd_turn(deg))
+                elif cmd == "MOVE":
+                    dist = float(parts[1])
+                    self.command_queue.append(self.cmd_move(dist))
+                elif cmd == "GOTO":
+                    x = float(parts[1])
+                    y = float(parts[2])
+                    self.command_queue.append(self.cmd_goto(x, y))
+                elif cmd == "SETSPEED":
+                    sp = float(parts[1])
+                    self.command_queue.append(
+                        self._wrap_instant(lambda sp=sp: self.set_speed(sp)))
+                else:
+                    bad()
+                    return False
+            except Exception:
+                bad()
+                return False
+
+        self.running = True
+        self.status(
+            f"Script queued: {len(self.command_queue)} commands. Running…")
+        return True
+
+    def _wrap_instant(self, fn):
+        # generator that runs once
+        def gen():
+            fn()
+            yield
+        return gen()
+
+    # ---------- Main Loop ----------
+    def step(self):
+        """Advance the simulation by one fixed step of DT seconds."""
+        self.steps += 1
+
+        # battery drain when flying
+        self.battery_drain(self.dt)
+
+        # execute queue
+        if self.running and self.command_queue:
+            try:
+                # advance current command one step per frame
+                cur = self.command_queue[0]
+                next(cur)
+            except StopIteration:
+                self.command_queue.pop(0)
+                if not self.command_queue:
+                    self.status("Mission complete ✅ (Queue empty)")
+                    self.running = False
+
+    def run(self, max_seconds=MAX_MISSION_SECONDS):
+        """Step until the mission finishes (or max_seconds pass); returns the steps taken."""
+        start = self.steps
+        limit = round(max_seconds / self.dt)
+        while self.running and self.command_queue and self.steps - start < limit:
+            self.step()
+        return self.steps - start
+
+    def digest(self):
+        """SHA-256 of the drone state and full path, for comparing runs."""
+        d = self.drone
+        h = hashlib.sha256(struct.pack(
+            "<4d?", d.x, d.y, d.heading_deg, d.battery, d.flying))
+        coords = d.path.coords()
+        if sys.byteorder != "little":
+            coords.byteswap()
+        h.update(coords.tobytes())
+        return h.hexdigest()
+
+    def summary(self):
+        d = self.drone
+        return {
+            "steps": self.steps,
+            "sim_seconds": round(self.sim_time, 4),
+            "x": round(d.x, 3),
+            "y": round(d.y, 3),
+            "heading": round(d.heading_deg, 3),
+            "battery": round(d.battery, 3),
+            "flying": d.flying,
+            "path_points": len(d.path),
+            "message": self.message,
+            "digest": self.digest(),
+        }
+
+
+def bench_collisions(counts=(100, 1000, 10000, 100000), queries=2000, seed=0, side=24.0):
+    """Time swept collision checks through the grid and by scanning every
+    obstacle; yields one result per obstacle count.
+
+    The arena grows with the count so obstacles of ``side`` px keep
+    covering a fifth of it, as in one big generated map. Grid queries
+    should then cost about the same at every size, while the scan grows
+    with the count.
+    """
+    for count in counts:
+        extent = math.sqrt(count * side * side / 0.2)
+        obstacles = generate_obstacles(count, seed, home=(-1e9, -1e9),
+                                       bounds=(0, 0, extent, extent), side=side)
+        rng = random.Random(seed)
+        steps = []
+        for _ in range(queries):
+            x, y = rng.uniform(0, extent), rng.uniform(0, extent)
+            ang = rng.uniform(0, 2 * math.pi)
+            # the longest step the drone takes at full speed
+            length = 300 * DT
+            steps.append((x, y, x + math.cos(ang) * length, y + math.sin(ang) * length))
+
+        started = time.perf_counter()
+        grid = ObstacleGrid(obstacles)
+        built = time.perf_counter() - started
+
+        started = time.perf_counter()
+        hits = sum(grid.sweep_hits(*step, DRONE_RADIUS) for step in steps)
+        grid_time = time.perf_counter() - started
+
+        # The scan is slow on big arenas, so it gets a sample of the steps.
+        sample = steps[:max(10, queries * 10 // count)]
+        started = time.perf_counter()
+        scan_hits = sum(any(sweep_hits_rect(*step, DRONE_RADIUS, rect) for rect in obstacles)
+                        for step in sample)
+        scan_time = time.perf_counter() - started
+        assert scan_hits == sum(grid.sweep_hits(*step, DRONE_RADIUS) for step in sample)
+
+        yield {
+            "obstacles": count,
+            "arena_px": round(extent),
+            "build_ms": round(built * 1000, 2),
+            "grid_us": round(grid_time / len(steps) * 1e6, 2),
+            "scan_us": round(scan_time / len(sample) * 1e6, 2),
+            "hit_rate": round(hits / len(steps), 3),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a drone mission without a window.")
+    parser.add_argument("script", nargs="?", help="mission file (default: the built-in demo)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="run the mission this many times and check every run matches")
+    parser.add_argument("--export", help="write the full trajectory to this CSV file")
+    parser.add_argument("--obstacles", type=int,
+                        help="fly in a generated arena with this many obstacles")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --obstacles")
+    parser.add_argument("--bench", action="store_true",
+                        help="time collision checks for growing obstacle counts and exit")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        for result in bench_collisions():
+            print(json.dumps(result))
+        return 0
+
+    obstacles = None
+    if args.obstacles is not None:
+        obstacles = generate_obstacles(args.obstacles, args.seed)
+
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = DEFAULT_SCRIPT
+
+    digests = set()
+    started = time.perf_counter()
+    for _ in range(max(1, args.repeat)):
+        engine = DroneEngine(obstacles)
+        if not engine.run_script(text):
+            print(engine.message, file=sys.stderr)
+            return 2
+        engine.run()
+        digests.add(engine.digest())
+    wall = time.perf_counter() - started
+
+    result = engine.summary()
+    result["runs"] = max(1, args.repeat)
+    result["identical"] = len(digests) == 1
+    result["wall_seconds"] = round(wall, 4)
+    result["times_real_time"] = round(engine.sim_time * result["runs"] / wall, 1) if wall else None
+    result["display_vertices"] = (len(engine.drone.path.committed()) + len(engine.drone.path.tail())) // 2
+    if args.export:
+        engine.drone.path.write_csv(args.export)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0 if result["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,421 @@
+"""Swarm mode: hundreds of drones flying mission scripts in one arena.
+
+Every drone's state lives in NumPy arrays (x, y, heading, speed, battery,
+flying, plus where it is in its script), and SwarmEngine.step() moves
+the whole swarm with a handful of array operations per command type
+instead of a Python loop per drone. Scripts use the same commands as the
+single-drone simulator and are compiled to opcode tables, so drones can
+run different scripts side by side.
+
+Obstacles are rasterised once into a 1 px occupancy mask grown by the
+drone radius, so checking every drone's next position is one lookup.
+Close calls between drones are found with a spatial hash: each drone is
+only compared with the drones in its own and the neighbouring cells.
+
+    python drone_swarm.py --drones 500 [mission.txt]
+
+runs a swarm without a window and reports the step rate. Like
+drone_engine.py, runs are deterministic.
+"""
+import argparse
+import hashlib
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from drone_engine import (ARENA_PAD, DEFAULT_SCRIPT, DRONE_RADIUS, DT, H, W,
+                          DroneEngine, MAX_MISSION_SECONDS)
+
+
+SWARM_SIZE = 200
+# Drones closer than this (centre to centre) count as a close call.
+PROXIMITY = 2 * DRONE_RADIUS
+# Spacing of the starting formation around home; wider than PROXIMITY so
+# a swarm that has just taken off has no close calls.
+FORMATION_SPACING = PROXIMITY + 2
+# Spatial hash key of cell (cx, cy) is cx * CELL_STRIDE + cy.
+CELL_STRIDE = 4096
+# A line on its own in the script box that starts the next team's script.
+SCRIPT_SEPARATOR = "---"
+
+TAKEOFF, LAND, SETSPEED, WAIT, TURN, MOVE, GOTO, HOME, END = range(9)
+OPCODES = {"TAKEOFF": (TAKEOFF, 0), "LAND": (LAND, 0), "SETSPEED": (SETSPEED, 1),
+           "WAIT": (WAIT, 1), "TURN": (TURN, 1), "MOVE": (MOVE, 1),
+           "GOTO": (GOTO, 2), "HOME": (HOME, 0)}
+
+
+def compile_script(text):
+    """[(opcode, a, b), ...] for a mission script; raises ValueError with
+    the same "Script error on line N" message as the single-drone parser."""
+    program = []
+    lines = [ln.strip() for ln in text.strip().splitlines() if ln.strip()
+             and not ln.strip().startswith("#")]
+    for i, ln in enumerate(lines, start=1):
+        parts = ln.split()
+        op = OPCODES.get(parts[0].upper())
+        try:
+            if op is None or len(parts) < op[1] + 1:
+                raise ValueError
+            args = [float(p) for p in parts[1:op[1] + 1]] + [0.0, 0.0]
+        except ValueError:
+            raise ValueError(f"Script error on line {i}: {ln}") from None
+        program.append((op[0], args[0], args[1]))
+    if not program:
+        raise ValueError("No script to run.")
+    return program
+
+
+class SwarmEngine:
+    def __init__(self, count=SWARM_SIZE, obstacles=None, home=(180.0, 300.0)):
+        self.count = count
+        self.dt = DT
+        self.steps = 0
+        self.running = False
+        self.message = ""
+        self.home = home
+        self.obstacles = obstacles if obstacles is not None else DroneEngine().obstacles
+        self.blocked = self.obstacle_mask(self.obstacles)
+
+        # Drone state, one entry per drone.
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.heading = np.zeros(count)
+        self.speed = np.full(count, 120.0)
+        self.turn_speed = 120.0
+        self.battery = np.full(count, 100.0)
+        self.flying = np.zeros(count, dtype=bool)
+        # Where each drone is in its script: the program it runs, the
+        # current instruction, and what is left of it (distance, degrees
+        # or WAIT steps); NaN means the instruction has not started yet.
+        self.program = np.zeros(count, dtype=np.intp)
+        self.pc = np.zeros(count, dtype=np.intp)
+        self.remaining = np.full(count, np.nan)
+        self.ops = np.full((1, 1), END, dtype=np.int8)
+        self.args = np.zeros((1, 1, 2))
+
+        self.near = np.zeros(count, dtype=bool)
+        self.close_pairs = 0
+        self.peak_close_pairs = 0
+        self.stops = 0
+        self.reset()
+
+    @property
+    def sim_time(self):
+        return self.steps * self.dt
+
+    # ---------- Setup ----------
+    def obstacle_mask(self, obstacles):
+        """Pixels where a drone's centre would touch an obstacle."""
+        r = DRONE_RADIUS
+        mask = np.zeros((H, W), dtype=bool)
+        ys = np.arange(H)[:, None]
+        xs = np.arange(W)[None, :]
+        for x1, y1, x2, y2 in obstacles:
+            top, bottom = max(0, int(y1 - r)), min(H, int(math.ceil(y2 + r)) + 1)
+            left, right = max(0, int(x1 - r)), min(W, int(math.ceil(x2 + r)) + 1)
+            if top >= bottom or left >= right:
+                continue
+            dx = xs[:, left:right] - np.clip(xs[:, left:right], x1, x2)
+            dy = ys[top:bottom] - np.clip(ys[top:bottom], y1, y2)
+            mask[top:bottom, left:right] |= dx*dx + dy*dy <= r*r
+        return mask
+
+    def formation(self):
+        """Starting spots: the free points of a FORMATION_SPACING grid
+        through home, nearest home first. Raises ValueError when the
+        arena has fewer free points than drones."""
+        lo = ARENA_PAD + 10 + DRONE_RADIUS
+        g = FORMATION_SPACING
+        hx, hy = self.home
+        xs = hx + g * np.arange(-math.floor((hx - lo) / g), math.floor((W - lo - hx) / g) + 1)
+        ys = hy + g * np.arange(-math.floor((hy - lo) / g), math.floor((H - lo - hy) / g) + 1)
+        x, y = (a.ravel() for a in np.meshgrid(xs, ys))
+        free = ~self.blocked[np.round(y).astype(np.intp), np.round(x).astype(np.intp)]
+        x, y = x[free], y[free]
+        if len(x) < self.count:
+            raise ValueError(f"Only {len(x)} of {self.count} drones fit in this arena.")
+        order = np.argsort(np.hypot(x - hx, y - hy), kind="stable")[:self.count]
+        return x[order], y[order]
+
+    def reset(self):
+        self.x, self.y = self.formation()
+        self.heading[:] = 0.0
+        self.speed[:] = 120.0
+        self.battery[:] = 100.0
+        self.flying[:] = False
+        self.pc[:] = 0
+        self.remaining[:] = np.nan
+        self.ops = np.full((1, 1), END, dtype=np.int8)
+        self.near[:] = False
+        self.close_pairs = 0
+        self.peak_close_pairs = 0
+        self.stops = 0
+        self.running = False
+        self.message = f"Swarm of {self.count} drones ready."
+
+    def run_scripts(self, scripts):
+        """Load one script per drone (the list is repeated to cover the swarm)
+        and start; returns False on a script error."""
+        try:
+            programs = [compile_script(text) for text in scripts]
+        except ValueError as e:
+            self.message = str(e)
+            return False
+
+        length = max(len(p) for p in programs) + 1
+        self.ops = np.full((len(programs), length), END, dtype=np.int8)
+        self.args = np.zeros((len(programs), length, 2))
+        for n, program in enumerate(programs):
+            for k, (op, a, b) in enumerate(program):
+                self.ops[n, k] = op
+                self.args[n, k] = a, b
+        self.program = np.arange(self.count) % len(programs)
+        self.pc[:] = 0
+        self.remaining[:] = np.nan
+        self.running = True
+        self.message = f"Swarm: {len(programs)} script(s) on {self.count} drones. Running…"
+        return True
+
+    def run_script(self, text):
+        """Run ``text`` on every drone; a line of "---" separates the
+        scripts of different teams, which are dealt out in turn."""
+        scripts, current = [], []
+        for ln in text.splitlines():
+            if ln.strip() == SCRIPT_SEPARATOR:
+                scripts.append("\n".join(current))
+                current = []
+            else:
+                current.append(ln)
+        scripts.append("\n".join(current))
+        return self.run_scripts([t for t in scripts if t.strip()] or [""])
+
+    # ---------- Actions ----------
+    def status(self, msg):
+        self.message = msg
+
+    def stop(self):
+        self.running = False
+        self.status("Swarm stopped.")
+
+    def toggle_run(self):
+        if not (self.ops[self.program, self.pc] != END).any():
+            self.status("No script loaded. Click Run Script.")
+            return
+        self.running = not self.running
+        self.status("Swarm running…" if self.running else "Swarm paused.")
+
+    def takeoff(self):
+        ready = self.battery > 2
+        self.flying |= ready
+        self.status(f"{int(ready.sum())} drones took off.")
+
+    def land(self):
+        self.flying[:] = False
+        self.status("Swarm landed.")
+
+    def return_home(self):
+        if self.run_scripts(["HOME"]):
+            self.status("Swarm returning home…")
+
+    # ---------- Main Loop ----------
+    def step(self):
+        """Advance every drone by one fixed step of DT seconds."""
+        self.steps += 1
+        dt = self.dt
+
+        # battery drain when flying, auto-landing at 5%
+        self.battery = np.where(self.flying, np.maximum(0.0, self.battery - 0.4 * dt),
+                                self.battery)
+        self.flying &= self.battery > 5.0
+
+        if not self.running:
+            return
+        op = self.ops[self.program, self.pc]
+        a = self.args[self.program, self.pc, 0]
+        b = self.args[self.program, self.pc, 1]
+        done = np.zeros(self.count, dtype=bool)
+
+        # Instant commands.
+        m = op == TAKEOFF
+        self.flying |= m & (self.battery > 2)
+        m2 = op == LAND
+        self.flying &= ~m2
+        m3 = op == SETSPEED
+        self.speed = np.where(m3, np.clip(a, 40, 300), self.speed)
+        done |= m | m2 | m3
+
+        # WAIT counts down steps.
+        m = op == WAIT
+        start = m & np.isnan(self.remaining)
+        self.remaining[start] = np.maximum(0, np.round(a[start] / dt))
+        self.remaining[m] -= 1
+        done |= m & (self.remaining < 0)
+
+        # Moving commands are skipped by drones on the ground.
+        moving = (op == TURN) | (op == MOVE) | (op == GOTO) | (op == HOME)
+        done |= moving & ~self.flying
+
+        m = (op == TURN) & self.flying
+        start = m & np.isnan(self.remaining)
+        self.remaining[start] = a[start]
+        rem = self.remaining[m]
+        turn = np.copysign(np.minimum(np.abs(rem), self.turn_speed * dt), rem)
+        self.heading[m] = (self.heading[m] + turn) % 360
+        self.remaining[m] = rem - turn
+        done |= m & (np.abs(self.remaining) <= 0.5)
+
+        m = (op == MOVE) & self.flying
+        start = m & np.isnan(self.remaining)
+        self.remaining[start] = a[start]
+        rem = self.remaining[m]
+        step = np.copysign(np.minimum(np.abs(rem), self.speed[m] * dt), rem)
+        moved = self.advance(m, step)
+        self.remaining[moved] -= step[moved[m]]
+        done |= m & (~moved | (np.abs(self.remaining) <= 0.8))
+
+        # GOTO / HOME: turn toward the target, then fly straight at it.
+        m = ((op == GOTO) | (op == HOME)) & self.flying
+        tx = np.where(op == HOME, self.home[0], a)[m]
+        ty = np.where(op == HOME, self.home[1], b)[m]
+        dx = tx - self.x[m]
+        dy = self.y[m] - ty
+        dist = np.hypot(dx, dy)
+        target = np.degrees(np.arctan2(dy, dx)) % 360
+        diff = (target - self.heading[m] + 540) % 360 - 180
+        arrived = dist < 10
+        turning = ~arrived & (np.abs(diff) > 3)
+        turn = np.copysign(np.minimum(np.abs(diff), self.turn_speed * dt), diff)
+        self.heading[m] = np.where(turning, (self.heading[m] + turn) % 360, self.heading[m])
+        forward = np.zeros(self.count, dtype=bool)
+        forward[m] = ~arrived & ~turning
+        moved = self.advance(forward, np.minimum(dist, self.speed[m] * dt)[forward[m]])
+        stopped = np.zeros(self.count, dtype=bool)
+        stopped[m] = arrived
+        done |= stopped | (forward & ~moved)
+
+        self.pc[done] += 1
+        self.remaining[done] = np.nan
+        self.check_proximity()
+
+        if not (self.ops[self.program, self.pc] != END).any():
+            self.running = False
+            self.message = "Swarm mission complete ✅"
+
+    def advance(self, mask, step):
+        """Move the drones in ``mask`` ``step`` px along their heading unless
+        that leaves the arena or touches an obstacle; returns who moved."""
+        ang = np.radians(self.heading[mask])
+        nx = self.x[mask] + np.cos(ang) * step
+        ny = self.y[mask] - np.sin(ang) * step
+        lo = ARENA_PAD + 10
+        ok = (nx >= lo) & (nx <= W - lo) & (ny >= lo) & (ny <= H - lo)
+        ok[ok] = ~self.blocked[np.round(ny[ok]).astype(np.intp),
+                               np.round(nx[ok]).astype(np.intp)]
+        self.stops += int((~ok).sum())
+
+        moved = np.zeros(self.count, dtype=bool)
+        moved[mask] = ok
+        self.x[moved] = nx[ok]
+        self.y[moved] = ny[ok]
+        return moved
+
+    def check_proximity(self):
+        """Flag flying drones within PROXIMITY of another, via a spatial hash."""
+        self.near[:] = False
+        self.close_pairs = 0
+        idx = np.flatnonzero(self.flying)
+        if len(idx) < 2:
+            return
+        # Hash each drone to its cell and sort by cell, so every cell's
+        # drones sit in one contiguous run of the sorted arrays.
+        cx = (self.x[idx] // PROXIMITY).astype(np.int64)
+        cy = (self.y[idx] // PROXIMITY).astype(np.int64)
+        keys = cx * CELL_STRIDE + cy
+        order = np.argsort(keys, kind="stable")
+        keys, idx = keys[order], idx[order]
+        xs, ys = self.x[idx], self.y[idx]
+        n = len(idx)
+        rows = np.arange(n)
+
+        limit = PROXIMITY * PROXIMITY
+        # Each drone is paired with the later drones of its own cell and
+        # every drone of the four neighbouring cells "after" it, so each
+        # pair of drones is looked at once.
+        for offset in (0, CELL_STRIDE - 1, CELL_STRIDE, CELL_STRIDE + 1, 1):
+            first = np.searchsorted(keys, keys + offset, side="left")
+            last = np.searchsorted(keys, keys + offset, side="right")
+            if offset == 0:
+                first = rows + 1
+            count = np.maximum(last - first, 0)
+            total = int(count.sum())
+            if not total:
+                continue
+            a = np.repeat(rows, count)
+            b = np.arange(total) - np.repeat(np.cumsum(count) - count, count) \
+                + np.repeat(first, count)
+            dx = xs[a] - xs[b]
+            dy = ys[a] - ys[b]
+            close = dx*dx + dy*dy < limit
+            self.near[idx[a[close]]] = True
+            self.near[idx[b[close]]] = True
+            self.close_pairs += int(close.sum())
+        self.peak_close_pairs = max(self.peak_close_pairs, self.close_pairs)
+
+    def run(self, max_seconds=MAX_MISSION_SECONDS):
+        start = self.steps
+        limit = round(max_seconds / self.dt)
+        while self.running and self.steps - start < limit:
+            self.step()
+        return self.steps - start
+
+    def digest(self):
+        h = hashlib.sha256()
+        for values in (self.x, self.y, self.heading, self.battery, self.flying):
+            h.update(np.ascontiguousarray(values).tobytes())
+        return h.hexdigest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a drone swarm mission without a window.")
+    parser.add_argument("scripts", nargs="*",
+                        help="mission files, shared out over the drones (default: the demo)")
+    parser.add_argument("--drones", type=int, default=SWARM_SIZE)
+    args = parser.parse_args(argv)
+
+    scripts = []
+    for name in args.scripts:
+        with open(name, "r", encoding="utf-8") as f:
+            scripts.append(f.read())
+    try:
+        swarm = SwarmEngine(args.drones)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not swarm.run_scripts(scripts or [DEFAULT_SCRIPT]):
+        print(swarm.message, file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    steps = swarm.run()
+    wall = time.perf_counter() - started
+    print(json.dumps({
+        "drones": swarm.count,
+        "steps": steps,
+        "sim_seconds": round(steps * swarm.dt, 4),
+        "wall_seconds": round(wall, 4),
+        "us_per_step": round(wall / max(1, steps) * 1e6, 1),
+        "drone_steps_per_second": round(swarm.count * steps / wall) if wall else None,
+        "flying": int(swarm.flying.sum()),
+        "peak_close_pairs": swarm.peak_close_pairs,
+        "stops": swarm.stops,
+        "message": swarm.message,
+        "digest": swarm.digest(),
+    }, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
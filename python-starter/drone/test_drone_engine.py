@@ -0,0 +1,52 @@
+from drone_engine import DEFAULT_SCRIPT, DroneEngine, generate_obstacles
+
+# Where the demo mission ends in the default arena, rounded so libm and CPU
+# differences in the last bits do not matter; it moves only when the
+# simulation itself changes. Exact comparisons are between runs in one
+# process, below.
+DEMO_END = {"steps": 456, "x": 186.58, "y": 294.26, "heading": 219.0,
+            "battery": 96.97, "flying": False, "path_points": 266}
+
+
+def fly(script, obstacles=None):
+    engine = DroneEngine(obstacles)
+    assert engine.run_script(script)
+    engine.run()
+    return engine
+
+
+def rounded_end(engine):
+    summary = engine.summary()
+    return {key: round(value, 2) if isinstance(value, float) else value
+            for key, value in summary.items() if key in DEMO_END}
+
+
+def test_demo_mission_ends_where_expected():
+    engine = fly(DEFAULT_SCRIPT)
+    assert not engine.running
+    assert rounded_end(engine) == DEMO_END
+
+
+def test_runs_are_deterministic():
+    obstacles = generate_obstacles(500, seed=3)
+    first = fly(DEFAULT_SCRIPT, obstacles)
+    second = fly(DEFAULT_SCRIPT, obstacles)
+    assert first.steps == second.steps
+    assert first.digest() == second.digest()
+
+
+def test_stepping_by_hand_matches_run():
+    engine = DroneEngine()
+    engine.run_script(DEFAULT_SCRIPT)
+    while engine.running:
+        engine.step()
+    assert engine.digest() == fly(DEFAULT_SCRIPT).digest()
+
+
+def test_reset_replays_the_same_mission():
+    engine = fly(DEFAULT_SCRIPT)
+    first = engine.digest()
+    engine.reset()
+    assert engine.run_script(DEFAULT_SCRIPT)
+    engine.run()
+    assert engine.digest() == first
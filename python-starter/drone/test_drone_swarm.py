@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from drone_engine import generate_obstacles
+from drone_swarm import PROXIMITY, SwarmEngine
+
+
+def brute_force(swarm):
+    """Close pairs and flagged drones by comparing every pair."""
+    idx = np.flatnonzero(swarm.flying)
+    dx = swarm.x[idx][:, None] - swarm.x[idx][None, :]
+    dy = swarm.y[idx][:, None] - swarm.y[idx][None, :]
+    close = np.triu(dx*dx + dy*dy < PROXIMITY * PROXIMITY, 1)
+    near = np.zeros(swarm.count, dtype=bool)
+    i, j = np.nonzero(close)
+    near[idx[i]] = near[idx[j]] = True
+    return int(close.sum()), near
+
+
+def test_spatial_hash_matches_brute_force():
+    swarm = SwarmEngine(400)
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        swarm.x = rng.uniform(30, 950, swarm.count)
+        swarm.y = rng.uniform(30, 610, swarm.count)
+        swarm.flying = rng.random(swarm.count) < 0.8
+        swarm.check_proximity()
+        pairs, near = brute_force(swarm)
+        assert swarm.close_pairs == pairs
+        assert (swarm.near == near).all()
+
+
+@pytest.mark.parametrize("count, obstacles", [
+    (50, None),
+    (500, None),
+    (300, generate_obstacles(60, 1, (180.0, 300.0))),
+    (300, generate_obstacles(60, 7, (180.0, 300.0))),
+])
+def test_no_drone_starts_blocked(count, obstacles):
+    swarm = SwarmEngine(count, obstacles)
+    cells = swarm.blocked[np.round(swarm.y).astype(int), np.round(swarm.x).astype(int)]
+    assert not cells.any()
+
+    swarm.run_script("TAKEOFF\nWAIT 0.1")
+    swarm.run()
+    assert swarm.peak_close_pairs == 0
+
+
+def test_arena_too_crowded_for_the_swarm():
+    with pytest.raises(ValueError, match="drones fit"):
+        SwarmEngine(300, generate_obstacles(1500, 1, (180.0, 300.0)))
+
+
+def test_runs_are_deterministic():
+    digests = []
+    for _ in range(2):
+        swarm = SwarmEngine(100)
+        swarm.run_script("TAKEOFF\nMOVE 120\nTURN 90\nGOTO 600 300\n---\nTAKEOFF\nHOME\nLAND")
+        swarm.run()
+        digests.append(swarm.digest())
+    assert digests[0] == digests[1]
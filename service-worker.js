@@ -1,4 +1,7 @@
 const CACHE_NAME = "pp-editor-hub-v1";
+// Content-hashed files never change, so they live in their own cache that
+// survives CACHE_NAME bumps.
+const ASSET_CACHE = "pp-editor-hub-assets";
 const OFFLINE_FALLBACK = "/index.html";
 
 const PRE_CACHE = [
@@ -8,28 +11,73 @@ const PRE_CACHE = [
   "/manifest.webmanifest"
 ];
 
+// Written by `python -m sitebuild.fingerprint`; missing on unbuilt checkouts.
+try {
+  importScripts("/precache-manifest.js");
+} catch (error) {
+  self.PP_PRECACHE = null;
+}
+const PRECACHE = self.PP_PRECACHE || { version: "dev", assets: {}, precache: [] };
+const HASHED_ASSET = /\.[0-9a-f]{10}\.[a-z0-9]+$/i;
+
 self.addEventListener("install", (event) => {
   event.waitUntil(
-    caches.open(CACHE_NAME).then((cache) => cache.addAll(PRE_CACHE))
+    Promise.all([
+      caches.open(CACHE_NAME).then((cache) => cache.addAll(PRE_CACHE)),
+      // One missing asset must not keep the worker from installing.
+      caches.open(ASSET_CACHE).then((cache) =>
+        Promise.all(PRECACHE.precache.map((url) => cache.add(url).catch(() => null)))
+      )
+    ])
   );
   self.skipWaiting();
 });
 
+async function pruneAssetCache() {
+  const live = new Set(Object.values(PRECACHE.assets));
+  if (!live.size) return;
+  const cache = await caches.open(ASSET_CACHE);
+  const requests = await cache.keys();
+  await Promise.all(
+    requests
+      .filter((request) => !live.has(new URL(request.url).pathname))
+      .map((request) => cache.delete(request))
+  );
+}
+
 self.addEventListener("activate", (event) => {
   event.waitUntil(
     caches.keys().then((keys) =>
       Promise.all(
-        keys.map((key) => (key !== CACHE_NAME ? caches.delete(key) : Promise.resolve()))
+        keys.map((key) =>
+          key !== CACHE_NAME && key !== ASSET_CACHE ? caches.delete(key) : Promise.resolve()
+        )
       )
-    )
+    ).then(pruneAssetCache)
   );
   self.clients.claim();
 });
 
+async function cacheFirst(request) {
+  const cache = await caches.open(ASSET_CACHE);
+  const cached = await cache.match(request);
+  if (cached) return cached;
+
+  const response = await fetch(request);
+  if (response.ok) cache.put(request, response.clone());
+  return response;
+}
+
 self.addEventListener("fetch", (event) => {
   const request = event.request;
   if (request.method !== "GET") return;
 
+  const url = new URL(request.url);
+  if (url.origin === self.location.origin && HASHED_ASSET.test(url.pathname)) {
+    event.respondWith(cacheFirst(request));
+    return;
+  }
+
   event.respondWith(
     fetch(request)
       .then((response) => {
@@ -0,0 +1,12 @@
+"""Build tools for the static site.
+
+Every tool works from one cached index of the tree (see ``index.py``) so a
+rebuild after a small edit only re-reads the files that actually changed.
+Run ``python -m sitebuild`` for the whole pipeline, or any stage on its own,
+e.g. ``python -m sitebuild.sitemap``.
+
+GitHub Pages serves this tree as it is committed, so the stages rewrite
+pages in place and whatever they write next to them (hashed copies,
+precache-manifest.js, ...) is committed together with those pages. Only
+.ppbuild/ and the precompressed .gz/.br siblings stay out of git.
+"""
@@ -0,0 +1,58 @@
+"""Run the site build pipeline: python -m sitebuild [stage ...]
+
+Exits 1 when a stage reports pages over budget (see pageweight.py).
+"""
+import argparse
+import importlib
+import sys
+import time
+
+from . import index as site_index
+from .site import SITE_ROOT
+
+
+# Stages run in this order; each module exposes build(index) -> dict.
+STAGES = [
+    "includes",
+    "images",
+    "fingerprint",
+    "sitemap",
+    "search",
+    "seo",
+    "linkcheck",
+    "compress",
+    "pageweight",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("stages", nargs="*", metavar="stage",
+                        help=f"one of {', '.join(STAGES)} (default: all)")
+    parser.add_argument("--root", default=SITE_ROOT)
+    args = parser.parse_args(argv)
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage: {', '.join(sorted(unknown))}")
+
+    index = site_index.load(args.root)
+    failed = []
+    for name in args.stages or STAGES:
+        start = time.perf_counter()
+        module = importlib.import_module(f".{name}", __package__)
+        summary = module.build(index)
+        # stages may rewrite files; pick those changes up before the next one
+        index.refresh()
+        took = (time.perf_counter() - start) * 1000
+        print(f"{name:<12} {took:8.1f} ms  {summary}")
+        if summary.get("over_budget"):
+            failed.append(name)
+    index.save()
+    if failed:
+        print(f"over budget: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Precompressed .br / .gz siblings for every text asset, plus a size report.
+
+Each HTML/CSS/JS/JSON/XML file gets page.html.gz and page.html.br next to
+it (Brotli needs ``pip install brotli``; without it only gzip is written).
+Files whose content hash has not changed since the last run are skipped.
+A variant that would not be smaller than the original is not kept.
+
+.ppbuild/compression-report.json lists raw vs compressed bytes per page and
+flags pages that grew since the previous report.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone still helps
+    brotli = None
+
+from . import index as site_index
+from .site import (SITE_ROOT, cache_path, load_json, save_json, update_text,
+                   write_bytes)
+
+
+CACHE_NAME = "compress.json"
+CACHE_VERSION = 1
+REPORT = "compression-report.json"
+
+EXTENSIONS = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".xml", ".svg",
+              ".webmanifest")
+# Headers and framing eat the gain on tiny files.
+MIN_SIZE = 512
+# Report a page when its best compressed size grows by more than this.
+GROWTH_WARN = 0.10
+POOL_MIN_FILES = 8
+
+
+def compress_file(root, rel):
+    """Write the siblings for one file; returns (rel, {"raw", "gzip", "brotli"} sizes)."""
+    path = os.path.join(root, *rel.split("/"))
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    sizes = {"raw": len(raw), "gzip": None, "brotli": None}
+    variants = [("gzip", ".gz", lambda: gzip.compress(raw, 9, mtime=0))]
+    if brotli is not None:
+        variants.append(("brotli", ".br", lambda: brotli.compress(raw, quality=11)))
+
+    for name, suffix, make in variants:
+        data = make() if len(raw) >= MIN_SIZE else None
+        if data is not None and len(data) < len(raw):
+            write_bytes(path + suffix, data)
+            sizes[name] = len(data)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return rel, sizes
+
+
+def _remove_siblings(root, rel):
+    for suffix in (".gz", ".br"):
+        try:
+            os.remove(os.path.join(root, *rel.split("/")) + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _is_stale(index, rel, entry):
+    if not entry or entry["hash"] != index.hash(rel):
+        return True
+    if entry["sizes"]["brotli"] is None and brotli is not None and entry["sizes"]["raw"] >= MIN_SIZE:
+        return True
+    base = index.abspath(rel)
+    return any(entry["sizes"][name] is not None and not os.path.exists(base + suffix)
+               for name, suffix in (("gzip", ".gz"), ("brotli", ".br")))
+
+
+def _best(sizes):
+    return min(s for s in sizes.values() if s is not None)
+
+
+def make_report(files, previous):
+    pages = {rel: entry["sizes"] for rel, entry in sorted(files.items())
+             if rel.endswith((".html", ".htm"))}
+    totals = {"raw": 0, "gzip": 0, "brotli": 0}
+    for entry in files.values():
+        sizes = entry["sizes"]
+        totals["raw"] += sizes["raw"]
+        totals["gzip"] += sizes["gzip"] if sizes["gzip"] is not None else sizes["raw"]
+        totals["brotli"] += sizes["brotli"] if sizes["brotli"] is not None else sizes["raw"]
+
+    grown = []
+    for rel, sizes in pages.items():
+        before = previous.get(rel)
+        if before and _best(sizes) > _best(before) * (1 + GROWTH_WARN):
+            grown.append({"page": rel, "before": _best(before), "after": _best(sizes)})
+
+    best_total = totals["brotli"] if brotli is not None else totals["gzip"]
+    return {
+        "files_compressed": len(files),
+        "brotli_available": brotli is not None,
+        "raw_bytes": totals["raw"],
+        "gzip_bytes": totals["gzip"],
+        "brotli_bytes": totals["brotli"] if brotli is not None else None,
+        "saved_percent": round(100 * (1 - best_total / totals["raw"]), 1) if totals["raw"] else 0,
+        "largest_pages": [
+            {"page": rel, **sizes}
+            for rel, sizes in sorted(pages.items(), key=lambda kv: -kv[1]["raw"])[:10]
+        ],
+        "grown_since_last_report": grown,
+        "pages": pages,
+    }
+
+
+def build(index, jobs=None):
+    path = cache_path(index.root, CACHE_NAME)
+    cache = load_json(path, {})
+    if cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "files": {}}
+    files = cache["files"]
+
+    current = index.matching(*EXTENSIONS)
+    for rel in set(files) - set(current):
+        _remove_siblings(index.root, rel)
+        del files[rel]
+    stale = [rel for rel in current if _is_stale(index, rel, files.get(rel))]
+
+    if len(stale) >= POOL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(compress_file, [index.root] * len(stale), stale,
+                                    chunksize=4))
+    else:
+        results = [compress_file(index.root, rel) for rel in stale]
+
+    for rel, sizes in results:
+        files[rel] = {"hash": index.hash(rel), "sizes": sizes}
+    save_json(path, cache)
+
+    report_path = cache_path(index.root, REPORT)
+    previous = (load_json(report_path, {}) or {}).get("pages", {})
+    report = make_report(files, previous)
+    if results or not os.path.exists(report_path):
+        update_text(report_path, json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+    return {"compressed": len(results), "saved_percent": report["saved_percent"],
+            "grown": len(report["grown_since_last_report"])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write .br/.gz siblings and the compression report.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    print(build(index, args.jobs))
+    index.refresh()
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
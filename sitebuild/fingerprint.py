@@ -0,0 +1,214 @@
+"""Content-hashed asset names plus the service worker precache manifest.
+
+For every local stylesheet, script and image a page references, a copy
+named after its content hash is written next to the original
+(styles.css -> styles.3fa9c2d1e0.css) and the page is pointed at it.
+Because the name changes whenever the bytes do, service-worker.js can
+serve these files cache-first forever.
+
+Originals are kept, so anything this stage does not rewrite (CSS url()s,
+scripts loading other scripts, manifest icons) keeps working. Re-running
+maps hashed names back to their originals first, so it is safe on pages
+that were already fingerprinted.
+
+The mapping is written to precache-manifest.js, which the service worker
+imports:
+
+    self.PP_PRECACHE = {"version": ..., "assets": {...}, "precache": [...]}
+
+The copies and the manifest are committed along with the rewritten pages;
+a page pointing at a hashed name that was left out of git is a 404.
+"""
+import argparse
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+from . import index as site_index
+from .site import (SITE_ROOT, cache_path, hash_bytes, load_json, read_page,
+                   resolve, save_json, update_text, write_page)
+
+
+CACHE_NAME = "fingerprint.json"
+CACHE_VERSION = 1
+MANIFEST = "precache-manifest.js"
+HASH_LEN = 10
+
+ASSET_EXTENSIONS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".webp",
+                    ".avif", ".svg", ".ico")
+# Scripts and stylesheets are small and shared; images are cached on first use.
+PRECACHE_EXTENSIONS = (".css", ".js")
+# URLs that must never change.
+NEVER_HASH = {"service-worker.js", MANIFEST}
+
+TAG_RE = re.compile(r"<(?:script|link|img|source|video|audio|input)\b[^>]*>", re.I)
+ATTR_RE = re.compile(r'(\s(?:src|href|poster|srcset)\s*=\s*)(["\'])(.*?)\2', re.I | re.S)
+HASHED_RE = re.compile(r"^(.+)\.([0-9a-f]{%d})(\.[A-Za-z0-9]+)$" % HASH_LEN)
+MANIFEST_RE = re.compile(r"self\.PP_PRECACHE\s*=\s*(\{.*\});", re.S)
+
+
+def hashed_rel(index, rel):
+    stem, ext = posixpath.splitext(rel)
+    return f"{stem}.{index.hash(rel)[:HASH_LEN]}{ext}"
+
+
+def unhashed(rel):
+    """styles.3fa9c2d1e0.css -> styles.css, by name alone."""
+    match = HASHED_RE.match(rel)
+    return match.group(1) + match.group(3) if match else rel
+
+
+def original_rel(index, rel):
+    """Undo a previous run: styles.3fa9c2d1e0.css -> styles.css."""
+    original = unhashed(rel)
+    return original if original in index.files else rel
+
+
+def is_asset(index, rel):
+    return (rel is not None
+            and rel.lower().endswith(ASSET_EXTENSIONS)
+            and posixpath.basename(rel) not in NEVER_HASH
+            and rel in index.files)
+
+
+def _swap_basename(url, new_name):
+    parts = urlsplit(url)
+    folder = parts.path.rsplit("/", 1)[0] + "/" if "/" in parts.path else ""
+    return urlunsplit(parts._replace(path=folder + quote(new_name)))
+
+
+def rewrite_page(index, rel):
+    """Point one page at hashed assets; returns (new text, {original: hashed})."""
+    used = {}
+
+    def rewrite_url(url):
+        target = resolve(rel, url)
+        if target is None:
+            return url
+        target = original_rel(index, target)
+        if not is_asset(index, target):
+            return url
+        if HASHED_RE.match(target):
+            # already content-named (e.g. images.py variants): keep as is
+            used[target] = target
+            return url
+        used[target] = hashed_rel(index, target)
+        return _swap_basename(url, posixpath.basename(used[target]))
+
+    def rewrite_attr(match):
+        prefix, quote_char, value = match.groups()
+        if prefix.strip().lower().startswith("srcset"):
+            candidates = []
+            for candidate in value.split(","):
+                bits = candidate.strip().split(None, 1)
+                if bits:
+                    bits[0] = rewrite_url(bits[0])
+                    candidates.append(" ".join(bits))
+            value = ", ".join(candidates)
+        else:
+            value = rewrite_url(value)
+        return f"{prefix}{quote_char}{value}{quote_char}"
+
+    text = read_page(index.abspath(rel))
+    text = TAG_RE.sub(lambda m: ATTR_RE.sub(rewrite_attr, m.group(0)), text)
+    return text, used
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST), "r", encoding="utf-8") as f:
+            match = MANIFEST_RE.search(f.read())
+        return json.loads(match.group(1)) if match else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def render_manifest(assets):
+    urls = {"/" + quote(k): "/" + quote(v) for k, v in sorted(assets.items())}
+    manifest = {
+        "version": hash_bytes(json.dumps(urls, sort_keys=True).encode())[:HASH_LEN],
+        "assets": urls,
+        "precache": sorted(v for k, v in urls.items() if k.endswith(PRECACHE_EXTENSIONS)),
+    }
+    return (
+        "// Generated by sitebuild/fingerprint.py - do not edit by hand.\n"
+        f"self.PP_PRECACHE = {json.dumps(manifest, indent=2)};\n"
+    )
+
+
+def _is_stale(index, rel, entry):
+    if not entry or entry["hash"] != index.hash(rel):
+        return True
+    return any(not is_asset(index, orig) or hashed_rel(index, orig) != hashed
+               for orig, hashed in entry["assets"].items())
+
+
+def build(index):
+    path = cache_path(index.root, CACHE_NAME)
+    cache = load_json(path, {})
+    if cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "pages": {}}
+    pages = cache["pages"]
+
+    current = index.pages()
+    for rel in set(pages) - set(current):
+        del pages[rel]
+
+    rewritten = 0
+    for rel in current:
+        if not _is_stale(index, rel, pages.get(rel)):
+            continue
+        text, used = rewrite_page(index, rel)
+        if text != read_page(index.abspath(rel)):
+            write_page(index.abspath(rel), text)
+            rewritten += 1
+        pages[rel] = {
+            "hash": hash_bytes(text.encode("utf-8", "surrogateescape")),
+            "assets": used,
+        }
+
+    assets = {}
+    for entry in pages.values():
+        assets.update(entry["assets"])
+
+    copied = 0
+    for orig, hashed in assets.items():
+        target = index.abspath(hashed)
+        if not os.path.exists(target):
+            shutil.copyfile(index.abspath(orig), target)
+            copied += 1
+
+    previous = read_manifest(index.root).get("assets", {})
+    live = set(assets.values())
+    for old_url in previous.values():
+        old_rel = unquote(old_url.lstrip("/"))
+        if old_rel not in live and HASHED_RE.match(old_rel):
+            try:
+                os.remove(index.abspath(old_rel))
+            except FileNotFoundError:
+                pass
+
+    update_text(os.path.join(index.root, MANIFEST), render_manifest(assets))
+
+    save_json(path, cache)
+    return {"pages_rewritten": rewritten, "assets": len(assets), "copied": copied}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fingerprint assets and write the precache manifest.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    print(build(index))
+    index.refresh()
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
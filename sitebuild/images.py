@@ -0,0 +1,327 @@
+"""Responsive variants for local <img> sources (needs ``pip install Pillow``).
+
+For every PNG/JPEG a page shows through <img>, a fallback in the original
+format (at most 1920px wide) and, when a tag gets a srcset, resized WebP
+copies are written to a _responsive/ folder next to the source:
+
+    imgs/lesson/_responsive/diagram-640.3fa9c2d1e0.webp
+
+and a tag such as <img src="diagram.png" width="640" height="360"> becomes
+
+    <img width="640" height="360" src="_responsive/diagram-1280.3fa9c2d1e0.png"
+         srcset="..-320..webp 320w, ..-640..webp 640w, ..-1280..webp 1280w"
+         sizes="(max-width: 640px) 100vw, 640px"
+         data-pp-src="diagram.png" data-pp-auto="sizes">
+
+``sizes`` comes from the author's own ``sizes`` or ``width``. A tag with
+neither only gets the fallback as src, since a guessed ``sizes`` would make
+the browser pick by viewport and ignore the page's CSS. data-pp-src keeps
+the original so the step can be re-run, and data-pp-auto lists attributes
+this step added (author-written ones are kept). Variant names carry the
+source hash, so a cached variant is reused until the source changes. Tags
+that already have their own srcset, or are marked data-pp-no-responsive,
+are left alone, as are tags whose image Pillow cannot read. Open Graph
+images are only read by crawlers that want the full PNG, so they are not
+touched.
+"""
+import argparse
+import os
+import posixpath
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+from . import index as site_index
+from .site import (SITE_ROOT, cache_path, hash_bytes, load_json, read_page,
+                   resolve, save_json, write_page)
+
+
+CACHE_NAME = "images.json"
+CACHE_VERSION = 4
+VARIANT_DIR = "_responsive"
+
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+WIDTHS = (320, 640, 960, 1280, 1920)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+# Bump when encoder settings change so old variants are regenerated.
+SETTINGS = f"v1:{WIDTHS}:{WEBP_QUALITY}:{JPEG_QUALITY}"
+
+IMG_RE = re.compile(r"<img\b[^>]*>", re.I | re.S)
+ATTR_RE = re.compile(r'\s([a-zA-Z-]+)\s*=\s*(["\'])(.*?)\2', re.S)
+
+
+def variant_key(digest):
+    return hash_bytes(f"{digest}:{SETTINGS}".encode())[:10]
+
+
+def plan_widths(width):
+    widths = [w for w in WIDTHS if w < width]
+    widths.append(min(width, WIDTHS[-1]))
+    return widths
+
+
+def make_variants(root, rel, digest, srcset=True):
+    """Write the variants for one source; returns (rel, info) for the cache.
+
+    The WebP widths are only made when some tag gets a srcset (``srcset``);
+    otherwise the fallback is the one file written.
+
+    A source Pillow cannot read gets ``{"hash", "error"}`` instead, so one
+    broken file does not stop the build and is not retried until it changes.
+    """
+    try:
+        return _make_variants(root, rel, digest, srcset)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return rel, {"hash": digest, "error": f"{type(e).__name__}: {e}"}
+
+
+def _make_variants(root, rel, digest, srcset):
+    folder, name = posixpath.split(rel)
+    stem, ext = posixpath.splitext(name)
+    out_dir = posixpath.join(folder, VARIANT_DIR)
+    key = variant_key(digest)
+    os.makedirs(os.path.join(root, *out_dir.split("/")), exist_ok=True)
+
+    with Image.open(os.path.join(root, *rel.split("/"))) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    width, height = image.size
+    has_alpha = image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info)
+
+    widths = plan_widths(width)
+    variants = []
+    for w in widths if srcset else []:
+        h = max(1, round(height * w / width))
+        resized = image if w == width else image.resize((w, h), Image.LANCZOS)
+        webp_rel = posixpath.join(out_dir, f"{stem}-{w}.{key}.webp")
+        resized.save(os.path.join(root, *webp_rel.split("/")), "WEBP",
+                     quality=WEBP_QUALITY, method=6)
+        variants.append([w, h, webp_rel])
+
+    fallback_w = widths[-1]
+    fallback_h = max(1, round(height * fallback_w / width))
+    fallback = image if fallback_w == width else image.resize(
+        (fallback_w, fallback_h), Image.LANCZOS)
+    if has_alpha or ext.lower() == ".png":
+        fallback_rel = posixpath.join(out_dir, f"{stem}-{fallback_w}.{key}.png")
+        fallback.save(os.path.join(root, *fallback_rel.split("/")), "PNG", optimize=True)
+    else:
+        fallback_rel = posixpath.join(out_dir, f"{stem}-{fallback_w}.{key}.jpg")
+        fallback.convert("RGB").save(os.path.join(root, *fallback_rel.split("/")), "JPEG",
+                                     quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+    return rel, {
+        "hash": digest,
+        "width": width,
+        "height": height,
+        "variants": variants,
+        "fallback": fallback_rel,
+        "fallback_size": [fallback_w, fallback_h],
+    }
+
+
+def _relative(page_rel, target_rel):
+    return quote(posixpath.relpath(target_rel, posixpath.dirname(page_rel) or "."))
+
+
+def _tag_source(rel, tag, attrs):
+    """The source an <img> tag wants variants of, or None if it opts out."""
+    if "data-pp-no-responsive" in tag.lower():
+        return None
+    if "srcset" in attrs and "data-pp-src" not in attrs:
+        return None
+    return resolve(rel, attrs.get("data-pp-src") or attrs.get("src"))
+
+
+def _owned(attrs):
+    """Attributes an earlier run added; "1" is what older runs wrote."""
+    owned = attrs.get("data-pp-auto", "").split()
+    return ["width", "height", "sizes"] if owned == ["1"] else owned
+
+
+def _planned_sizes(attrs):
+    """The sizes a tag gets, or None when it only gets the fallback as src."""
+    owned = _owned(attrs)
+    sizes = None if "sizes" in owned else attrs.get("sizes")
+    if sizes or "width" in owned or ("width" not in attrs and "height" not in attrs):
+        return sizes
+    width = attrs.get("width", "").strip()
+    return f"(max-width: {width}px) 100vw, {width}px" if width.isdigit() else None
+
+
+def rewrite_page(index, rel, sources):
+    """Rewrite the <img> tags of one page; returns (text, [source rels])."""
+    used = []
+
+    def rewrite(match):
+        tag = match.group(0)
+        attrs = {k.lower(): v for k, _, v in ATTR_RE.findall(tag)}
+        source = _tag_source(rel, tag, attrs)
+        info = sources.get(source)
+        if info is None:
+            return tag
+        # Listed even when unreadable, so fixing the image re-plans the page.
+        used.append(source)
+        if "error" in info:
+            return tag
+
+        # Attributes we added ourselves are refreshed on every run; ones the
+        # author wrote are kept.
+        owned = _owned(attrs)
+        sizes = _planned_sizes(attrs)
+        fallback_w, fallback_h = info["fallback_size"]
+        new = {
+            "src": _relative(rel, info["fallback"]),
+            "data-pp-src": attrs.get("data-pp-src") or attrs.get("src"),
+        }
+        auto = []
+        if "width" in owned or ("width" not in attrs and "height" not in attrs):
+            new.update(width=str(fallback_w), height=str(fallback_h))
+            auto += ["width", "height"]
+        if sizes and sizes != ("sizes" not in owned and attrs.get("sizes")):
+            auto.append("sizes")
+        if sizes and info["variants"]:
+            new["srcset"] = ", ".join(f"{_relative(rel, v)} {w}w"
+                                      for w, _, v in info["variants"])
+            new["sizes"] = sizes
+        if auto:
+            new["data-pp-auto"] = " ".join(auto)
+
+        replaced = set(new) | {"srcset", "sizes", "data-pp-auto"}
+        body = ATTR_RE.sub(
+            lambda m: "" if m.group(1).lower() in replaced else m.group(0), tag[4:].rstrip("/>"))
+        extra = "".join(f' {k}="{v}"' for k, v in new.items())
+        closing = "/>" if tag.rstrip().endswith("/>") else ">"
+        return f"<img{body.rstrip()}{extra}{closing}"
+
+    text = IMG_RE.sub(rewrite, read_page(index.abspath(rel)))
+    return text, used
+
+
+def _page_sources(index, rel):
+    """Local image sources referenced by <img> tags in one page, mapped to
+    whether any of those tags gets a srcset."""
+    found = {}
+    for tag in IMG_RE.findall(read_page(index.abspath(rel))):
+        attrs = {k.lower(): v for k, _, v in ATTR_RE.findall(tag)}
+        source = _tag_source(rel, tag, attrs)
+        if (source and source.lower().endswith(SOURCE_EXTENSIONS)
+                and f"/{VARIANT_DIR}/" not in f"/{source}" and source in index.files):
+            found[source] = found.get(source, False) or _planned_sizes(attrs) is not None
+    return found
+
+
+def _is_stale(index, rel, entry, sources):
+    if not entry or entry["hash"] != index.hash(rel):
+        return True
+    return any(sources.get(s, {}).get("hash") != index.hash(s) for s in entry["sources"])
+
+
+def _remove_variants(root, info):
+    if "error" in info:
+        return
+    for rel in [v[2] for v in info["variants"]] + [info["fallback"]]:
+        try:
+            os.remove(os.path.join(root, *rel.split("/")))
+        except FileNotFoundError:
+            pass
+
+
+def build(index, jobs=None):
+    if Image is None:
+        return {"skipped": "Pillow is not installed"}
+
+    path = cache_path(index.root, CACHE_NAME)
+    cache = load_json(path, {})
+    if cache.get("version") != CACHE_VERSION:
+        # Page entries are re-planned; variants already made stay usable.
+        cache = {"version": CACHE_VERSION, "pages": {}, "sources": cache.get("sources", {})}
+    pages, sources = cache["pages"], cache["sources"]
+
+    current = index.pages()
+    for rel in set(pages) - set(current):
+        del pages[rel]
+
+    stale_pages = {}
+    wanted, with_srcset = set(), set()
+    for rel in current:
+        entry = pages.get(rel)
+        if _is_stale(index, rel, entry, sources):
+            found = _page_sources(index, rel)
+            stale_pages[rel] = sorted(s for s, srcset in found.items() if srcset)
+            wanted |= set(found)
+            with_srcset |= set(stale_pages[rel])
+        else:
+            wanted |= set(entry["sources"])
+            with_srcset |= set(entry["srcset"])
+
+    def needs_work(s):
+        info = sources.get(s, {})
+        if info.get("hash") != index.hash(s):
+            return True
+        if "error" in info:
+            return False
+        return (not os.path.exists(index.abspath(info["fallback"]))
+                or bool(info["variants"]) != (s in with_srcset))
+
+    todo = [s for s in sorted(wanted) if needs_work(s)]
+    for s in todo:
+        if s in sources:
+            _remove_variants(index.root, sources.pop(s))
+
+    args = ([index.root] * len(todo), todo, [index.hash(s) for s in todo],
+            [s in with_srcset for s in todo])
+    if len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(make_variants, *args))
+    else:
+        results = [make_variants(*a) for a in zip(*args)]
+    failed = 0
+    for rel, info in results:
+        sources[rel] = info
+        if "error" in info:
+            print(f"images: skipping {rel}: {info['error']}", file=sys.stderr)
+            failed += 1
+
+    rewritten = 0
+    for rel, srcset in stale_pages.items():
+        text, used = rewrite_page(index, rel, sources)
+        if text != read_page(index.abspath(rel)):
+            write_page(index.abspath(rel), text)
+            rewritten += 1
+        pages[rel] = {"hash": hash_bytes(text.encode("utf-8", "surrogateescape")),
+                      "sources": sorted(set(used)), "srcset": srcset}
+
+    for rel in set(sources) - wanted:
+        _remove_variants(index.root, sources.pop(rel))
+
+    save_json(path, cache)
+    return {"sources": len(sources), "generated": len(results) - failed,
+            "failed": failed, "pages_rewritten": rewritten}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate responsive image variants and srcset markup.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+    if Image is None:
+        parser.error("Pillow is required: pip install Pillow")
+
+    index = site_index.load(args.root)
+    print(build(index, args.jobs))
+    index.refresh()
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Inline the shared partials into every page at build time.
+
+Pages load /headsection.html, /header.html and /footer.html at runtime
+through assets/js/pp-includes.js, which costs several round trips before
+first paint. This stage writes the partials straight into each page:
+
+    <div data-pp-include="/footer.html" data-pp-slot="footer" data-pp-loaded="1">
+    <!--pp-include-->...footer.html...<!--/pp-include--></div>
+
+and, for pages using the site loader, the head partial goes in front of
+</head> with data-pp-head-loaded="1" on <html>. The loader skips slots
+that are already marked, so it only does work on pages this step missed.
+
+Re-running is safe: inlined blocks are replaced, not duplicated. The
+cache in .ppbuild/includes.json records which partials every page uses,
+so editing footer.html only rewrites the pages that include it.
+"""
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from . import index as site_index
+from .fingerprint import unhashed
+from .site import (SITE_ROOT, cache_path, hash_bytes, load_json, read_page,
+                   resolve, save_json, write_page)
+
+
+CACHE_NAME = "includes.json"
+CACHE_VERSION = 2
+
+LOADER = "assets/js/pp-includes.js"
+HEADSECTION = "headsection.html"
+
+# Below this many pages a process pool costs more than it saves.
+POOL_MIN_PAGES = 16
+
+SLOT_RE = re.compile(
+    r'(<div\b[^>]*?\bdata-pp-include="([^"]+)"[^>]*>)'
+    r'(?:\s*|<!--pp-include-->.*?<!--/pp-include-->)</div>',
+    re.S | re.I,
+)
+LOADED_ATTR_RE = re.compile(r'\s+data-pp-loaded="[^"]*"', re.I)
+SCRIPT_SRC_RE = re.compile(r'<script\b[^>]*\bsrc="([^"]+)"', re.I)
+HEAD_BLOCK_RE = re.compile(r"<!--pp-head-->.*?<!--/pp-head-->\n?", re.S)
+HEAD_END_RE = re.compile(r"</head\s*>", re.I)
+HTML_TAG_RE = re.compile(r"<html\b[^>]*>", re.I)
+
+
+def is_loader(page_rel, src):
+    """True when ``src`` in ``page_rel`` is the loader, fingerprinted or not."""
+    target = resolve(page_rel, src)
+    return target is not None and unhashed(target) == LOADER
+
+
+@lru_cache(maxsize=None)
+def _partial(path):
+    """(text, file hash) per worker process; a fresh pool is used every build."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    text = raw.decode("utf-8", "surrogateescape").replace("\r\n", "\n")
+    return text.strip("\n"), hash_bytes(raw)
+
+
+def inline_page(root, rel):
+    """Inline partials into one page.
+
+    Returns (rel, rewritten, page_hash, deps) where deps maps every partial
+    the page uses to the partial's content hash.
+    """
+    path = os.path.join(root, *rel.split("/"))
+    original = read_page(path)
+    deps = {}
+
+    def partial(partial_rel):
+        text, digest = _partial(os.path.join(root, *partial_rel.split("/")))
+        deps[partial_rel] = digest
+        return text
+
+    def fill_slot(match):
+        open_tag, url = match.group(1), match.group(2)
+        partial_rel = resolve(rel, url)
+        if partial_rel is None or not os.path.isfile(os.path.join(root, partial_rel)):
+            return match.group(0)
+        open_tag = LOADED_ATTR_RE.sub("", open_tag)
+        open_tag = open_tag[:-1] + ' data-pp-loaded="1">'
+        return f"{open_tag}<!--pp-include-->\n{partial(partial_rel)}\n<!--/pp-include--></div>"
+
+    text = SLOT_RE.sub(fill_slot, original)
+
+    uses_loader = any(is_loader(rel, src) for src in SCRIPT_SRC_RE.findall(text))
+    if uses_loader and os.path.isfile(os.path.join(root, HEADSECTION)):
+        block = f"<!--pp-head-->\n{partial(HEADSECTION)}\n<!--/pp-head-->\n"
+        text = HEAD_BLOCK_RE.sub("", text)
+        text, inserted = HEAD_END_RE.subn(lambda m: block + m.group(0), text, count=1)
+        html_tag = HTML_TAG_RE.search(text)
+        if inserted and html_tag and "data-pp-head-loaded" not in html_tag.group(0):
+            tag = html_tag.group(0)
+            text = text.replace(tag, tag[:-1] + ' data-pp-head-loaded="1">', 1)
+
+    rewritten = text != original
+    if rewritten:
+        write_page(path, text)
+    return rel, rewritten, hash_bytes(text.encode("utf-8", "surrogateescape")), deps
+
+
+def _is_stale(index, rel, entry):
+    if not entry or entry["hash"] != index.hash(rel):
+        return True
+    return any(index.hash(dep) != digest for dep, digest in entry["deps"].items())
+
+
+def build(index, jobs=None):
+    path = cache_path(index.root, CACHE_NAME)
+    cache = load_json(path, {})
+    if cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "pages": {}}
+    pages = cache["pages"]
+
+    current = index.pages()
+    for rel in set(pages) - set(current):
+        del pages[rel]
+    stale = [rel for rel in current if _is_stale(index, rel, pages.get(rel))]
+
+    if len(stale) >= POOL_MIN_PAGES:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(inline_page, [index.root] * len(stale), stale,
+                                    chunksize=8))
+    else:
+        _partial.cache_clear()
+        results = [inline_page(index.root, rel) for rel in stale]
+
+    rewritten = 0
+    for rel, changed, digest, deps in results:
+        pages[rel] = {"hash": digest, "deps": deps}
+        rewritten += changed
+
+    save_json(path, cache)
+    return {"checked": len(stale), "rewritten": rewritten}
+
+
+def dependents(index, partial_rel):
+    """Pages that currently include ``partial_rel`` (from the cache)."""
+    cache = load_json(cache_path(index.root, CACHE_NAME), {})
+    return sorted(rel for rel, entry in cache.get("pages", {}).items()
+                  if partial_rel in entry["deps"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inline header/footer/head partials into pages.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--users", metavar="PARTIAL",
+                        help="only list the pages that include PARTIAL, e.g. footer.html")
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    if args.users:
+        print("\n".join(dependents(index, args.users)))
+    else:
+        print(build(index, args.jobs))
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Incremental index of every file in the site.
+
+The manifest in .ppbuild/index.json remembers, for every file, its size,
+mtime and content hash, plus the listing of every directory. On refresh:
+
+- a directory whose own mtime has not changed is not listed again, its
+  cached entries are only stat()ed;
+- a file is only re-read and re-hashed when its size or mtime changed;
+- ``lastmod`` only moves when the content hash actually changes, so a
+  ``touch`` does not bump every sitemap date;
+- a file new to the manifest (every file, on a fresh checkout) starts from
+  the date of the last commit that touched it, or from its mtime when it is
+  untracked or has uncommitted changes.
+"""
+import datetime
+import os
+import subprocess
+from collections import namedtuple
+
+from .site import SITE_ROOT, SKIP_DIRS, cache_path, hash_file, load_json, save_json
+
+
+MANIFEST_NAME = "index.json"
+MANIFEST_VERSION = 1
+
+Delta = namedtuple("Delta", "added modified removed")
+
+
+def _lastmod(mtime_ns):
+    stamp = datetime.datetime.fromtimestamp(
+        mtime_ns / 1e9, tz=datetime.timezone.utc)
+    return stamp.date().isoformat()
+
+
+def _git_lastmods(root):
+    """Last commit date of every committed, unmodified file under ``root``."""
+    def git(*args):
+        return subprocess.run(
+            ["git", "-C", root, "-c", "core.quotepath=off", *args],
+            capture_output=True, text=True, encoding="utf-8", check=True,
+        ).stdout
+
+    try:
+        log = git("log", "--format=%x01%ct", "--name-only", "--relative",
+                  "--no-renames", "--", ".")
+        dirty = set(git("diff", "--name-only", "--relative", "HEAD", "--").splitlines())
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+
+    dates, stamp = {}, None
+    for line in log.splitlines():
+        if line.startswith("\x01"):
+            stamp = _lastmod(int(line[1:]) * 10**9)
+        elif line and line not in dirty:
+            # The log is newest first, so the first date seen is the last one.
+            dates.setdefault(line, stamp)
+    return dates
+
+
+class SiteIndex:
+    def __init__(self, root=SITE_ROOT):
+        self.root = os.path.abspath(root)
+        self.manifest_path = cache_path(self.root, MANIFEST_NAME)
+
+        data = load_json(self.manifest_path, {})
+        if data.get("version") != MANIFEST_VERSION:
+            data = {}
+        self.dirs = data.get("dirs", {})
+        self.files = data.get("files", {})
+        self.dirty = False
+        self._commit_dates = None
+
+    # ---------- scanning ----------
+    def _first_lastmod(self, rel, mtime_ns):
+        if self._commit_dates is None:
+            self._commit_dates = _git_lastmods(self.root)
+        return self._commit_dates.get(rel) or _lastmod(mtime_ns)
+
+    def _list_dir(self, rel_dir, abs_dir, dir_mtime_ns):
+        cached = self.dirs.get(rel_dir)
+        if cached and cached["mtime_ns"] == dir_mtime_ns:
+            files = {}
+            for name in cached["files"]:
+                try:
+                    files[name] = os.stat(os.path.join(abs_dir, name))
+                except FileNotFoundError:
+                    pass
+            return files, cached["dirs"]
+
+        files, subdirs = {}, []
+        with os.scandir(abs_dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.name)
+                elif entry.is_file():
+                    files[entry.name] = entry.stat()
+
+        self.dirs[rel_dir] = {
+            "mtime_ns": dir_mtime_ns,
+            "files": sorted(files),
+            "dirs": sorted(subdirs),
+        }
+        self.dirty = True
+        return files, subdirs
+
+    def refresh(self):
+        """Bring the manifest up to date and return what changed."""
+        seen_files, seen_dirs = set(), set()
+        added, modified = [], []
+
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            try:
+                dir_mtime_ns = os.stat(abs_dir).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen_dirs.add(rel_dir)
+
+            files, subdirs = self._list_dir(rel_dir, abs_dir, dir_mtime_ns)
+            prefix = rel_dir + "/" if rel_dir else ""
+
+            for name, st in files.items():
+                rel = prefix + name
+                seen_files.add(rel)
+                old = self.files.get(rel)
+                if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                    continue
+
+                digest = hash_file(os.path.join(abs_dir, name))
+                if old and old["hash"] == digest:
+                    lastmod = old["lastmod"]
+                elif old:
+                    lastmod = _lastmod(st.st_mtime_ns)
+                    modified.append(rel)
+                else:
+                    lastmod = self._first_lastmod(rel, st.st_mtime_ns)
+                    added.append(rel)
+
+                self.files[rel] = {
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "hash": digest,
+                    "lastmod": lastmod,
+                }
+                self.dirty = True
+
+            stack.extend(prefix + d for d in subdirs)
+
+        removed = sorted(set(self.files) - seen_files)
+        for rel in removed:
+            del self.files[rel]
+        for rel_dir in set(self.dirs) - seen_dirs:
+            del self.dirs[rel_dir]
+        if removed:
+            self.dirty = True
+
+        return Delta(sorted(added), sorted(modified), removed)
+
+    def save(self):
+        if not self.dirty:
+            return
+        save_json(self.manifest_path, {
+            "version": MANIFEST_VERSION,
+            "dirs": self.dirs,
+            "files": self.files,
+        })
+        self.dirty = False
+
+    # ---------- queries ----------
+    def abspath(self, rel):
+        return os.path.join(self.root, *rel.split("/"))
+
+    def hash(self, rel):
+        entry = self.files.get(rel)
+        return entry["hash"] if entry else None
+
+    def lastmod(self, rel):
+        return self.files[rel]["lastmod"]
+
+    def matching(self, *extensions):
+        extensions = tuple(e.lower() for e in extensions)
+        return sorted(rel for rel in self.files if rel.lower().endswith(extensions))
+
+    def pages(self):
+        return self.matching(".html", ".htm")
+
+
+def load(root=SITE_ROOT):
+    """Open and refresh the index for ``root``; callers save() when done."""
+    index = SiteIndex(root)
+    index.refresh()
+    return index
@@ -0,0 +1,274 @@
+"""Check local links and assets, and find files nothing refers to.
+
+Every page is parsed once with a streaming HTMLParser (in a process pool
+when many changed) into a reference graph: page -> (kind, url, target,
+line). Stylesheets add their url()/@import references, and scripts add
+any quoted string that looks like a file name, since pages often fetch
+JSON or images from JavaScript. Results are cached per content hash, so a
+re-check only parses files that changed.
+
+.ppbuild/link-report.json lists:
+
+- broken: local href/src targets that do not exist (case-sensitive, as on
+  the live host);
+- unreferenced: files no page, stylesheet or script mentions and that are
+  not entry points (sitemap pages, robots.txt, ...). These are still
+  deployed, so they are candidates for removal. Script references are
+  guessed from string literals, so treat this list as a hint.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import posixpath
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+from . import index as site_index
+from .fingerprint import MANIFEST, original_rel
+from .includes import HEADSECTION
+from .search import OUTPUT_DIR as SEARCH_DIR
+from .site import (SITE_ROOT, cache_path, load_json, read_page, resolve,
+                   save_json, update_text)
+from .sitemap import is_listed
+
+
+CACHE_NAME = "linkcheck.json"
+CACHE_VERSION = 2
+REPORT = "link-report.json"
+POOL_MIN_FILES = 16
+
+# Files that are reached without a link from a page.
+ENTRY_POINTS = [
+    "CNAME", "robots.txt", "ads.txt", "sitemap.xml", "BingSiteAuth.xml",
+    "google*.html", "404.html", "manifest.webmanifest", "service-worker.js",
+    "*.md", "*.txt", ".gitignore",
+    "*-report.json", "*_report.json", "*-baseline.json", "*.gz", "*.br",
+    # written by the build and fetched by scripts, not linked from pages
+    MANIFEST, f"{SEARCH_DIR}/*", "assets/js/pp-search.js",
+]
+
+# (tag, attribute) -> kind of reference. Kinds tell pageweight.py what a
+# browser actually fetches: one candidate of a "srcset", never an "original"
+# (data-pp-src), "meta" image or "inlined" partial.
+TAG_ATTRS = {
+    ("a", "href"): "link",
+    ("area", "href"): "link",
+    ("iframe", "src"): "frame",
+    ("script", "src"): "script",
+    ("img", "src"): "image",
+    ("img", "srcset"): "srcset",
+    ("img", "data-pp-src"): "original",
+    ("source", "src"): "media",
+    ("source", "srcset"): "srcset",
+    ("video", "src"): "media",
+    ("video", "poster"): "image",
+    ("audio", "src"): "media",
+    ("track", "src"): "media",
+    ("embed", "src"): "media",
+    ("object", "data"): "media",
+    ("input", "src"): "image",
+    ("div", "data-pp-include"): "include",
+}
+LINK_RELS = {
+    "stylesheet": "stylesheet",
+    "icon": "image",
+    "shortcut icon": "image",
+    "apple-touch-icon": "image",
+    "manifest": "asset",
+    "preload": "asset",
+    "modulepreload": "script",
+    "canonical": "link",
+}
+META_ASSETS = {"og:image", "twitter:image"}
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)|@import\s+(['"])([^'"]+)\3""", re.I)
+JS_PATH_RE = re.compile(r"""['"`]([\w./ -]+\.(?:json|html|css|js|png|jpe?g|gif|webp|svg|mp3|mp4|wav|txt|csv|pdf))['"`]""", re.I)
+
+
+class RefCollector(HTMLParser):
+    """Streams one page and records every local reference with its line."""
+
+    def __init__(self, rel):
+        super().__init__(convert_charrefs=True)
+        self.rel = rel
+        self.refs = []
+        self._in_style = False
+
+    def add(self, kind, url):
+        url = (url or "").strip()
+        target = resolve(self.rel, url)
+        if target is not None:
+            self.refs.append([kind, url, target, self.getpos()[0]])
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        for (t, attr), kind in TAG_ATTRS.items():
+            if t == tag and attrs.get(attr):
+                if attr.endswith("srcset"):
+                    for candidate in attrs[attr].split(","):
+                        bits = candidate.split()
+                        if bits:
+                            self.add(kind, bits[0])
+                elif kind == "include" and attrs.get("data-pp-loaded") == "1":
+                    self.add("inlined", attrs[attr])
+                else:
+                    self.add(kind, attrs[attr])
+        if tag == "link" and attrs.get("href"):
+            kind = LINK_RELS.get((attrs.get("rel") or "").lower().strip())
+            if kind:
+                self.add(kind, attrs["href"])
+        elif tag == "meta" and (attrs.get("property") or attrs.get("name")) in META_ASSETS:
+            self.add("meta", attrs.get("content"))
+        elif tag == "html" and attrs.get("data-pp-head-loaded") == "1":
+            self.add("inlined", "/" + HEADSECTION)
+        elif tag == "style":
+            self._in_style = True
+        if attrs.get("style"):
+            self._css_refs(attrs["style"])
+
+    def handle_endtag(self, tag):
+        if tag == "style":
+            self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self._css_refs(data)
+
+    def _css_refs(self, css):
+        for match in CSS_URL_RE.finditer(css):
+            url = match.group(2) or match.group(4)
+            if not url.startswith("data:"):
+                self.add("css", url)
+
+
+def scan_file(root, rel):
+    """Return (rel, refs) for one page, stylesheet or script."""
+    path = os.path.join(root, *rel.split("/"))
+    lower = rel.lower()
+    if lower.endswith((".html", ".htm")):
+        collector = RefCollector(rel)
+        collector.feed(read_page(path))
+        collector.close()
+        return rel, collector.refs
+
+    text = read_page(path)
+    refs = []
+    if lower.endswith(".css"):
+        for match in CSS_URL_RE.finditer(text):
+            url = match.group(2) or match.group(4)
+            target = resolve(rel, url) if not url.startswith("data:") else None
+            if target:
+                refs.append(["css", url, target, text.count("\n", 0, match.start()) + 1])
+    else:
+        # A URL in a script resolves against whichever page runs it, so only
+        # the string is kept and check() matches it by file name.
+        for match in JS_PATH_RE.finditer(text):
+            refs.append(["script-string", match.group(1), None,
+                         text.count("\n", 0, match.start()) + 1])
+    return rel, refs
+
+
+def scan(index, jobs=None):
+    """Update the cached reference graph; returns ({rel: refs}, files parsed)."""
+    path = cache_path(index.root, CACHE_NAME)
+    cache = load_json(path, {})
+    if cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "files": {}}
+    files = cache["files"]
+
+    current = index.matching(".html", ".htm", ".css", ".js")
+    for rel in set(files) - set(current):
+        del files[rel]
+    stale = [rel for rel in current
+             if files.get(rel, {}).get("hash") != index.hash(rel)]
+
+    if len(stale) >= POOL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(scan_file, [index.root] * len(stale), stale, chunksize=8))
+    else:
+        results = [scan_file(index.root, rel) for rel in stale]
+    for rel, refs in results:
+        files[rel] = {"hash": index.hash(rel), "refs": refs}
+
+    if results:
+        save_json(path, cache)
+    return {rel: entry["refs"] for rel, entry in files.items()}, len(results)
+
+
+def exists(index, target):
+    return (target in index.files
+            or posixpath.join(target, "index.html") in index.files)
+
+
+def check(index, graph):
+    broken = []
+    referenced = set()
+    script_names = set()
+
+    for rel, refs in graph.items():
+        for kind, url, target, line in refs:
+            if target is None:
+                script_names.add(posixpath.basename(url))
+                continue
+            if exists(index, target):
+                referenced.add(target)
+                referenced.add(original_rel(index, target))
+                referenced.add(posixpath.join(target, "index.html"))
+            elif not rel.endswith((".css", ".js")) or kind == "css":
+                broken.append({"page": rel, "line": line, "kind": kind,
+                               "url": url, "target": target})
+
+    unreferenced = []
+    for rel, entry in sorted(index.files.items()):
+        if rel in referenced or is_entry_point(rel):
+            continue
+        if posixpath.basename(rel) in script_names:
+            continue
+        unreferenced.append({"file": rel, "bytes": entry["size"]})
+    unreferenced.sort(key=lambda item: -item["bytes"])
+    return broken, unreferenced
+
+
+def is_entry_point(rel):
+    if rel.lower().endswith((".html", ".htm")) and is_listed(rel):
+        return True
+    return any(fnmatch.fnmatch(rel, pattern) or fnmatch.fnmatch(posixpath.basename(rel), pattern)
+               for pattern in ENTRY_POINTS)
+
+
+def build(index, jobs=None):
+    graph, parsed = scan(index, jobs)
+    broken, unreferenced = check(index, graph)
+    report = {
+        "files_indexed": len(index.files),
+        "pages_checked": sum(1 for rel in graph if rel.endswith((".html", ".htm"))),
+        "broken_count": len(broken),
+        "unreferenced_count": len(unreferenced),
+        "unreferenced_bytes": sum(item["bytes"] for item in unreferenced),
+        "broken": broken,
+        "unreferenced": unreferenced,
+    }
+    update_text(cache_path(index.root, REPORT),
+                json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+    return {"parsed": parsed, "broken": len(broken), "unreferenced": len(unreferenced)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check local links/assets and list unreferenced files.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--strict", action="store_true", help="exit 1 when a broken link is found")
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    summary = build(index, args.jobs)
+    print(summary)
+    index.save()
+    return 1 if args.strict and summary["broken"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Page weight budget: bytes, requests and critical-path depth per page.
+
+Uses the reference graph from linkcheck.py to work out what a browser
+fetches for each listed page: the page, its stylesheets (and what they
+url()), scripts, images, icons and manifest, plus the partials that
+pp-includes.js still has to fetch for slots the includes stage did not
+inline. Depth is the longest chain of dependent fetches: the page is 1, a
+stylesheet 2, a font it loads 3, and a partial fetched by the loader
+script sits one level below that script. Only local files are counted.
+
+    python -m sitebuild.pageweight --record   # write page-weight-baseline.json
+    python -m sitebuild.pageweight            # compare; exit 1 over budget
+
+A page is over budget when its bytes grow more than --tolerance over the
+committed baseline, or it needs more requests or a deeper chain than
+recorded. Every page, including ones the baseline has never seen, must
+also stay under --max-bytes and --max-requests; pages already over a
+ceiling when the baseline was recorded are held to their baseline instead.
+.ppbuild/page-weight-report.json holds the current numbers and the
+offenders, and python -m sitebuild exits non-zero when there are any.
+"""
+import argparse
+import json
+import os
+import sys
+
+from . import index as site_index
+from .fingerprint import original_rel
+from .includes import HEADSECTION, LOADER
+from .linkcheck import scan
+from .site import SITE_ROOT, cache_path, load_json, save_json, update_text
+from .sitemap import is_listed
+
+
+BASELINE = "page-weight-baseline.json"
+REPORT = "page-weight-report.json"
+TOLERANCE = 0.10
+# Absolute ceilings for every page, recorded or not.
+MAX_BYTES = 2 * 1024 * 1024
+MAX_REQUESTS = 20
+
+# Reference kinds the browser fetches while loading the page.
+FETCHED = {"stylesheet", "script", "image", "asset", "css", "frame", "include"}
+# Fetched files whose own references are followed.
+FOLLOWED = (".css", ".html", ".htm")
+
+
+def fetched_file(index, target):
+    if target in index.files:
+        return target
+    target = target.rstrip("/") + "/index.html"
+    return target if target in index.files else None
+
+
+def page_requests(index, graph, page):
+    """Return {rel: depth} for everything loading ``page`` fetches."""
+    depths = {page: 1}
+    queue = [page]
+    while queue:
+        rel = queue.pop(0)
+        refs = graph.get(rel, [])
+        wanted = []
+        for kind, _, target, _ in refs:
+            if kind in FETCHED and target is not None:
+                wanted.append((kind, target))
+        # The loader fetches the head partial unless it was inlined.
+        if any(kind == "script" and original_rel(index, target) == LOADER
+               for kind, target in wanted):
+            if not any(kind == "inlined" and target == HEADSECTION for kind, _, target, _ in refs):
+                wanted.append(("include", HEADSECTION))
+
+        for kind, target in wanted:
+            found = fetched_file(index, target)
+            if found is None:
+                continue
+            depth = depths[rel] + (2 if kind == "include" else 1)
+            if found in depths and depths[found] <= depth:
+                continue
+            depths[found] = depth
+            if found.lower().endswith(FOLLOWED) and kind != "frame":
+                queue.append(found)
+    return depths
+
+
+def transfer_size(index, rel):
+    """Smallest of the file and its precompressed siblings."""
+    sizes = [index.files[rel]["size"]]
+    sizes += [index.files[rel + s]["size"] for s in (".br", ".gz") if rel + s in index.files]
+    return min(sizes)
+
+
+def measure(index):
+    graph, _ = scan(index)
+    pages = {}
+    for rel in index.pages():
+        if not is_listed(rel):
+            continue
+        depths = page_requests(index, graph, rel)
+        pages[rel] = {
+            "bytes": sum(index.files[r]["size"] for r in depths),
+            "transfer_bytes": sum(transfer_size(index, r) for r in depths),
+            "requests": len(depths),
+            "depth": max(depths.values()),
+        }
+    return pages
+
+
+def over_budget(pages, baseline, tolerance=TOLERANCE, max_bytes=MAX_BYTES,
+                max_requests=MAX_REQUESTS):
+    problems = []
+    for rel, now in sorted(pages.items()):
+        before = baseline.get(rel)
+        reasons = []
+        if before:
+            if now["bytes"] > before["bytes"] * (1 + tolerance):
+                reasons.append(f"bytes {before['bytes']} -> {now['bytes']}")
+            if now["requests"] > before["requests"]:
+                reasons.append(f"requests {before['requests']} -> {now['requests']}")
+            if now["depth"] > before["depth"]:
+                reasons.append(f"depth {before['depth']} -> {now['depth']}")
+        if now["bytes"] > max_bytes and not (before and before["bytes"] > max_bytes):
+            reasons.append(f"bytes {now['bytes']} over the {max_bytes} ceiling")
+        if now["requests"] > max_requests and not (before and before["requests"] > max_requests):
+            reasons.append(f"requests {now['requests']} over the {max_requests} ceiling")
+        if reasons:
+            problems.append({"page": rel, "reasons": reasons})
+    return problems
+
+
+def build(index, tolerance=TOLERANCE, max_bytes=MAX_BYTES, max_requests=MAX_REQUESTS):
+    pages = measure(index)
+    baseline = (load_json(os.path.join(index.root, BASELINE), {}) or {}).get("pages", {})
+    problems = over_budget(pages, baseline, tolerance, max_bytes, max_requests)
+    report = {
+        "pages": len(pages),
+        "baseline_pages": len(baseline),
+        "tolerance": tolerance,
+        "max_bytes": max_bytes,
+        "max_requests": max_requests,
+        "total_bytes": sum(p["bytes"] for p in pages.values()),
+        "over_budget": problems,
+        "heaviest": [{"page": rel, **p} for rel, p in
+                     sorted(pages.items(), key=lambda kv: -kv[1]["bytes"])[:10]],
+        "by_page": pages,
+    }
+    update_text(cache_path(index.root, REPORT),
+                json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+    return {"pages": len(pages), "over_budget": len(problems)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check page weight, request count and depth against a baseline.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--record", action="store_true", help=f"write {BASELINE} from the current tree")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed byte growth as a fraction (default: %(default)s)")
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES,
+                        help="byte ceiling for any page (default: %(default)s)")
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS,
+                        help="request ceiling for any page (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    if args.record:
+        pages = measure(index)
+        save_json(os.path.join(index.root, BASELINE), {"pages": pages}, indent=2)
+        print(f"recorded {len(pages)} pages in {BASELINE}")
+        index.save()
+        return 0
+
+    summary = build(index, args.tolerance, args.max_bytes, args.max_requests)
+    report = load_json(cache_path(index.root, REPORT), {})
+    for problem in report["over_budget"]:
+        print(f"{problem['page']}: {', '.join(problem['reasons'])}")
+    print(summary)
+    index.save()
+    return 1 if summary["over_budget"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
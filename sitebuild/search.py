@@ -0,0 +1,183 @@
+"""Offline full-text search index, split into small per-prefix shards.
+
+Text is pulled out of every listed page (title, meta description and body,
+without scripts, styles, navigation or the inlined header/footer) and run
+through the same English + Devanagari tokenizer as nlp/cosine.py.
+
+Output under assets/search/:
+
+    docs.json          {"n": N, "avgdl": ..., "docs": [[url, title, length], ...]}
+    shards/<key>.json  {term: [doc_id, tf, doc_id, tf, ...], ...}
+
+A shard holds every term sharing its first two characters, so the browser
+(assets/js/pp-search.js) only downloads the one or two shards a query
+needs. Per-page token counts are cached by content hash; only shards whose
+content changed are rewritten.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from html.parser import HTMLParser
+
+from nlp.cosine import tokenize
+
+from . import index as site_index
+from .site import (SITE_ROOT, cache_path, load_json, read_page, save_json,
+                   update_text, url_path)
+from .sitemap import is_listed
+
+
+CACHE_NAME = "search.json"
+CACHE_VERSION = 1
+OUTPUT_DIR = "assets/search"
+PREFIX_LEN = 2
+MIN_TOKEN_LEN = 2
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer"}
+
+
+class TextExtractor(HTMLParser):
+    """Collects title, description and visible body text in one pass."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = []
+        self.description = ""
+        self.text = []
+        self._in_title = False
+        self._skip = []          # stack of tags whose content is ignored
+        self._include_depth = 0  # nested <div>s inside a data-pp-include slot
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self._include_depth:
+            if tag == "div":
+                self._include_depth += 1
+            return
+        if "data-pp-include" in attrs:
+            self._include_depth = 1
+            return
+        if tag == "title" and not self._skip:
+            self._in_title = True
+        elif tag == "meta" and (attrs.get("name") or "").lower() == "description":
+            self.description = attrs.get("content") or ""
+        elif tag in SKIP_TAGS:
+            self._skip.append(tag)
+
+    def handle_endtag(self, tag):
+        if self._include_depth:
+            if tag == "div":
+                self._include_depth -= 1
+            return
+        if tag == "title":
+            self._in_title = False
+        elif tag in self._skip:
+            # tolerate sloppy nesting: unwind to the matching open tag
+            while self._skip.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+        elif not self._skip and not self._include_depth:
+            self.text.append(data)
+
+
+def extract(path):
+    parser = TextExtractor()
+    parser.feed(read_page(path))
+    parser.close()
+    title = " ".join("".join(parser.title).split())
+    body = " ".join([title, parser.description] + parser.text)
+    counts = Counter(t for t in tokenize(body) if len(t) >= MIN_TOKEN_LEN)
+    return title, counts
+
+
+def shard_key(term):
+    """Shard file name for a term; must match shardKey() in pp-search.js."""
+    key = []
+    for ch in term[:PREFIX_LEN]:
+        key.append(ch if ch.isascii() else "u" + format(ord(ch), "x"))
+    return "".join(key)
+
+
+def build_shards(docs):
+    """docs: [(url, title, counts)] -> {shard key: {term: flat postings}}"""
+    postings = {}
+    for doc_id, (_, _, counts) in enumerate(docs):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).extend((doc_id, tf))
+
+    shards = {}
+    for term in sorted(postings):
+        shards.setdefault(shard_key(term), {})[term] = postings[term]
+    return shards
+
+
+def build(index):
+    path = cache_path(index.root, CACHE_NAME)
+    cache = load_json(path, {})
+    if cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "pages": {}, "shards": []}
+    pages = cache["pages"]
+
+    current = [rel for rel in index.pages() if is_listed(rel)]
+    for rel in set(pages) - set(current):
+        del pages[rel]
+
+    extracted = 0
+    for rel in current:
+        entry = pages.get(rel)
+        if entry and entry["hash"] == index.hash(rel):
+            continue
+        title, counts = extract(index.abspath(rel))
+        pages[rel] = {"hash": index.hash(rel), "title": title or rel, "counts": counts}
+        extracted += 1
+
+    if extracted == 0 and cache.get("docs") == current:
+        return {"docs": len(pages), "extracted": 0, "shards_written": 0}
+
+    docs = [(url_path(rel), pages[rel]["title"], pages[rel]["counts"]) for rel in current]
+    lengths = [sum(counts.values()) for _, _, counts in docs]
+    out_dir = os.path.join(index.root, *OUTPUT_DIR.split("/"))
+
+    update_text(os.path.join(out_dir, "docs.json"), json.dumps({
+        "n": len(docs),
+        "avgdl": round(sum(lengths) / len(docs), 2) if docs else 0,
+        "docs": [[url, title, length] for (url, title, _), length in zip(docs, lengths)],
+    }, ensure_ascii=False, separators=(",", ":")))
+
+    shards = build_shards(docs)
+    written = 0
+    for key, terms in shards.items():
+        text = json.dumps(terms, ensure_ascii=False, separators=(",", ":"))
+        written += update_text(os.path.join(out_dir, "shards", key + ".json"), text)
+    for key in set(cache["shards"]) - set(shards):
+        try:
+            os.remove(os.path.join(out_dir, "shards", key + ".json"))
+        except FileNotFoundError:
+            pass
+
+    cache["shards"] = sorted(shards)
+    cache["docs"] = current
+    save_json(path, cache)
+    return {"docs": len(docs), "extracted": extracted, "terms": sum(map(len, shards.values())),
+            "shards": len(shards), "shards_written": written}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the sharded offline search index.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    print(build(index))
+    index.refresh()
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Validate the SEO and include markup of every listed page.
+
+Re-creates validation_missing_counts in seo_include_update_report.json:
+for each check, the number of sitemap pages that fail it.
+
+    title, description, canonical, og_title, og_description, viewport
+        the tag is present with a non-empty value
+    alt          every <img> has an alt attribute (alt="" is fine)
+    loader       the page loads assets/js/pp-includes.js (or its hashed copy)
+    header_slot  a data-pp-include slot for /header.html
+    footer_slot  a data-pp-include slot for /footer.html
+
+Each page is read by one streaming HTMLParser pass. Results are cached
+per content hash in .ppbuild/seo.json, so after an edit only the changed
+pages are parsed again. The other keys of the report (written by the
+original migration) are kept; missing_by_page names the failing pages.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+from . import index as site_index
+from .includes import is_loader
+from .site import (BASE_URL, SITE_ROOT, cache_path, load_json, read_page,
+                   resolve, save_json, update_text)
+from .sitemap import is_listed
+
+
+CACHE_NAME = "seo.json"
+CACHE_VERSION = 2
+REPORT = "seo_include_update_report.json"
+POOL_MIN_PAGES = 64
+
+CHECKS = ["title", "description", "canonical", "og_title", "og_description",
+          "viewport", "alt", "loader", "header_slot", "footer_slot"]
+META_CHECKS = {
+    "description": "description",
+    "viewport": "viewport",
+    "og:title": "og_title",
+    "og:description": "og_description",
+}
+SLOT_CHECKS = {"header.html": "header_slot", "footer.html": "footer_slot"}
+
+
+class SeoCollector(HTMLParser):
+    """Records which checks a page passes as the markup streams past."""
+
+    def __init__(self, rel):
+        super().__init__(convert_charrefs=True)
+        self.rel = rel
+        self.found = set()
+        self.images_without_alt = 0
+        self._title = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "title":
+            self._title = []
+        elif tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or "").lower()
+            if key in META_CHECKS and (attrs.get("content") or "").strip():
+                self.found.add(META_CHECKS[key])
+        elif tag == "link":
+            if (attrs.get("rel") or "").lower() == "canonical" and (attrs.get("href") or "").strip():
+                self.found.add("canonical")
+        elif tag == "img":
+            if "alt" not in attrs:
+                self.images_without_alt += 1
+        elif tag == "script":
+            # fingerprint.py has usually renamed it by the time we run
+            if is_loader(self.rel, attrs.get("src")):
+                self.found.add("loader")
+        if "data-pp-include" in attrs:
+            check = SLOT_CHECKS.get(resolve(self.rel, attrs["data-pp-include"]))
+            if check:
+                self.found.add(check)
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title is not None:
+            if "".join(self._title).strip():
+                self.found.add("title")
+            self._title = None
+
+    def handle_data(self, data):
+        if self._title is not None:
+            self._title.append(data)
+
+
+def validate_page(root, rel):
+    """Return (rel, [failed checks]) for one page."""
+    collector = SeoCollector(rel)
+    collector.feed(read_page(os.path.join(root, *rel.split("/"))))
+    collector.close()
+    if not collector.images_without_alt:
+        collector.found.add("alt")
+    return rel, [check for check in CHECKS if check not in collector.found]
+
+
+def build(index, jobs=None):
+    path = cache_path(index.root, CACHE_NAME)
+    cache = load_json(path, {})
+    if cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION, "pages": {}}
+    pages = cache["pages"]
+
+    current = [rel for rel in index.pages() if is_listed(rel)]
+    for rel in set(pages) - set(current):
+        del pages[rel]
+    stale = [rel for rel in current
+             if pages.get(rel, {}).get("hash") != index.hash(rel)]
+
+    if len(stale) >= POOL_MIN_PAGES:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(validate_page, [index.root] * len(stale), stale,
+                                    chunksize=8))
+    else:
+        results = [validate_page(index.root, rel) for rel in stale]
+    for rel, missing in results:
+        pages[rel] = {"hash": index.hash(rel), "missing": missing}
+    if results:
+        save_json(path, cache)
+
+    counts = {check: 0 for check in CHECKS}
+    for rel in current:
+        for check in pages[rel]["missing"]:
+            counts[check] += 1
+
+    report_path = os.path.join(index.root, REPORT)
+    report = load_json(report_path, {}) or {}
+    report.update({
+        "base_domain": BASE_URL,
+        "sitemap_urls": len(current),
+        "validation_missing_counts": counts,
+        "missing_by_page": {rel: pages[rel]["missing"] for rel in sorted(current)
+                            if pages[rel]["missing"]},
+    })
+    update_text(report_path, json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+    return {"pages": len(current), "validated": len(results),
+            "failing": len(report["missing_by_page"])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate SEO tags and include slots on every listed page.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--strict", action="store_true", help="exit 1 when a page fails a check")
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    summary = build(index, args.jobs)
+    print(summary)
+    index.save()
+    return 1 if args.strict and summary["failing"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""Local preview server: python -m sitebuild.serve [--port 8000]
+
+A small asyncio HTTP/1.1 server for trying the site out, built for the
+things ``python -m http.server`` does badly here:
+
+- hot files are kept in an in-memory LRU cache (checked against mtime on
+  every request, so edits show up immediately);
+- every response has an ETag, and If-None-Match answers 304;
+- Range requests get 206 partial content, so seeking in videos/ and the
+  recorder pages works;
+- when the client accepts it, the .br/.gz sibling written by the compress
+  stage is served instead (if it is not older than the original);
+- files too large for the cache are streamed with sendfile.
+
+Directory URLs serve index.html (with a redirect to add the trailing
+slash), and unknown paths get 404.html. It is meant for local use only.
+"""
+import argparse
+import asyncio
+import mimetypes
+import os
+import posixpath
+import sys
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from urllib.parse import quote, unquote, urlsplit
+
+from .fingerprint import HASHED_RE
+from .site import SITE_ROOT, SKIP_DIRS
+
+
+# Files up to this size are cached in memory; larger ones use sendfile.
+CACHE_MAX_FILE = 2 * 1024 * 1024
+CACHE_MAX_BYTES = 128 * 1024 * 1024
+READ_CHUNK = 256 * 1024
+# Preferred first.
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+COMPRESSIBLE = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".xml", ".svg",
+                ".webmanifest")
+
+REASONS = {200: "OK", 206: "Partial Content", 301: "Moved Permanently",
+           304: "Not Modified", 400: "Bad Request", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed",
+           416: "Range Not Satisfiable", 500: "Internal Server Error"}
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("text/javascript", ".mjs")
+mimetypes.add_type("image/webp", ".webp")
+
+
+class ByteCache:
+    """LRU of path -> (mtime_ns, size, data), bounded by total bytes."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, path, st):
+        entry = self._entries.get(path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        with open(path, "rb") as f:
+            data = f.read()
+        self.put(path, st, data)
+        return data
+
+    def put(self, path, st, data):
+        old = self._entries.pop(path, None)
+        if old:
+            self.bytes -= len(old[2])
+        self._entries[path] = (st.st_mtime_ns, st.st_size, data)
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted[2])
+
+
+def etag(st, encoding=None):
+    tag = f"{st.st_size:x}-{st.st_mtime_ns:x}"
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def parse_range(header, size):
+    """Parse a single 'bytes=a-b' range; returns (start, end) inclusive,
+    None when the header should be ignored, or False if unsatisfiable."""
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[6:].strip().partition("-")
+    try:
+        if start == "":
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class PreviewServer:
+    def __init__(self, root, cache_bytes=CACHE_MAX_BYTES, quiet=False):
+        self.root = os.path.realpath(root)
+        self.cache = ByteCache(cache_bytes)
+        self.quiet = quiet
+
+    def locate(self, url_path):
+        """Map a URL path to (status, file path or quoted redirect path)."""
+        path = unquote(url_path)
+        rel = posixpath.normpath(path.lstrip("/")) if path.strip("/") else ""
+        if rel in (".", ""):
+            rel = ""
+        if rel == ".." or rel.startswith("../") or "\x00" in rel:
+            return 403, None
+        if any(part in SKIP_DIRS for part in rel.split("/")):
+            return 404, None
+        full = os.path.join(self.root, *rel.split("/")) if rel else self.root
+        if os.path.isdir(full):
+            if not path.endswith("/"):
+                return 301, quote(path + "/")
+            full = os.path.join(full, "index.html")
+        if os.path.isfile(full):
+            return 200, full
+        return 404, None
+
+    def pick_encoding(self, full, st, headers):
+        if not full.endswith(COMPRESSIBLE) or "range" in headers:
+            return None, full, st
+        accepted = accepted_encodings(headers.get("accept-encoding", ""))
+        for name, suffix in ENCODINGS:
+            if name in accepted:
+                try:
+                    sibling = os.stat(full + suffix)
+                except OSError:
+                    continue
+                if sibling.st_mtime_ns >= st.st_mtime_ns:
+                    return name, full + suffix, sibling
+        return None, full, st
+
+    async def respond(self, writer, method, target, headers):
+        url = urlsplit(target)
+        status, found = self.locate(url.path)
+        if status == 301:
+            location = f"{found}?{url.query}" if url.query else found
+            return await self.send_simple(writer, 301, method, {"Location": location})
+        if status == 404:
+            page = os.path.join(self.root, "404.html")
+            if not os.path.isfile(page):
+                return await self.send_simple(writer, 404, method)
+            found = page
+        elif status != 200:
+            return await self.send_simple(writer, status, method)
+
+        st = os.stat(found)
+        encoding, body_path, body_st = self.pick_encoding(found, st, headers)
+        content_type = mimetypes.guess_type(found)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in (
+                "application/javascript", "application/json", "image/svg+xml"):
+            content_type += "; charset=utf-8"
+        out = {
+            "Content-Type": content_type,
+            "ETag": etag(body_st, encoding),
+            "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Vary": "Accept-Encoding",
+            # Hashed names never change; everything else is revalidated.
+            "Cache-Control": ("public, max-age=31536000, immutable"
+                              if HASHED_RE.match(os.path.basename(found)) else "no-cache"),
+        }
+        if encoding:
+            out["Content-Encoding"] = encoding
+
+        if status == 200 and out["ETag"] in headers.get("if-none-match", ""):
+            return await self.send_head(writer, 304, out)
+
+        size = body_st.st_size
+        start, end = 0, size - 1
+        if status == 200 and "range" in headers:
+            wanted = parse_range(headers["range"], size)
+            if wanted is False:
+                out["Content-Range"] = f"bytes */{size}"
+                return await self.send_simple(writer, 416, method, out)
+            if wanted:
+                start, end = wanted
+                status = 206
+                out["Content-Range"] = f"bytes {start}-{end}/{size}"
+        out["Content-Length"] = str(end - start + 1)
+        if method == "HEAD" or size == 0:
+            return await self.send_head(writer, status, out)
+
+        # Files are read or opened before the head goes out, so a file that
+        # cannot be read still gets a clean 500.
+        if size <= CACHE_MAX_FILE:
+            body = self.cache.get(body_path, body_st)[start:end + 1]
+            await self.send_head(writer, status, out)
+            writer.write(body)
+            await writer.drain()
+        else:
+            with open(body_path, "rb") as f:
+                await self.send_head(writer, status, out)
+                await self.send_file(writer, f, start, end - start + 1)
+
+    async def send_file(self, writer, f, offset, count):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.sendfile(writer.transport, f, offset, count)
+        except (NotImplementedError, RuntimeError):
+            # e.g. TLS transports or platforms without os.sendfile
+            f.seek(offset)
+            while count > 0:
+                chunk = f.read(min(READ_CHUNK, count))
+                if not chunk:
+                    break
+                writer.write(chunk)
+                count -= len(chunk)
+                await writer.drain()
+
+    async def send_head(self, writer, status, headers):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}",
+                 f"Date: {formatdate(usegmt=True)}",
+                 "Server: pp-preview"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def send_simple(self, writer, status, method, headers=None):
+        body = f"{status} {REASONS[status]}\n".encode()
+        headers = dict(headers or {})
+        headers.update({"Content-Type": "text/plain; charset=utf-8",
+                        "Content-Length": str(len(body))})
+        await self.send_head(writer, status, headers)
+        if method != "HEAD":
+            writer.write(body)
+            await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send_simple(writer, 400, "GET")
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                if method not in ("GET", "HEAD"):
+                    await self.send_simple(writer, 405, method, {"Allow": "GET, HEAD"})
+                else:
+                    try:
+                        await self.respond(writer, method, target, headers)
+                    except (ConnectionError, asyncio.IncompleteReadError):
+                        raise
+                    except Exception as e:
+                        # e.g. PermissionError from a file the server cannot read
+                        print(f"{method} {target} failed: {e!r}", file=sys.stderr)
+                        await self.send_simple(writer, 500, method, {"Connection": "close"})
+                        break
+                if not self.quiet:
+                    print(f"{method} {target} {(time.perf_counter() - started) * 1000:.1f}ms")
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(root, host, port, cache_bytes, quiet):
+    server = PreviewServer(root, cache_bytes, quiet)
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving {server.root} on http://{host}:{port}/")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preview the site with caching, ETags, ranges and precompressed files.")
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-mb", type=int, default=CACHE_MAX_BYTES // (1024 * 1024),
+                        help="in-memory cache size in MB")
+    parser.add_argument("--quiet", action="store_true", help="do not log requests")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.root, args.host, args.port, args.cache_mb * 1024 * 1024, args.quiet))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Paths and small helpers shared by the site build tools."""
+import hashlib
+import json
+import os
+import posixpath
+from urllib.parse import quote, unquote, urlsplit
+
+
+SITE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_URL = "https://editor.learnwithchampak.live"
+
+# Build caches live next to the site but are never deployed.
+CACHE_DIR = ".ppbuild"
+
+# Directories that are never part of the published site.
+SKIP_DIRS = {
+    ".git",
+    CACHE_DIR,
+    ".vscode",
+    "__pycache__",
+    ".venv",
+    "venv",
+    "node_modules",
+}
+
+
+def cache_path(root, name):
+    return os.path.join(root, CACHE_DIR, name)
+
+
+def load_json(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_text(path, text):
+    """Write UTF-8 text atomically so a crashed build never leaves half a file."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def update_text(path, text):
+    """Write ``text`` only if the file differs; returns True when it wrote."""
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.read() == text:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    write_text(path, text)
+    return True
+
+
+def write_bytes(path, data):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def save_json(path, data, indent=None):
+    write_text(path, json.dumps(data, indent=indent, ensure_ascii=False) + "\n")
+
+
+def hash_bytes(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_file(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def to_rel(root, path):
+    """Site-relative path with forward slashes, e.g. 'python-starter/index.html'."""
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def url_path(rel):
+    """Public path for a file: index.html pages are served as their folder."""
+    if rel == "index.html":
+        return "/"
+    if rel.endswith("/index.html"):
+        rel = rel[: -len("index.html")]
+    return "/" + quote(rel)
+
+
+def page_url(rel, base_url=BASE_URL):
+    return base_url.rstrip("/") + url_path(rel)
+
+
+def read_page(path):
+    """Read HTML exactly as stored: line endings and odd bytes survive a rewrite."""
+    with open(path, "r", encoding="utf-8", errors="surrogateescape", newline="") as f:
+        return f.read()
+
+
+def write_page(path, text):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def resolve(page_rel, url, base_url=BASE_URL):
+    """Map a reference found in ``page_rel`` to a site-relative path.
+
+    Returns None for external URLs, fragments and data:/mailto: style links.
+    Absolute URLs on our own domain count as local.
+    """
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    if parts.scheme or parts.netloc:
+        if parts.scheme not in ("http", "https", ""):
+            return None
+        if parts.netloc != urlsplit(base_url).netloc:
+            return None
+    path = unquote(parts.path)
+    if not path:
+        return None
+
+    if path.startswith("/"):
+        joined = path.lstrip("/")
+    else:
+        joined = posixpath.join(posixpath.dirname(page_rel), path)
+    rel = posixpath.normpath(joined) if joined else ""
+    if rel == ".":
+        rel = ""
+    if rel == ".." or rel.startswith("../"):
+        return None
+    if path.endswith("/") or rel == "":
+        rel = posixpath.join(rel, "index.html")
+    return rel
@@ -0,0 +1,96 @@
+"""Write sitemap.xml from the cached site index.
+
+    python -m sitebuild.sitemap            # update sitemap.xml
+    python -m sitebuild.sitemap --list     # just print every page URL
+"""
+import argparse
+import fnmatch
+import os
+import sys
+from xml.sax.saxutils import escape
+
+from . import index as site_index
+from .site import BASE_URL, SITE_ROOT, page_url, update_text
+
+
+# Pages that exist in the tree but should not be offered to search engines.
+EXCLUDE = [
+    "404.html",
+    "google*.html",
+    "header.html",
+    "footer.html",
+    "headsection.html",
+    "*/header.html",
+    "*/footer.html",
+    "* - Copy.html",
+    "*/build/*",
+    "tests/*",
+    # scratch pages
+    "test.html",
+    "*/test.html",
+    "xyz.html",
+    "samples/html/preview/t.html",
+    "samples/html/preview/daat.html",
+]
+
+
+def is_listed(rel):
+    return not any(fnmatch.fnmatch(rel, pattern) for pattern in EXCLUDE)
+
+
+def sitemap_entries(index, base_url=BASE_URL):
+    return [
+        (page_url(rel, base_url), index.lastmod(rel))
+        for rel in index.pages()
+        if is_listed(rel)
+    ]
+
+
+def render_sitemap(entries):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for loc, lastmod in entries:
+        lines.append("  <url>")
+        lines.append(f"    <loc>{escape(loc)}</loc>")
+        lines.append(f"    <lastmod>{lastmod}</lastmod>")
+        lines.append("  </url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def write_sitemap(index, base_url=BASE_URL, output=None):
+    """Write the sitemap only if it changed; returns the number of URLs."""
+    output = output or os.path.join(index.root, "sitemap.xml")
+    entries = sitemap_entries(index, base_url)
+    update_text(output, render_sitemap(entries))
+    return len(entries)
+
+
+def build(index):
+    return {"sitemap_urls": write_sitemap(index)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=SITE_ROOT)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--output", help="default: <root>/sitemap.xml")
+    parser.add_argument("--list", action="store_true",
+                        help="print page URLs instead of writing the sitemap")
+    args = parser.parse_args(argv)
+
+    index = site_index.load(args.root)
+    if args.list:
+        for loc, _ in sitemap_entries(index, args.base_url):
+            sys.stdout.write(loc + "\n")
+    else:
+        count = write_sitemap(index, args.base_url, args.output)
+        print(f"sitemap.xml: {count} URLs")
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+import pytest
+
+from .helpers import FILES, write
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A small site tree using the loader, the partials and a stylesheet."""
+    root = str(tmp_path)
+    for rel, text in FILES.items():
+        write(root, rel, text)
+    return root
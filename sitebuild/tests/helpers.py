@@ -0,0 +1,59 @@
+"""Site data and helpers shared by the build stage tests."""
+import os
+from importlib import import_module
+
+from sitebuild import index as site_index
+
+
+HOME = """<!doctype html>
+<html lang="en">
+<head>
+<title>Home</title>
+<meta name="description" content="Python and Java lessons">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<meta property="og:title" content="Home">
+<meta property="og:description" content="Python and Java lessons">
+<link rel="canonical" href="https://editor.learnwithchampak.live/">
+<link rel="stylesheet" href="styles.css">
+<script src="assets/js/pp-includes.js" defer></script>
+</head>
+<body>
+<div data-pp-include="/header.html" data-pp-slot="header"></div>
+<h1>Lessons</h1>
+<p>Start with Python loops, then move on to Java classes.</p>
+<div data-pp-include="/footer.html" data-pp-slot="footer"></div>
+</body>
+</html>
+"""
+
+FILES = {
+    "index.html": HOME,
+    "headsection.html": '<meta name="theme-color" content="#d97706">\n',
+    "header.html": "<nav>Header</nav>\n",
+    "footer.html": "<footer>Footer</footer>\n",
+    "styles.css": "body { color: #1f2937; }\n",
+    "assets/js/pp-includes.js": "// runtime include loader\n",
+}
+
+
+def write(root, rel, text):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+
+
+def read(root, rel):
+    with open(os.path.join(root, *rel.split("/")), encoding="utf-8") as f:
+        return f.read()
+
+
+def run(root, *stages):
+    """Run build stages in order, like python -m sitebuild does."""
+    index = site_index.load(root)
+    summaries = {}
+    for name in stages:
+        summaries[name] = import_module(f"sitebuild.{name}").build(index)
+        index.refresh()
+    index.save()
+    return index, summaries
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from sitebuild import compress
+from sitebuild.site import cache_path
+
+from .helpers import read, run, write
+
+
+BIG = "<p>" + "Python loops and Java classes. " * 40 + "</p>\n"
+
+
+def report(root):
+    with open(cache_path(root, compress.REPORT), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_unchanged_files_are_skipped(site):
+    write(site, "big.html", BIG)
+    _, summaries = run(site, "compress")
+    assert summaries["compress"]["compressed"] >= 1
+    sibling = os.path.join(site, "big.html.gz")
+    written = os.stat(sibling).st_mtime_ns
+
+    os.utime(os.path.join(site, "big.html"))
+    _, summaries = run(site, "compress")
+    assert summaries["compress"]["compressed"] == 0
+    assert os.stat(sibling).st_mtime_ns == written
+
+    write(site, "big.html", BIG + BIG)
+    _, summaries = run(site, "compress")
+    assert summaries["compress"]["compressed"] == 1
+
+
+def test_without_brotli_only_gzip_is_written(site, monkeypatch):
+    monkeypatch.setattr(compress, "brotli", None)
+    write(site, "big.html", BIG)
+    run(site, "compress")
+
+    assert os.path.exists(os.path.join(site, "big.html.gz"))
+    assert not os.path.exists(os.path.join(site, "big.html.br"))
+    # small files are not worth a sibling
+    assert not os.path.exists(os.path.join(site, "styles.css.gz"))
+    summary = report(site)
+    assert summary["brotli_available"] is False
+    assert summary["brotli_bytes"] is None
+    assert summary["pages"]["big.html"]["brotli"] is None
+
+
+def test_brotli_installed_later_fills_in_siblings(site, monkeypatch):
+    pytest.importorskip("brotli")
+    write(site, "big.html", BIG)
+    with monkeypatch.context() as m:
+        m.setattr(compress, "brotli", None)
+        run(site, "compress")
+
+    _, summaries = run(site, "compress")
+    assert summaries["compress"]["compressed"] == 1
+    assert os.path.exists(os.path.join(site, "big.html.br"))
+
+
+def test_report_stays_out_of_the_site(site):
+    write(site, "big.html", BIG)
+    run(site, "compress")
+    assert not os.path.exists(os.path.join(site, compress.REPORT))
+    assert report(site)["pages"]["big.html"]["raw"] == len(read(site, "big.html"))
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from sitebuild import images
+
+from .helpers import read, run, write
+
+Image = pytest.importorskip("PIL.Image")
+
+
+PAGE = """<!doctype html>
+<html><head><title>Gallery</title></head><body>
+<img src="imgs/wide.png" alt="">
+<img src="imgs/logo.png" alt="" data-pp-no-responsive>
+</body></html>
+"""
+
+
+def test_opted_out_images_get_no_variants(site):
+    os.makedirs(os.path.join(site, "imgs"))
+    for name in ("wide.png", "logo.png"):
+        Image.new("RGB", (700, 100), "orange").save(os.path.join(site, "imgs", name))
+    write(site, "gallery.html", PAGE)
+
+    _, summaries = run(site, "images")
+    assert summaries["images"]["sources"] == 1
+    made = os.listdir(os.path.join(site, "imgs", images.VARIANT_DIR))
+    assert made and all(name.startswith("wide-") for name in made)
+
+    page = read(site, "gallery.html")
+    assert 'data-pp-src="imgs/wide.png"' in page
+    assert '<img src="imgs/logo.png" alt="" data-pp-no-responsive>' in page
+
+
+def gallery(site, body):
+    os.makedirs(os.path.join(site, "imgs"), exist_ok=True)
+    Image.new("RGB", (1000, 500), "orange").save(os.path.join(site, "imgs", "wide.png"))
+    write(site, "gallery.html", f"<html><body>\n{body}\n</body></html>\n")
+
+
+def img_tags(site):
+    return images.IMG_RE.findall(read(site, "gallery.html"))
+
+
+def test_sizes_follow_the_declared_width(site):
+    gallery(site, '<img src="imgs/wide.png" width="200" height="100" alt="">\n'
+                  '<img src="imgs/wide.png" sizes="50vw" alt="">\n'
+                  '<img src="imgs/wide.png" style="width: 8rem" alt="">')
+    run(site, "images")
+    declared, own_sizes, css_only = img_tags(site)
+
+    assert 'sizes="(max-width: 200px) 100vw, 200px"' in declared
+    assert 'width="200" height="100"' in declared
+    assert 'sizes="50vw"' in own_sizes and "srcset=" in own_sizes
+    assert "srcset=" not in css_only and "sizes=" not in css_only
+    assert 'src="imgs/_responsive/wide-1000.' in css_only
+    assert 'width="1000" height="500"' in css_only
+
+    # a re-run after an edit keeps author attributes and refreshes ours
+    page = read(site, "gallery.html").replace('width="200"', 'width="300"')
+    write(site, "gallery.html", page + "\n")
+    run(site, "images")
+    declared, own_sizes, css_only = img_tags(site)
+    assert 'sizes="(max-width: 300px) 100vw, 300px"' in declared
+    assert own_sizes.count("sizes=") == 1 and 'sizes="50vw"' in own_sizes
+    assert "srcset=" not in css_only
+
+
+def test_unreadable_image_is_left_alone(site, capsys):
+    gallery(site, '<img src="imgs/wide.png" width="200" alt="">\n'
+                  '<img src="imgs/broken.png" width="200" alt="">')
+    write(site, "imgs/broken.png", "not a png")
+
+    _, summaries = run(site, "images")
+    assert summaries["images"]["failed"] == 1
+    assert "imgs/broken.png" in capsys.readouterr().err
+    wide, broken = img_tags(site)
+    assert "srcset=" in wide
+    assert broken == '<img src="imgs/broken.png" width="200" alt="">'
+
+    # fixed images are picked up without touching the page
+    Image.new("RGB", (400, 200), "blue").save(os.path.join(site, "imgs", "broken.png"))
+    _, summaries = run(site, "images")
+    assert summaries["images"]["failed"] == 0
+    assert 'data-pp-src="imgs/broken.png"' in img_tags(site)[1]
+
+
+def test_webp_widths_only_when_a_tag_uses_them(site):
+    gallery(site, '<img src="imgs/wide.png" alt="">')
+    run(site, "images")
+    made = os.listdir(os.path.join(site, "imgs", images.VARIANT_DIR))
+    assert len(made) == 1 and made[0].endswith(".png")
+
+    write(site, "gallery.html", read(site, "gallery.html").replace(
+        'alt=""', 'alt="" sizes="50vw"'))
+    run(site, "images")
+    made = os.listdir(os.path.join(site, "imgs", images.VARIANT_DIR))
+    assert sum(name.endswith(".webp") for name in made) == 4
+    assert "srcset=" in img_tags(site)[0]
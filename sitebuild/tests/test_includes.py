@@ -0,0 +1,34 @@
+from sitebuild import pageweight
+from sitebuild.linkcheck import scan
+
+from .helpers import read, run, write
+
+
+def test_partials_are_inlined(site):
+    run(site, "includes")
+    page = read(site, "index.html")
+    assert "<nav>Header</nav>" in page
+    assert "<footer>Footer</footer>" in page
+    assert 'data-pp-head-loaded="1"' in page
+    assert page.count("<!--pp-head-->") == 1
+
+
+def test_headsection_edit_reaches_fingerprinted_pages(site):
+    run(site, "includes", "fingerprint")
+    page = read(site, "index.html")
+    assert "assets/js/pp-includes.js" not in page
+    assert "theme-color" in page
+
+    write(site, "headsection.html", '<meta name="theme-color" content="#166534">\n')
+    _, summaries = run(site, "includes")
+    assert summaries["includes"]["rewritten"] == 1
+    page = read(site, "index.html")
+    assert "#166534" in page and "#d97706" not in page
+    assert page.count("<!--pp-head-->") == 1
+
+
+def test_pageweight_counts_head_partial_behind_hashed_loader(site):
+    index, _ = run(site, "fingerprint")
+    graph, _ = scan(index)
+    depths = pageweight.page_requests(index, graph, "index.html")
+    assert depths["headsection.html"] == 3
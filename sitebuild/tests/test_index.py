@@ -0,0 +1,95 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from sitebuild import index as site_index
+from sitebuild import sitemap
+
+from .helpers import read, write
+
+
+COMMIT_DATE = "2024-01-02T12:00:00+00:00"
+
+
+def git(root, *args):
+    env = dict(os.environ, GIT_AUTHOR_DATE=COMMIT_DATE, GIT_COMMITTER_DATE=COMMIT_DATE)
+    subprocess.run(["git", "-C", root, "-c", "user.name=t", "-c", "user.email=t@t",
+                    *args], check=True, capture_output=True, env=env)
+
+
+@pytest.fixture
+def repo(site):
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    git(site, "init", "-q")
+    git(site, "add", ".")
+    git(site, "commit", "-q", "-m", "site")
+    return site
+
+
+def test_unchanged_files_are_not_hashed_again(site, monkeypatch):
+    site_index.load(site).save()
+    hashed = []
+    monkeypatch.setattr(site_index, "hash_file",
+                        lambda path: hashed.append(path) or "x")
+
+    index = site_index.SiteIndex(site)
+    assert index.refresh() == ([], [], [])
+    assert hashed == []
+
+
+def test_touch_keeps_lastmod(site):
+    index = site_index.load(site)
+    before = index.lastmod("index.html")
+    index.save()
+
+    path = os.path.join(site, "index.html")
+    os.utime(path, (0, 0))
+    index = site_index.load(site)
+    assert index.lastmod("index.html") == before
+    assert index.refresh() == ([], [], [])
+
+
+def test_edits_are_reported(site):
+    site_index.load(site).save()
+    write(site, "index.html", read(site, "index.html") + "<!-- edit -->\n")
+    write(site, "new.html", "<p>new</p>\n")
+    os.remove(os.path.join(site, "styles.css"))
+
+    delta = site_index.SiteIndex(site).refresh()
+    assert delta == (["new.html"], ["index.html"], ["styles.css"])
+
+
+def test_fresh_checkout_uses_commit_dates(repo):
+    write(repo, "draft.html", "<p>draft</p>\n")
+    write(repo, "header.html", "<nav>Edited</nav>\n")
+
+    index = site_index.load(repo)
+    today = site_index._lastmod(os.stat(os.path.join(repo, "draft.html")).st_mtime_ns)
+    assert index.lastmod("index.html") == "2024-01-02"
+    assert index.lastmod("draft.html") == today
+    assert index.lastmod("header.html") == today
+
+
+def test_sitemap_is_stable_across_checkouts(repo):
+    index = site_index.load(repo)
+    sitemap.write_sitemap(index)
+    index.save()
+    first = read(repo, "sitemap.xml")
+    assert "<lastmod>2024-01-02</lastmod>" in first
+
+    shutil.rmtree(os.path.join(repo, ".ppbuild"))
+    for name in os.listdir(repo):
+        if name.endswith(".html"):
+            os.utime(os.path.join(repo, name))
+    sitemap.write_sitemap(site_index.load(repo))
+    assert read(repo, "sitemap.xml") == first
+
+
+def test_scratch_pages_are_not_listed():
+    for rel in ("test.html", "ve/test.html", "xyz.html",
+                "samples/html/preview/t.html", "samples/html/preview/daat.html"):
+        assert not sitemap.is_listed(rel)
+    assert sitemap.is_listed("samples/html/preview/index.html")
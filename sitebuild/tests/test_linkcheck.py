@@ -0,0 +1,29 @@
+import json
+
+from sitebuild import linkcheck
+from sitebuild.site import cache_path
+
+from .helpers import run, write
+
+
+def report(root):
+    with open(cache_path(root, linkcheck.REPORT), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_build_outputs_are_entry_points(site):
+    write(site, "old/unused.css", "p { margin: 0; }\n")
+    write(site, "about.html", '<html><body><a href="missing.html">x</a></body></html>')
+    run(site, "includes", "fingerprint", "search", "linkcheck")
+
+    result = report(site)
+    unreferenced = {item["file"] for item in result["unreferenced"]}
+    assert unreferenced == {"old/unused.css"}
+    assert [item["target"] for item in result["broken"]] == ["missing.html"]
+
+
+def test_entry_point_patterns():
+    assert linkcheck.is_entry_point("assets/search/docs.json")
+    assert linkcheck.is_entry_point("assets/search/shards/py.json")
+    assert linkcheck.is_entry_point("precache-manifest.js")
+    assert not linkcheck.is_entry_point("assets/data/lessons.json")
@@ -0,0 +1,47 @@
+import json
+import os
+
+from sitebuild import __main__ as pipeline
+from sitebuild import pageweight
+
+from .helpers import write
+
+
+def page(size, requests=2, depth=2):
+    return {"bytes": size, "transfer_bytes": size, "requests": requests, "depth": depth}
+
+
+def test_budget_against_the_baseline():
+    baseline = {"a.html": page(1000), "b.html": page(1000)}
+    pages = {"a.html": page(1100), "b.html": page(1101, requests=3)}
+
+    problems = pageweight.over_budget(pages, baseline, tolerance=0.10)
+    assert [p["page"] for p in problems] == ["b.html"]
+    assert problems[0]["reasons"] == ["bytes 1000 -> 1101", "requests 2 -> 3"]
+
+
+def test_ceilings_cover_new_pages():
+    pages = {"new.html": page(5000, requests=30), "small.html": page(10)}
+    problems = pageweight.over_budget(pages, {}, max_bytes=4000, max_requests=20)
+    assert problems == [{"page": "new.html", "reasons": [
+        "bytes 5000 over the 4000 ceiling", "requests 30 over the 20 ceiling"]}]
+
+
+def test_pages_already_over_a_ceiling_keep_their_baseline():
+    baseline = {"heavy.html": page(9000, requests=25), "light.html": page(3000)}
+    pages = {"heavy.html": page(9500, requests=25), "light.html": page(4100)}
+    problems = pageweight.over_budget(pages, baseline, max_bytes=4000, max_requests=20)
+    assert problems == [{"page": "light.html", "reasons": [
+        "bytes 3000 -> 4100", "bytes 4100 over the 4000 ceiling"]}]
+
+
+def test_pipeline_fails_over_budget(site, capsys):
+    assert pipeline.main(["--root", site, "pageweight"]) == 0
+    with open(os.path.join(site, ".ppbuild", pageweight.REPORT), encoding="utf-8") as f:
+        measured = json.load(f)["by_page"]
+    assert not os.path.exists(os.path.join(site, pageweight.REPORT))
+
+    shrunk = {rel: dict(p, bytes=p["bytes"] // 2) for rel, p in measured.items()}
+    write(site, pageweight.BASELINE, json.dumps({"pages": shrunk}))
+    assert pipeline.main(["--root", site, "pageweight"]) == 1
+    assert "over budget: pageweight" in capsys.readouterr().err
@@ -0,0 +1,38 @@
+import json
+import os
+
+from sitebuild import search
+
+from .helpers import run, write
+
+
+def lookup(root, term):
+    """What pp-search.js does: fetch the term's shard and read its postings."""
+    out = os.path.join(root, *search.OUTPUT_DIR.split("/"))
+    with open(os.path.join(out, "docs.json"), encoding="utf-8") as f:
+        docs = json.load(f)["docs"]
+    shard = os.path.join(out, "shards", search.shard_key(term) + ".json")
+    if not os.path.exists(shard):
+        return {}  # a 404 is an empty shard to the browser too
+    with open(shard, encoding="utf-8") as f:
+        postings = json.load(f).get(term, [])
+    return {docs[doc][0]: tf for doc, tf in zip(postings[::2], postings[1::2])}
+
+
+def test_shard_lookup(site):
+    write(site, "sql/index.html",
+          "<html><head><title>SQL joins</title></head><body>"
+          "<p>joins joins and पायथन</p></body></html>")
+    run(site, "search")
+
+    assert lookup(site, "joins") == {"/sql/": 3}
+    # description and body both count
+    assert lookup(site, "python") == {"/": 2}
+    assert lookup(site, "पायथन") == {"/sql/": 1}
+    # partials and scripts are not indexed
+    assert lookup(site, "footer") == {}
+
+
+def test_shard_key_escapes_non_ascii():
+    assert search.shard_key("joins") == "jo"
+    assert search.shard_key("पायथन") == "u92au93e"
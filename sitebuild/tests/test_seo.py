@@ -0,0 +1,31 @@
+import json
+import os
+
+from sitebuild import seo
+
+from .helpers import run, write
+
+
+def missing(root):
+    with open(os.path.join(root, seo.REPORT), encoding="utf-8") as f:
+        report = json.load(f)
+    return report["missing_by_page"], report["validation_missing_counts"]
+
+
+def test_seo_after_fingerprint(site):
+    write(site, "bare.html", "<html><head><title>Bare</title></head><body>"
+                             '<img src="styles.css"></body></html>')
+    run(site, "includes", "fingerprint", "seo")
+
+    by_page, counts = missing(site)
+    assert "index.html" not in by_page
+    assert "loader" in by_page["bare.html"] and "alt" in by_page["bare.html"]
+    assert counts["loader"] == 1 and counts["title"] == 0
+
+
+def test_seo_report_matches_unbuilt_tree(site):
+    run(site, "seo")
+    before = missing(site)
+    os.remove(os.path.join(site, seo.REPORT))
+    run(site, "includes", "fingerprint", "seo")
+    assert missing(site) == before
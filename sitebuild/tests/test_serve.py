@@ -0,0 +1,126 @@
+import asyncio
+import os
+
+import pytest
+
+from sitebuild import serve
+
+from .helpers import write
+
+
+def test_parse_range():
+    assert serve.parse_range("bytes=0-99", 1000) == (0, 99)
+    assert serve.parse_range("bytes=900-", 1000) == (900, 999)
+    assert serve.parse_range("bytes=-100", 1000) == (900, 999)
+    assert serve.parse_range("bytes=-5000", 1000) == (0, 999)
+    assert serve.parse_range("bytes=500-5000", 1000) == (500, 999)
+    # unsatisfiable
+    assert serve.parse_range("bytes=1000-", 1000) is False
+    assert serve.parse_range("bytes=20-10", 1000) is False
+    assert serve.parse_range("bytes=-0", 1000) is False
+    # ignored: served as a plain 200
+    assert serve.parse_range("bytes=0-1,5-6", 1000) is None
+    assert serve.parse_range("items=0-1", 1000) is None
+    assert serve.parse_range("bytes=a-b", 1000) is None
+
+
+def test_accepted_encodings():
+    assert serve.accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert serve.accepted_encodings("br;q=0, GZIP;q=0.5") == {"gzip"}
+    assert serve.accepted_encodings("br; q=0.0") == set()
+
+
+@pytest.fixture
+def server(site):
+    write(site, "hover magnifier/index.html", "<p>gallery</p>\n")
+    write(site, "लेख/index.html", "<p>lekh</p>\n")
+    write(site, ".ppbuild/index.json", "{}\n")
+    return serve.PreviewServer(site, quiet=True)
+
+
+def test_locate(server, site):
+    assert server.locate("/") == (200, os.path.join(server.root, "index.html"))
+    assert server.locate("/styles.css") == (200, os.path.join(server.root, "styles.css"))
+    assert server.locate("/hover%20magnifier/") == (
+        200, os.path.join(server.root, "hover magnifier", "index.html"))
+    assert server.locate("/hover%20magnifier") == (301, "/hover%20magnifier/")
+    assert server.locate("/%E0%A4%B2%E0%A5%87%E0%A4%96") == (
+        301, "/%E0%A4%B2%E0%A5%87%E0%A4%96/")
+    assert server.locate("/../etc/passwd") == (403, None)
+    assert server.locate("/%2e%2e/secret") == (403, None)
+    assert server.locate("/.ppbuild/index.json") == (404, None)
+    assert server.locate("/missing.html") == (404, None)
+
+
+def fetch(server, *requests):
+    """Send raw requests on one connection; returns the parsed responses."""
+    async def go():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        for request in requests:
+            writer.write(request.encode("latin-1"))
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.lower()] = value.strip()
+            body = b""
+            if "HEAD" not in request and status != 304:
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+            responses.append((status, headers, body))
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return responses
+
+    return asyncio.run(go())
+
+
+def get(path, **headers):
+    lines = [f"GET {path} HTTP/1.1", "Host: localhost"]
+    lines += [f"{name.replace('_', '-')}: {value}" for name, value in headers.items()]
+    return "\r\n".join(lines) + "\r\n\r\n"
+
+
+def test_etag_revalidation(server):
+    (status, headers, body), = fetch(server, get("/styles.css"))
+    assert status == 200 and body == b"body { color: #1f2937; }\n"
+    tag = headers["etag"]
+
+    (status, _, body), (again, _, _) = fetch(
+        server, get("/styles.css", If_None_Match=tag),
+        get("/styles.css", If_None_Match='"other"'))
+    assert status == 304 and body == b""
+    assert again == 200
+
+    write(server.root, "styles.css", "body { color: red; }\n")
+    os.utime(os.path.join(server.root, "styles.css"), ns=(1, 10**18))
+    (status, headers, _), = fetch(server, get("/styles.css", If_None_Match=tag))
+    assert status == 200 and headers["etag"] != tag
+
+
+def test_range_and_redirect(server):
+    (status, headers, body), (moved, where, _) = fetch(
+        server, get("/styles.css", Range="bytes=0-3"),
+        get("/%E0%A4%B2%E0%A5%87%E0%A4%96?tab=2"))
+    assert status == 206 and body == b"body"
+    assert headers["content-range"] == "bytes 0-3/25"
+    assert moved == 301
+    assert where["location"] == "/%E0%A4%B2%E0%A5%87%E0%A4%96/?tab=2"
+
+
+def test_unreadable_file_is_a_500(server, monkeypatch):
+    def denied(path, st):
+        raise PermissionError(13, "Permission denied", path)
+
+    monkeypatch.setattr(server.cache, "get", denied)
+    (status, headers, body), = fetch(server, get("/styles.css"))
+    assert status == 500
+    assert headers["connection"] == "close"
+    assert body == b"500 Internal Server Error\n"
@@ -0,0 +1,1074 @@
+"""Probing, loudness and export engine behind ppvideo.py.
+
+Nothing here needs a display, so it also runs as a command line tool:
+
+    python ppengine.py "clips/*.mp4" --target-lufs -16 --output "out/{stem}.mp4"
+    python ppengine.py talk.mov --gain-db 6
+
+Progress is written to stdout as JSON lines, one event per line:
+"start", "progress" (percent, fps, speed, eta), "done", "error" and a
+final "summary". The exit status is 1 when any file failed.
+
+Every export, from here or from the app, also appends a telemetry record
+(stage timings, bytes in/out, outcome) to ~/.ppvideo/exports.jsonl.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import proglog
+from moviepy import VideoFileClip
+from moviepy.config import FFMPEG_BINARY
+
+
+# Video codecs an .mp4 can hold as they are, so only the audio is re-encoded.
+MP4_COPY_CODECS = {"h264", "hevc", "mpeg4", "av1", "vp9"}
+AUDIO_BITRATE = "192k"
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+# Fields: dir, name, stem, ext and volume (percent, or "auto").
+OUTPUT_TEMPLATE = "{stem}_volume_{volume}.mp4"
+
+# Analysis results, keyed by (path, size, mtime).
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ppvideo")
+
+MAX_VOLUME = 300
+TARGET_LUFS = -16.0
+PEAK_CEILING_DB = -1.0
+LOUDNESS_RATE = 48000
+BLOCK_FRAMES = LOUDNESS_RATE // 10  # 100 ms gating steps
+CHUNK_FRAMES = BLOCK_FRAMES * 50    # 5 s of audio per read
+# Waveform envelope: min/max of every WAVEFORM_BIN samples at 48 kHz.
+WAVEFORM_BIN = 512
+# ITU-R BS.1770 K-weighting at 48 kHz: high shelf, then the RLB high-pass.
+K_WEIGHTING = (
+    "biquad=b0=1.53512485958697:b1=-2.69169618940638:b2=1.19839281085285"
+    ":a0=1:a1=-1.69065929318241:a2=0.73248077421585,"
+    "biquad=b0=1:b1=-2:b2=1:a0=1:a1=-1.99004745483398:a2=0.99007225036621"
+)
+
+# Segment-parallel re-encodes split the video into pieces of at least
+# this many seconds, one ffmpeg process each.
+SEGMENT_MIN_SECONDS = 10
+EXPORT_SEGMENTS = os.cpu_count() or 1
+
+# Re-encode settings. "auto" picks a preset per machine and resolution
+# by timing a few seconds of the input; see resolve_profile().
+ENCODE_PROFILES = {
+    "speed": {"preset": "veryfast", "crf": 26},
+    "balanced": {"preset": "medium", "crf": 23},
+    "quality": {"preset": "slow", "crf": 20},
+}
+DEFAULT_PROFILE = "balanced"
+# Fastest first; auto takes the slowest that still meets the time budget.
+CALIBRATION_PRESETS = ["veryfast", "faster", "medium", "slow"]
+CALIBRATION_SECONDS = 4
+# Auto's default budget: the encode may take this many times the video's length.
+AUTO_TIME_FACTOR = 1.0
+CALIBRATION_FILE = os.path.join(CACHE_DIR, "calibration.json")
+
+# One JSON line per export: stage timings, bytes in/out and the outcome.
+TELEMETRY_LOG = os.path.join(CACHE_DIR, "exports.jsonl")
+
+# Lines of ffmpeg's stderr kept for error messages.
+STDERR_TAIL = 20
+
+# Keep ffmpeg from flashing a console window on Windows.
+NO_WINDOW = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+
+
+def probe_media(path):
+    """Read container and stream details from ffmpeg's header dump.
+
+    Only the header is read (no decoding). audio_channels is 0 without
+    audio, 1 for mono and 2 for anything wider.
+    """
+    result = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-i", path],
+        capture_output=True,
+        text=True,
+        errors="replace",
+        creationflags=NO_WINDOW
+    )
+    text = result.stderr
+    info = {
+        "duration": None,
+        "width": None,
+        "height": None,
+        "fps": None,
+        "video_codec": None,
+        "audio_codec": None,
+        "audio_channels": 0,
+    }
+
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", text)
+    if duration:
+        hours, minutes, seconds = duration.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    video = re.search(r"Stream #\S+.*?: Video: (\w+)([^\n]*)", text)
+    if video:
+        info["video_codec"] = video.group(1)
+        size = re.search(r", (\d{2,5})x(\d{2,5})", video.group(2))
+        if size:
+            info["width"], info["height"] = int(size.group(1)), int(size.group(2))
+        fps = re.search(r", ([\d.]+) (?:fps|tbr)", video.group(2))
+        if fps:
+            info["fps"] = float(fps.group(1))
+
+    audio = re.search(r"Stream #\S+.*?: Audio: (\w+)[^\n]*?Hz, ([^,\n]+)", text)
+    if audio:
+        info["audio_codec"] = audio.group(1)
+        info["audio_channels"] = 1 if audio.group(2) in ("mono", "1 channels") else 2
+
+    if info["video_codec"] is None and info["audio_codec"] is None:
+        message = text.strip().splitlines()[-1] if text.strip() else "unknown error"
+        raise ValueError(f"Could not read media: {message}")
+    return info
+
+
+def cached_probe(path):
+    cached = cache_file("probe", path) + ".json"
+    info = read_cached_json(cached)
+    if info is None:
+        info = probe_media(path)
+        write_cached_json(cached, info)
+    return info
+
+
+def probe_streams(path):
+    """Return (video codec or None, audio channels)."""
+    info = cached_probe(path)
+    return info["video_codec"], info["audio_channels"]
+
+
+def cache_file(kind, path):
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    name = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(CACHE_DIR, kind, name)
+
+
+def read_cached_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cached_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def to_db(power):
+    return float(10 * np.log10(power)) if power > 0 else None
+
+
+def gated_loudness(energies):
+    """Integrated loudness (LUFS) from 100 ms K-weighted energies, BS.1770 gating."""
+    if len(energies) < 4:
+        blocks = np.array([energies.mean()]) if len(energies) else energies
+    else:
+        # 400 ms blocks with 75% overlap
+        blocks = np.convolve(energies, np.ones(4) / 4, mode="valid")
+
+    blocks = blocks[blocks > 10 ** ((-70 + 0.691) / 10)]
+    if not len(blocks):
+        return None
+
+    relative_gate = -0.691 + 10 * np.log10(blocks.mean()) - 10
+    blocks = blocks[blocks > 10 ** ((relative_gate + 0.691) / 10)]
+    return round(float(-0.691 + 10 * np.log10(blocks.mean())), 2)
+
+
+def measure_audio(path):
+    """Stream the first audio track through ffmpeg and measure it in chunks.
+
+    ffmpeg resamples to 48 kHz and sends the raw and the K-weighted signal
+    side by side, so peak/RMS, loudness and the waveform envelope come from
+    one decode without holding more than CHUNK_FRAMES in memory.
+
+    Returns (analysis dict, envelope) where the envelope is an int16 array
+    of (min, max) pairs per WAVEFORM_BIN samples, full scale = 32767.
+    """
+    _, channels = probe_streams(path)
+    if not channels:
+        raise ValueError("This video has no audio track.")
+
+    layout = "mono" if channels == 1 else "stereo"
+    graph = (
+        f"[0:a:0]aresample={LOUDNESS_RATE},"
+        f"aformat=sample_fmts=flt:channel_layouts={layout},asplit[raw][k];"
+        f"[k]{K_WEIGHTING}[kw];[raw][kw]amerge=inputs=2"
+    )
+    process = subprocess.Popen(
+        [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i", path,
+         "-filter_complex", graph, "-f", "f32le", "-"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        creationflags=NO_WINDOW
+    )
+
+    width = channels * 2
+    frame_bytes = width * 4
+    peak = 0.0
+    sum_squares = 0.0
+    frames = 0
+    energies = []
+    pending = np.empty((0, channels), dtype=np.float32)
+    envelope = []
+    pending_lows = pending_highs = np.empty(0, dtype=np.float32)
+
+    with process.stdout:
+        while True:
+            data = process.stdout.read(CHUNK_FRAMES * frame_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % frame_bytes
+            chunk = np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, width)
+            raw, weighted = chunk[:, :channels], chunk[:, channels:]
+
+            peak = max(peak, float(np.abs(raw).max(initial=0)))
+            sum_squares += float(np.square(raw, dtype=np.float64).sum())
+            frames += len(chunk)
+
+            weighted = np.concatenate([pending, weighted])
+            whole = len(weighted) - len(weighted) % BLOCK_FRAMES
+            blocks = weighted[:whole].reshape(-1, BLOCK_FRAMES, channels)
+            energies.append(np.square(blocks, dtype=np.float64).mean(axis=1).sum(axis=1))
+            pending = weighted[whole:]
+
+            # Per frame extremes over all channels, then per bin.
+            lows = np.concatenate([pending_lows, raw.min(axis=1)])
+            highs = np.concatenate([pending_highs, raw.max(axis=1)])
+            whole = len(lows) - len(lows) % WAVEFORM_BIN
+            envelope.append(np.stack([
+                lows[:whole].reshape(-1, WAVEFORM_BIN).min(axis=1),
+                highs[:whole].reshape(-1, WAVEFORM_BIN).max(axis=1),
+            ], axis=1))
+            pending_lows, pending_highs = lows[whole:], highs[whole:]
+    process.wait()
+
+    if not frames:
+        raise ValueError("Could not decode the audio track.")
+
+    rms_db = to_db(sum_squares / (frames * channels))
+    peak_db = to_db(peak * peak)
+    analysis = {
+        "duration": round(frames / LOUDNESS_RATE, 3),
+        "peak_db": round(peak_db, 2) if peak_db is not None else None,
+        "rms_db": round(rms_db, 2) if rms_db is not None else None,
+        "lufs": gated_loudness(np.concatenate(energies)),
+    }
+    envelope = np.concatenate(envelope) if envelope else np.empty((0, 2), dtype=np.float32)
+    return analysis, (np.clip(envelope, -1, 1) * 32767).round().astype(np.int16)
+
+
+def cached_audio(path):
+    """(analysis, envelope) from the cache, measuring the file if needed."""
+    base = cache_file("audio", path)
+    analysis = read_cached_json(base + ".json")
+    try:
+        envelope = np.load(base + ".npy")
+    except (OSError, ValueError):
+        envelope = None
+
+    if analysis is None or envelope is None:
+        analysis, envelope = measure_audio(path)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        tmp = f"{base}.tmp{os.getpid()}.npy"
+        np.save(tmp, envelope)
+        os.replace(tmp, base + ".npy")
+        write_cached_json(base + ".json", analysis)
+    return analysis, envelope
+
+
+def cached_loudness(path):
+    analysis = read_cached_json(cache_file("audio", path) + ".json")
+    return analysis if analysis is not None else cached_audio(path)[0]
+
+
+def auto_gain_db(analysis, target=TARGET_LUFS):
+    """Gain that reaches ``target`` LUFS without pushing peaks over the ceiling."""
+    if analysis["lufs"] is None:
+        return 0.0
+    gain = target - analysis["lufs"]
+    if analysis["peak_db"] is not None:
+        gain = min(gain, PEAK_CEILING_DB - analysis["peak_db"])
+    return gain
+
+
+def auto_volume_percent(analysis, target=TARGET_LUFS):
+    percent = round(100 * 10 ** (auto_gain_db(analysis, target) / 20))
+    return max(0, min(MAX_VOLUME, percent))
+
+
+def list_keyframes(path):
+    """Keyframe times (seconds) of the first video stream, from its packets.
+
+    Packets are copied, not decoded, so this is quick even for long files.
+    framecrc prints an "F=" flags column only for non-keyframe packets.
+    """
+    result = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i", path,
+         "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"],
+        capture_output=True,
+        text=True,
+        errors="replace",
+        creationflags=NO_WINDOW
+    )
+    timebase = re.search(r"^#tb 0: (\d+)/(\d+)", result.stdout, re.M)
+    if timebase is None:
+        return []
+
+    scale = int(timebase.group(1)) / int(timebase.group(2))
+    times = []
+    for line in result.stdout.splitlines():
+        if line.startswith("#") or "F=" in line:
+            continue
+        fields = line.split(",")
+        if len(fields) >= 6:
+            times.append(round(int(fields[2]) * scale, 6))
+    return sorted(times)
+
+
+def cached_keyframes(path):
+    cached = cache_file("keyframes", path) + ".json"
+    times = read_cached_json(cached)
+    if times is None:
+        times = list_keyframes(path)
+        write_cached_json(cached, times)
+    return times
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ProgressMeter:
+    """Turns "this much of the output is written" into progress events.
+
+    on_progress gets a dict with stage, percent, frame, fps, speed (times
+    real time), mb_per_s (input bytes worked through), bytes_out and eta
+    in seconds, at most every ``interval`` seconds. When the writer has no
+    frame counter (ffmpeg counts no frames for a copied stream), frames
+    are worked out from the time written and frame_rate.
+    """
+
+    def __init__(self, duration, on_progress, frame_rate=None, input_bytes=0, interval=0.5):
+        self.duration = duration or 0
+        self.on_progress = on_progress
+        self.frame_rate = frame_rate
+        self.input_bytes = input_bytes
+        self.interval = interval
+        self.stage = None
+        self.started = time.perf_counter()
+        self.last = 0.0
+
+    def start_stage(self, stage):
+        self.stage = stage
+        self.started = time.perf_counter()
+        self.last = 0.0
+
+    def update(self, seconds, frame=None, bytes_out=None, final=False):
+        now = time.perf_counter()
+        if not final and now - self.last < self.interval:
+            return
+        self.last = now
+        if not frame and self.frame_rate:
+            frame = int(seconds * self.frame_rate)
+        elapsed = max(now - self.started, 1e-6)
+        speed = seconds / elapsed
+        fraction = 1.0 if final else (
+            min(0.999, seconds / self.duration) if self.duration else None)
+        eta = 0.0 if final else (
+            max(0.0, (self.duration - seconds) / speed) if self.duration and speed else None)
+        mb_per_s = None
+        if fraction is not None and self.input_bytes:
+            mb_per_s = round(self.input_bytes * fraction / elapsed / (1024 * 1024), 2)
+        self.on_progress({
+            "stage": self.stage,
+            "percent": round(100 * fraction, 1) if fraction is not None else None,
+            "frame": frame,
+            "fps": round(frame / elapsed, 1) if frame else None,
+            "speed": round(speed, 2),
+            "mb_per_s": mb_per_s,
+            "bytes_out": bytes_out,
+            "eta": round(eta, 1) if eta is not None else None,
+        })
+
+
+class StageTimer:
+    """Wall time per named stage of one export, for the telemetry log."""
+
+    def __init__(self):
+        self.stages = {}
+        self.current = None
+        self.started = None
+
+    def start(self, stage):
+        self.stop()
+        self.current = stage
+        self.started = time.perf_counter()
+
+    def stop(self):
+        if self.current is not None:
+            elapsed = time.perf_counter() - self.started
+            self.stages[self.current] = round(self.stages.get(self.current, 0) + elapsed, 3)
+            self.current = None
+
+
+class CancelLogger(proglog.ProgressBarLogger):
+    """Follows MoviePy's audio chunk and video frame counters, and stops the
+    export when asked."""
+
+    # MoviePy progress bar -> stage name
+    STAGES = {"chunk": "audio", "frame_index": "video"}
+
+    def __init__(self, should_cancel=None, meter=None, timer=None, duration=None, fps=None):
+        super().__init__()
+        self.should_cancel = should_cancel
+        self.meter = meter
+        self.timer = timer
+        self.duration = duration
+        self.fps = fps
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if self.should_cancel and self.should_cancel():
+            raise ExportCancelled()
+        stage = self.STAGES.get(bar)
+        if stage is None or attr != "index":
+            return
+        if self.timer and self.timer.current != stage:
+            self.timer.start(stage)
+        if self.meter is None:
+            return
+        if self.meter.stage != stage:
+            self.meter.start_stage(stage)
+        total = self.bars[bar].get("total")
+        if stage == "video" and self.fps:
+            self.meter.update(value / self.fps, value)
+        elif total and self.duration:
+            self.meter.update(self.duration * value / total)
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def run_ffmpeg(command, output_path, should_cancel=None, on_block=None):
+    """Run an ffmpeg command that has "-progress pipe:1".
+
+    ffmpeg writes a key=value block about twice a second, each ending with
+    a "progress" line; on_block gets every finished block as a dict. The
+    process is killed and output_path (if any) removed when should_cancel()
+    is true. Returns (exit code, last STDERR_TAIL lines of stderr).
+    """
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        creationflags=NO_WINDOW
+    )
+    # Drained on its own thread so a chatty stderr cannot stall stdout.
+    errors = deque(maxlen=STDERR_TAIL)
+    drain = threading.Thread(target=lambda: errors.extend(process.stderr), daemon=True)
+    drain.start()
+    block = {}
+    with process.stdout:
+        for line in process.stdout:
+            if should_cancel and should_cancel():
+                process.kill()
+                process.wait()
+                if output_path:
+                    remove_file(output_path)
+                drain.join()
+                raise ExportCancelled()
+            key, _, value = line.strip().partition("=")
+            block[key] = value
+            if key == "progress":
+                if on_block:
+                    on_block(block)
+                block = {}
+    returncode = process.wait()
+    drain.join()
+    process.stderr.close()
+
+    if should_cancel and should_cancel():
+        if output_path:
+            remove_file(output_path)
+        raise ExportCancelled()
+    return returncode, "".join(errors).strip()
+
+
+def block_counters(block):
+    """(seconds written, frames, bytes written) from an ffmpeg progress block."""
+    try:
+        return (int(block.get("out_time_us", 0)) / 1e6,
+                int(block.get("frame", 0)),
+                int(block.get("total_size", 0)))
+    except ValueError:
+        return None
+
+
+def export_audio_only(input_path, output_path, volume_factor, should_cancel=None, meter=None):
+    """Copy the video stream untouched and re-encode only the scaled audio.
+
+    Returns False when the input cannot be remuxed into .mp4 this way, so
+    the caller can fall back to a full re-encode.
+    """
+    codec, channels = probe_streams(input_path)
+    if codec not in MP4_COPY_CODECS or not channels:
+        return False
+
+    command = [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+        "-nostats", "-progress", "pipe:1",
+        "-i", input_path,
+        "-map", "0:v:0", "-map", "0:a:0",
+        "-c:v", "copy",
+        "-af", f"volume={volume_factor:.4f}",
+        "-c:a", "aac", "-b:a", AUDIO_BITRATE,
+        "-map_metadata", "0",
+        "-movflags", "+faststart",
+        output_path
+    ]
+
+    def on_block(block):
+        counters = block_counters(block)
+        if counters:
+            meter.update(*counters, final=block["progress"] == "end")
+
+    if meter:
+        meter.start_stage("copy")
+    returncode, _ = run_ffmpeg(command, output_path, should_cancel, on_block if meter else None)
+    if returncode != 0:
+        remove_file(output_path)
+        return False
+    return True
+
+
+def segment_bounds(keyframes, duration, count):
+    """Split points for ``count`` segments, moved to the nearest keyframes.
+
+    Returns [0, k1, ..., duration]; fewer segments when keyframes are sparse.
+    """
+    count = min(count, int((duration or 0) // SEGMENT_MIN_SECONDS))
+    if count < 2 or not keyframes:
+        return [0.0, duration]
+    cuts = set()
+    for i in range(1, count):
+        target = duration * i / count
+        nearest = min(keyframes, key=lambda t: abs(t - target))
+        if 0 < nearest < duration:
+            cuts.add(nearest)
+    return [0.0] + sorted(cuts) + [duration]
+
+
+def export_segmented(input_path, output_path, volume_factor, segments, settings,
+                     should_cancel=None, meter=None, timer=None):
+    """Re-encode with the video split at keyframes into parallel segments.
+
+    Each segment is encoded by its own ffmpeg process while another one
+    encodes the whole audio track. The segments start on keyframes, so
+    they join with the concat demuxer without another encode, and the
+    audio is muxed in once, so nothing drifts at the joins.
+
+    Returns False when the input is too short or has too few keyframes to
+    be worth splitting.
+    """
+    info = cached_probe(input_path)
+    duration = info["duration"]
+    if not info["audio_channels"]:
+        raise ValueError("This video has no audio track.")
+    if not info["video_codec"] or not duration or not info["fps"]:
+        return False
+
+    if timer:
+        timer.start("keyframes")
+    bounds = segment_bounds(cached_keyframes(input_path), duration, segments)
+    if len(bounds) < 3:
+        return False
+
+    # Each segment seeks to a hair before its keyframe (the printed time
+    # may round up past it) and stops half a frame before the next one,
+    # so every frame lands in exactly one segment.
+    half_frame = 0.5 / info["fps"]
+    # Calibrated settings say how many threads an encode should get.
+    threads = settings.get("threads") or max(1, (os.cpu_count() or 1) // (len(bounds) - 1))
+    work_dir = tempfile.mkdtemp(prefix="ppvideo-", dir=os.path.dirname(os.path.abspath(output_path)))
+    parts = [os.path.join(work_dir, f"part{i:03d}.mp4") for i in range(len(bounds) - 1)]
+    audio_path = os.path.join(work_dir, "audio.m4a")
+    base = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y", "-nostats",
+            "-progress", "pipe:1"]
+
+    commands = [base + ["-i", input_path, "-map", "0:a:0", "-vn",
+                        "-af", f"volume={volume_factor:.4f}",
+                        "-c:a", "aac", "-b:a", AUDIO_BITRATE, audio_path]]
+    for part, start, end in zip(parts, bounds, bounds[1:]):
+        length = end - start - half_frame if end < duration else duration - start
+        start = max(0.0, start - 0.0001)
+        commands.append(base + [
+            "-ss", f"{start:.6f}", "-i", input_path, "-t", f"{length:.6f}",
+            "-map", "0:v:0", "-an",
+            "-c:v", "libx264", "-preset", settings["preset"],
+            "-crf", str(settings["crf"]), "-pix_fmt", "yuv420p",
+            "-threads", str(threads),
+            part
+        ])
+
+    # Progress is the video written over all segments.
+    written = [0.0] * len(commands)
+    lock = threading.Lock()
+
+    def watcher(index):
+        def on_block(block):
+            counters = block_counters(block)
+            if counters and index:
+                with lock:
+                    written[index] = counters[0]
+                    meter.update(sum(written))
+        return on_block if meter else None
+
+    cancelled = threading.Event()
+
+    def run(index):
+        stop = lambda: cancelled.is_set() or bool(should_cancel and should_cancel())
+        output = audio_path if index == 0 else parts[index - 1]
+        returncode, errors = run_ffmpeg(commands[index], output, stop, watcher(index))
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg could not encode {os.path.basename(output)}: {errors}")
+
+    try:
+        if timer:
+            timer.start("segments")
+        if meter:
+            meter.start_stage("segments")
+        with ThreadPoolExecutor(max_workers=len(commands)) as pool:
+            futures = [pool.submit(run, i) for i in range(len(commands))]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                cancelled.set()
+                raise
+
+        if timer:
+            timer.start("concat")
+        list_path = os.path.join(work_dir, "parts.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for part in parts:
+                f.write("file '{}'\n".format(part.replace("'", "'\\''")))
+        result = subprocess.run(
+            [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+             "-f", "concat", "-safe", "0", "-i", list_path, "-i", audio_path,
+             "-map", "0:v:0", "-map", "1:a:0", "-c", "copy",
+             "-movflags", "+faststart", output_path],
+            capture_output=True,
+            text=True,
+            errors="replace",
+            creationflags=NO_WINDOW
+        )
+        if result.returncode != 0:
+            remove_file(output_path)
+            raise RuntimeError(f"ffmpeg could not join the segments: {result.stderr.strip()}")
+        if meter:
+            meter.update(duration, bytes_out=os.path.getsize(output_path), final=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return True
+
+
+def reencode_file(input_path, output_path, volume_factor, settings,
+                  should_cancel=None, meter=None, timer=None):
+    video = VideoFileClip(input_path)
+    try:
+        if video.audio is None:
+            raise ValueError("This video has no audio track.")
+
+        new_audio = video.audio.with_volume_scaled(volume_factor)
+        final_video = video.with_audio(new_audio)
+
+        logger = None
+        if should_cancel or meter or timer:
+            logger = CancelLogger(should_cancel, meter, timer, video.duration, video.fps)
+        final_video.write_videofile(
+            output_path,
+            codec="libx264",
+            audio_codec="aac",
+            fps=video.fps,
+            preset=settings["preset"],
+            threads=settings.get("threads"),
+            ffmpeg_params=["-crf", str(settings["crf"])],
+            logger=logger
+        )
+        final_video.close()
+        if meter:
+            meter.update(video.duration, int(video.duration * video.fps),
+                         os.path.getsize(output_path), final=True)
+    except ExportCancelled:
+        remove_file(output_path)
+        raise
+    finally:
+        video.close()
+
+
+def calibration_key(info):
+    """Calibration results hold for one machine and one kind of input."""
+    return "|".join([
+        platform.node(), platform.machine(), str(os.cpu_count()),
+        f"{info['width']}x{info['height']}@{info['fps']}",
+    ])
+
+
+def time_encode(input_path, start, length, preset, threads, should_cancel=None):
+    """Media seconds encoded per wall second for a clip of the input."""
+    command = [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-nostats",
+        "-progress", "pipe:1",
+        "-ss", f"{start:.3f}", "-i", input_path, "-t", f"{length:.3f}",
+        "-map", "0:v:0", "-an",
+        "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p",
+        "-threads", str(threads),
+        "-f", "null", "-"
+    ]
+    started = time.perf_counter()
+    if run_ffmpeg(command, None, should_cancel)[0] != 0:
+        return None
+    return length / max(time.perf_counter() - started, 1e-6)
+
+
+def calibrate(input_path, max_seconds=None, should_cancel=None):
+    """Encoder settings for the "auto" profile.
+
+    Times CALIBRATION_SECONDS from the middle of the input with each preset
+    (fastest first) and a full or half share of the cores, and returns the
+    slowest preset whose predicted encode time stays within max_seconds
+    (default: AUTO_TIME_FACTOR times the video's length). Timings are kept
+    in CALIBRATION_FILE per machine and resolution, so this runs once.
+    """
+    info = cached_probe(input_path)
+    duration = info["duration"] or 0
+    budget = max_seconds or duration * AUTO_TIME_FACTOR
+    cpus = os.cpu_count() or 1
+    thread_counts = sorted({cpus, max(1, cpus // 2)}, reverse=True)
+
+    key = calibration_key(info)
+    cache = read_cached_json(CALIBRATION_FILE) or {}
+    timings = cache.setdefault(key, {})
+    length = min(CALIBRATION_SECONDS, duration) or CALIBRATION_SECONDS
+    start = max(0.0, duration / 2 - length / 2)
+
+    best = None
+    for preset in CALIBRATION_PRESETS:
+        choice = None
+        for threads in thread_counts:
+            name = f"{preset}|{threads}"
+            speed = timings.get(name)
+            if speed is None:
+                # Only finished measurements are kept; a failed trial is retried.
+                speed = time_encode(input_path, start, length, preset, threads,
+                                    should_cancel)
+                if speed is not None:
+                    timings[name] = speed
+                    write_cached_json(CALIBRATION_FILE, cache)
+            if speed and (choice is None or speed > choice["speed"]):
+                choice = {"preset": preset, "threads": threads, "speed": speed}
+        if choice is None:
+            continue
+        if best is not None and duration / choice["speed"] > budget:
+            break
+        best = choice
+        # Slower presets only get slower; stop once this one misses.
+        if duration / choice["speed"] > budget:
+            break
+
+    if best is None:
+        return dict(ENCODE_PROFILES[DEFAULT_PROFILE])
+    return {"preset": best["preset"], "threads": best["threads"],
+            "crf": ENCODE_PROFILES[DEFAULT_PROFILE]["crf"],
+            "speed": round(best["speed"], 2)}
+
+
+def resolve_profile(input_path, profile, max_seconds=None, should_cancel=None):
+    """Encoder settings (preset, crf, threads) for a profile name."""
+    if profile == "auto":
+        return calibrate(input_path, max_seconds, should_cancel)
+    return dict(ENCODE_PROFILES.get(profile, ENCODE_PROFILES[DEFAULT_PROFILE]))
+
+
+def record_export(record, path=None):
+    """Append one export's telemetry as a line of TELEMETRY_LOG."""
+    path = path or TELEMETRY_LOG
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+def export_file(input_path, output_path, volume_factor, copy_video=True,
+                should_cancel=None, on_progress=None, segments=1,
+                profile=DEFAULT_PROFILE, max_seconds=None):
+    """Write ``input_path`` with its audio scaled by ``volume_factor``.
+
+    The video stream is copied when possible. Otherwise it is re-encoded
+    with the encoder ``profile`` (see ENCODE_PROFILES, or "auto"), split
+    into up to ``segments`` parallel pieces when that is more than one
+    and the video is long enough, else with MoviePy. Every export,
+    finished or not, is appended to TELEMETRY_LOG with its stage timings
+    and bytes in/out.
+    """
+    timer = StageTimer()
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "input": os.path.abspath(input_path),
+        "output": os.path.abspath(output_path),
+        "volume_factor": round(volume_factor, 4),
+        "bytes_in": os.path.getsize(input_path),
+        "method": "copy",
+        "status": "failed",
+    }
+    started = time.perf_counter()
+    try:
+        timer.start("probe")
+        info = cached_probe(input_path)
+        record["duration"] = info["duration"]
+        meter = None
+        if on_progress:
+            meter = ProgressMeter(info["duration"], on_progress, info["fps"], record["bytes_in"])
+
+        timer.start("copy")
+        if not (copy_video and export_audio_only(input_path, output_path, volume_factor,
+                                                 should_cancel, meter)):
+            timer.start("calibrate")
+            if meter and profile == "auto":
+                meter.start_stage("calibrate")
+            settings = resolve_profile(input_path, profile, max_seconds, should_cancel)
+            record["profile"] = profile
+            record["encoder"] = settings
+            timer.stop()
+
+            record["method"] = "segmented"
+            if not (segments > 1 and export_segmented(input_path, output_path, volume_factor,
+                                                      segments, settings, should_cancel,
+                                                      meter, timer)):
+                record["method"] = "reencode"
+                reencode_file(input_path, output_path, volume_factor, settings,
+                              should_cancel, meter, timer)
+        timer.stop()
+        record["status"] = "done"
+        record["bytes_out"] = os.path.getsize(output_path)
+    except ExportCancelled:
+        record["status"] = "cancelled"
+        raise
+    except Exception as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        timer.stop()
+        record["stages"] = timer.stages
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        record_export(record)
+
+
+def resolve_volume(input_path, volume, target=TARGET_LUFS):
+    """Volume percent for ``volume``, measuring the file when it is "auto"."""
+    if volume == "auto":
+        return auto_volume_percent(cached_loudness(input_path), target)
+    return volume
+
+
+def gain_to_percent(gain_db):
+    return 100 * 10 ** (gain_db / 20)
+
+
+def output_name(template, input_path, volume):
+    """Fill an output template such as OUTPUT_TEMPLATE for one input."""
+    name = os.path.basename(input_path)
+    stem, ext = os.path.splitext(name)
+    if volume != "auto":
+        volume = f"{volume:.0f}"
+    return template.format(
+        dir=os.path.dirname(os.path.abspath(input_path)),
+        name=name,
+        stem=stem,
+        ext=ext,
+        volume=volume
+    )
+
+
+def run_batch_job(input_path, output_path, volume_percent, copy_video, target=TARGET_LUFS,
+                  profile=DEFAULT_PROFILE):
+    """Process pool entry point. Creating output_path + ".cancel" stops it.
+
+    A volume of "auto" levels the file to ``target`` LUFS first.
+    """
+    marker = output_path + ".cancel"
+    started = time.time()
+    try:
+        volume_percent = resolve_volume(input_path, volume_percent, target)
+        export_file(input_path, output_path, volume_percent / 100, copy_video,
+                    should_cancel=lambda: os.path.exists(marker), profile=profile)
+    finally:
+        remove_file(marker)
+    return time.time() - started
+
+
+def load_journal(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("jobs", [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_journal(path, jobs):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"jobs": jobs}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def expand_inputs(patterns):
+    """Input files for command line patterns: globs, files and folders."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isdir(path):
+                found = sorted(
+                    os.path.join(path, name) for name in os.listdir(path)
+                    if name.lower().endswith(VIDEO_EXTENSIONS)
+                )
+            else:
+                found = [path]
+            for item in found:
+                if item not in paths:
+                    paths.append(item)
+    return paths
+
+
+def process_file(input_path, template, volume, copy_video, target, emit,
+                 should_cancel=None, segments=1, profile=DEFAULT_PROFILE, max_seconds=None):
+    """Export one file for the command line, reporting through ``emit``."""
+    started = time.time()
+    try:
+        percent = resolve_volume(input_path, volume, target)
+        output_path = output_name(template, input_path, percent)
+        if os.path.abspath(output_path) == os.path.abspath(input_path):
+            raise ValueError("the output template would overwrite the input")
+        folder = os.path.dirname(output_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        emit({"event": "start", "input": input_path, "output": output_path,
+              "volume": round(percent, 1)})
+        export_file(
+            input_path, output_path, percent / 100, copy_video,
+            should_cancel=should_cancel,
+            segments=segments,
+            profile=profile,
+            max_seconds=max_seconds,
+            on_progress=lambda progress: emit({"event": "progress", "input": input_path, **progress})
+        )
+        emit({"event": "done", "input": input_path, "output": output_path,
+              "seconds": round(time.time() - started, 2),
+              "bytes": os.path.getsize(output_path)})
+        return True
+    except ExportCancelled:
+        emit({"event": "cancelled", "input": input_path})
+    except Exception as e:
+        emit({"event": "error", "input": input_path, "error": str(e)})
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Change the volume of videos and report progress as JSON lines."
+    )
+    parser.add_argument("inputs", nargs="+", help="video files, folders or glob patterns")
+    level = parser.add_mutually_exclusive_group(required=True)
+    level.add_argument("--volume", type=float, help="volume in percent (100 = unchanged)")
+    level.add_argument("--gain-db", type=float, help="gain in dB")
+    level.add_argument("--target-lufs", type=float,
+                       help=f"level each file to this loudness (the app uses {TARGET_LUFS:g})")
+    parser.add_argument("--output", default=os.path.join("{dir}", OUTPUT_TEMPLATE),
+                        help="output path template with {dir}, {name}, {stem}, {ext} "
+                             "and {volume} (default: %(default)s)")
+    parser.add_argument("--reencode", action="store_true",
+                        help="re-encode the video too instead of copying it")
+    parser.add_argument("--profile", choices=list(ENCODE_PROFILES) + ["auto"],
+                        default=DEFAULT_PROFILE, help="encoder settings for re-encodes")
+    parser.add_argument("--max-seconds", type=float,
+                        help="time budget per file for --profile auto "
+                             f"(default: {AUTO_TIME_FACTOR:g} x the video's length)")
+    parser.add_argument("--jobs", type=int, default=1, help="files exported at once")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="split re-encodes of long videos into this many parallel "
+                             f"pieces (this machine has {EXPORT_SEGMENTS} cores)")
+    args = parser.parse_args(argv)
+
+    if args.target_lufs is not None:
+        volume, target = "auto", args.target_lufs
+    elif args.gain_db is not None:
+        volume, target = gain_to_percent(args.gain_db), TARGET_LUFS
+    else:
+        volume, target = args.volume, TARGET_LUFS
+    if volume != "auto" and not 0 <= volume <= MAX_VOLUME:
+        parser.error(f"volume must be between 0 and {MAX_VOLUME}%")
+
+    inputs = expand_inputs(args.inputs)
+    lock = threading.Lock()
+    cancelled = threading.Event()
+
+    def emit(event):
+        with lock:
+            print(json.dumps(event), flush=True)
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [
+            pool.submit(process_file, path, args.output, volume, not args.reencode,
+                        target, emit, cancelled.is_set, args.segments, args.profile,
+                        args.max_seconds)
+            for path in inputs
+        ]
+        try:
+            results = [future.result() for future in futures]
+        except KeyboardInterrupt:
+            cancelled.set()
+            results = [future.result() for future in futures]
+
+    emit({"event": "summary", "files": len(inputs), "done": sum(results),
+          "failed": len(results) - sum(results),
+          "seconds": round(time.time() - started, 2)})
+    return 0 if inputs and all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,547 @@
+import bisect
 import os
+import subprocess
 import threading
+import time
 import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from tkinter import filedialog, messagebox
 
 import customtkinter as ctk
-from moviepy import VideoFileClip
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
 from PIL import Image, ImageTk
 
+from ppengine import (DEFAULT_PROFILE, ENCODE_PROFILES, EXPORT_SEGMENTS,
+                      NO_WINDOW, OUTPUT_TEMPLATE, TARGET_LUFS,
+                      VIDEO_EXTENSIONS, ExportCancelled, auto_gain_db,
+                      auto_volume_percent, cached_audio, cached_keyframes,
+                      cached_loudness, cached_probe, export_file,
+                      load_journal, output_name, remove_file, run_batch_job,
+                      save_journal)
+
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# Written to the batch output folder so an interrupted batch can resume.
+JOURNAL_NAME = ".ppvideo-batch.json"
+BATCH_POLL_MS = 400
+# Probes are mostly waiting on ffmpeg and disk, so a few run at once.
+PROBE_WORKERS = 4
+
+# Coarser waveform zoom levels each merge WAVEFORM_ZOOM columns of the
+# engine's envelope.
+WAVEFORM_ZOOM = 4
+WAVEFORM_LEVELS = 6
+WAVEFORM_HEIGHT = 70
+
+PREVIEW_FPS = 12
+PREVIEW_MAX_SIZE = (480, 250)
+# About 70 MB of RGB frames at the largest preview size.
+FRAME_CACHE_SIZE = 200
+PREFETCH_FRAMES = PREVIEW_FPS * 4
+
+
+def envelope_levels(envelope):
+    """Zoom levels of a (min, max) envelope, finest first, as floats."""
+    levels = [envelope.astype(np.float32) / 32767]
+    while len(levels) < WAVEFORM_LEVELS and len(levels[-1]) > WAVEFORM_ZOOM:
+        level = levels[-1]
+        pad = -len(level) % WAVEFORM_ZOOM
+        if pad:
+            level = np.concatenate([level, np.repeat(level[-1:], pad, axis=0)])
+        level = level.reshape(-1, WAVEFORM_ZOOM, 2)
+        levels.append(np.stack([level[:, :, 0].min(axis=1), level[:, :, 1].max(axis=1)], axis=1))
+    return levels
+
+
+def true_runs(mask):
+    """(start, end) index pairs of the runs of True in a boolean array."""
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.astype(np.int8), [0]])))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def envelope_columns(levels, width):
+    """(mins, maxs) for ``width`` pixel columns from the coarsest level that
+    still has at least one entry per column."""
+    level = levels[0]
+    for candidate in levels:
+        if len(candidate) >= width:
+            level = candidate
+    if not len(level):
+        return np.zeros(width), np.zeros(width)
+
+    edges = np.linspace(0, len(level), width + 1).astype(int)[:-1]
+    edges = np.minimum(edges, len(level) - 1)
+    return (np.minimum.reduceat(level[:, 0], edges),
+            np.maximum.reduceat(level[:, 1], edges))
+
+
+def preview_size(size):
+    width, height = size
+    scale = min(PREVIEW_MAX_SIZE[0] / width, PREVIEW_MAX_SIZE[1] / height, 1)
+    # Even dimensions keep the scaler happy with subsampled sources.
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+class PreviewDecoder:
+    """Decodes downscaled preview frames on a background thread.
+
+    Frames are numbered at PREVIEW_FPS and kept in a bounded LRU. The thread
+    stays PREFETCH_FRAMES ahead of the playhead; after a seek it restarts
+    ffmpeg at the keyframe before the playhead, so it never decodes from
+    the start of the file. Tk objects are only made on the main thread.
+    """
+
+    def __init__(self, path, size, duration):
+        self.path = path
+        self.width, self.height = preview_size(size)
+        self.last_frame = max(0, int(duration * PREVIEW_FPS) - 1)
+        self.frames = OrderedDict()
+        self.keyframes = []
+        self.playhead = 0
+        self.process = None
+        self.closed = False
+        self.lock = threading.Condition()
+
+        threading.Thread(target=self.load_keyframes, daemon=True).start()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def load_keyframes(self):
+        try:
+            times = cached_keyframes(self.path)
+        except OSError:
+            return
+        with self.lock:
+            self.keyframes = times
+
+    def get(self, index):
+        with self.lock:
+            frame = self.frames.get(index)
+            if frame is not None:
+                self.frames.move_to_end(index)
+            return frame
+
+    def seek(self, index):
+        with self.lock:
+            self.playhead = max(0, min(index, self.last_frame))
+            self.lock.notify()
+
+    def snap(self, seconds):
+        """Nearest keyframe, or ``seconds`` until the keyframes are known."""
+        with self.lock:
+            keyframes = self.keyframes
+        if not keyframes:
+            return seconds
+        i = bisect.bisect_left(keyframes, seconds)
+        return min(keyframes[max(0, i - 1):i + 1], key=lambda k: abs(k - seconds))
+
+    def keyframe_before(self, seconds):
+        i = bisect.bisect_right(self.keyframes, seconds)
+        return self.keyframes[i - 1] if i else 0.0
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify()
+        self.stop_process()
+
+    def stop_process(self):
+        process, self.process = self.process, None
+        if process is not None:
+            process.kill()
+            process.wait()
+
+    def next_missing(self):
+        end = min(self.playhead + PREFETCH_FRAMES, self.last_frame + 1)
+        for index in range(self.playhead, end):
+            if index not in self.frames:
+                return index
+        return None
+
+    def start_process(self, seconds):
+        self.stop_process()
+        self.process = subprocess.Popen(
+            [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+             "-ss", f"{seconds:.6f}", "-i", self.path, "-an", "-sn",
+             "-vf", f"fps={PREVIEW_FPS},scale={self.width}:{self.height}",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=NO_WINDOW
+        )
+
+    def run(self):
+        frame_bytes = self.width * self.height * 3
+        position = None
+
+        while True:
+            with self.lock:
+                while not self.closed and self.next_missing() is None:
+                    self.lock.wait()
+                if self.closed:
+                    break
+                target = self.next_missing()
+                start = self.keyframe_before(target / PREVIEW_FPS)
+
+            # Restart when going backwards, or when a keyframe lies between
+            # the decoder and the target.
+            if (self.process is None or target < position
+                    or start * PREVIEW_FPS > position + 1):
+                self.start_process(start)
+                position = round(start * PREVIEW_FPS)
+
+            process = self.process
+            data = process.stdout.read(frame_bytes) if process else b""
+            if len(data) < frame_bytes:
+                self.stop_process()
+                with self.lock:
+                    if not self.closed and process is not None:
+                        # End of stream: nothing more to prefetch past here.
+                        self.last_frame = max(0, min(self.last_frame, position - 1))
+                        self.playhead = min(self.playhead, self.last_frame)
+                continue
+
+            image = Image.frombuffer("RGB", (self.width, self.height), data, "raw", "RGB", 0, 1)
+            with self.lock:
+                self.frames[position] = image
+                self.frames.move_to_end(position)
+                while len(self.frames) > FRAME_CACHE_SIZE:
+                    self.frames.popitem(last=False)
+            position += 1
+
+        self.stop_process()
+
+
+class BatchWindow(ctk.CTkToplevel):
+    STATUS_COLORS = {
+        "queued": "#b8c4d9",
+        "running": "#93c5fd",
+        "done": "#6ee787",
+        "failed": "#f87171",
+        "cancelled": "#fbbf24",
+    }
+
+    def __init__(self, app):
+        super().__init__(app)
+
+        self.app = app
+        self.title("Batch Volume Change")
+        self.geometry("820x540")
+        self.configure(fg_color="#07111f")
+
+        self.jobs = []
+        self.rows = []
+        self.futures = {}
+        self.pool = None
+        self.started_at = None
+        self.journal_path = None
+        self.probe_pool = ThreadPoolExecutor(max_workers=PROBE_WORKERS)
+
+        top = ctk.CTkFrame(self, fg_color="transparent")
+        top.pack(fill="x", padx=16, pady=(16, 8))
+
+        buttons = [
+            ("➕ Add Files", self.add_files),
+            ("📁 Add Folder", self.add_folder),
+            ("▶ Start", self.start),
+        ]
+
+        for text, command in buttons:
+            ctk.CTkButton(
+                top,
+                text=text,
+                command=command,
+                width=120,
+                height=38,
+                fg_color="#15233a",
+                hover_color="#263855",
+                border_width=1,
+                border_color="#7c3aed"
+            ).pack(side="left", padx=(0, 10))
+
+        self.auto_level = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            top,
+            text="🎚 Auto level",
+            variable=self.auto_level,
+            font=("Segoe UI", 14),
+            text_color="#dbe5f5",
+            fg_color="#7c3aed",
+            hover_color="#6d28d9"
+        ).pack(side="left", padx=(0, 10))
+
+        self.summary_label = ctk.CTkLabel(
+            top,
+            text="Add videos to start",
+            font=("Segoe UI", 14),
+            text_color="#dbe5f5"
+        )
+        self.summary_label.pack(side="right")
+
+        self.list_frame = ctk.CTkScrollableFrame(
+            self,
+            fg_color="#101c31",
+            border_width=1,
+            border_color="#263855",
+            corner_radius=12
+        )
+        self.list_frame.pack(fill="both", expand=True, padx=16, pady=(0, 16))
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def add_files(self):
+        paths = filedialog.askopenfilenames(
+            parent=self,
+            title="Select Videos",
+            filetypes=[
+                ("Video Files", "*.mp4 *.mov *.avi *.mkv *.webm"),
+                ("All Files", "*.*")
+            ]
+        )
+        for path in paths:
+            self.add_job(path)
+
+    def add_folder(self):
+        folder = filedialog.askdirectory(parent=self, title="Choose Folder of Videos")
+        if not folder:
+            return
+
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(VIDEO_EXTENSIONS):
+                self.add_job(os.path.join(folder, name))
+
+    def add_job(self, path, job=None):
+        if any(existing["input"] == path for existing in self.jobs):
+            return
+
+        if job is None:
+            job = {
+                "input": path,
+                "output": None,
+                "volume": "auto" if self.auto_level.get() else self.app.volume_percent.get(),
+                "copy_video": self.app.copy_video.get(),
+                "profile": self.app.encode_profile.get().lower(),
+                "bytes": os.path.getsize(path),
+                "status": "queued",
+            }
+        self.jobs.append(job)
+
+        index = len(self.jobs) - 1
+        row = ctk.CTkFrame(self.list_frame, fg_color="transparent")
+        row.pack(fill="x", padx=10, pady=4)
+
+        name_label = ctk.CTkLabel(
+            row,
+            text=self.job_title(job),
+            anchor="w",
+            font=("Segoe UI", 14),
+            text_color="white"
+        )
+        name_label.pack(side="left", fill="x", expand=True)
+
+        cancel_btn = ctk.CTkButton(
+            row,
+            text="✕",
+            width=36,
+            height=30,
+            fg_color="#1b2a44",
+            hover_color="#7f1d1d",
+            command=lambda i=index: self.cancel_job(i)
+        )
+        cancel_btn.pack(side="right", padx=(10, 0))
+
+        status_label = ctk.CTkLabel(
+            row,
+            text="",
+            width=220,
+            anchor="e",
+            font=("Segoe UI", 13)
+        )
+        status_label.pack(side="right")
+
+        self.rows.append((name_label, status_label, cancel_btn))
+        self.update_row(index)
+        self.update_summary()
+
+        self.probe_pool.submit(self.probe_job, index)
+
+    def probe_job(self, index):
+        try:
+            info = cached_probe(self.jobs[index]["input"])
+        except (OSError, ValueError):
+            return
+        self.after(0, self.job_probed, index, info)
+
+    def job_probed(self, index, info):
+        job = self.jobs[index]
+        job["duration"] = info["duration"]
+        job["has_audio"] = bool(info["audio_channels"])
+        self.rows[index][0].configure(text=self.job_title(job))
+
+    @staticmethod
+    def job_title(job):
+        volume = "auto" if job["volume"] == "auto" else f"{job['volume']}%"
+        parts = [os.path.basename(job["input"]), volume]
+        if job.get("duration"):
+            parts.append(VideoVolumeChangerApp.format_time(int(job["duration"])))
+        if job.get("has_audio") is False:
+            parts.append("no audio")
+        return "  ·  ".join(parts)
+
+    def update_row(self, index):
+        job = self.jobs[index]
+        _, status_label, cancel_btn = self.rows[index]
+
+        text = job["status"]
+        if job["status"] == "done":
+            text = f"done in {job['seconds']:.1f}s"
+        elif job["status"] == "failed":
+            text = f"failed: {job.get('error', '')[:40]}"
+
+        status_label.configure(text=text, text_color=self.STATUS_COLORS[job["status"]])
+        finished = job["status"] in ("done", "failed", "cancelled")
+        cancel_btn.configure(state="disabled" if finished else "normal")
+
+    def update_summary(self):
+        counts = {}
+        for job in self.jobs:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+
+        parts = [f"{counts.get('done', 0)}/{len(self.jobs)} done"]
+        for status in ("running", "failed", "cancelled"):
+            if counts.get(status):
+                parts.append(f"{counts[status]} {status}")
+
+        if self.started_at:
+            elapsed = max(time.time() - self.started_at, 0.001)
+            done_bytes = sum(job["bytes"] for job in self.jobs if job["status"] == "done")
+            parts.append(f"{done_bytes / (1024 * 1024) / elapsed:.1f} MB/s")
+
+        self.summary_label.configure(text="  ·  ".join(parts))
+
+    def start(self):
+        if self.pool is not None:
+            return
+
+        folder = self.app.output_folder_entry.get().strip()
+        if not folder:
+            folder = filedialog.askdirectory(parent=self, title="Choose Output Folder")
+        if not folder:
+            return
+
+        self.journal_path = os.path.join(folder, JOURNAL_NAME)
+        unfinished = [job for job in load_journal(self.journal_path)
+                      if job["status"] not in ("done", "cancelled")
+                      and os.path.exists(job["input"])]
+        if unfinished and messagebox.askyesno(
+            "Resume Batch",
+            f"{len(unfinished)} unfinished job(s) from an earlier batch "
+            "were found in this folder.\n\nResume them?",
+            parent=self
+        ):
+            for job in unfinished:
+                job["status"] = "queued"
+                self.add_job(job["input"], job)
+
+        queued = [i for i, job in enumerate(self.jobs) if job["status"] == "queued"]
+        if not queued:
+            messagebox.showinfo("Batch", "There are no queued videos.", parent=self)
+            return
+
+        self.pool = ProcessPoolExecutor(max_workers=min(len(queued), os.cpu_count() or 1))
+        self.started_at = time.time()
+
+        for index in queued:
+            job = self.jobs[index]
+            if not job["output"]:
+                job["output"] = os.path.join(
+                    folder, output_name(OUTPUT_TEMPLATE, job["input"], job["volume"]))
+            remove_file(job["output"] + ".cancel")
+            self.futures[index] = self.pool.submit(
+                run_batch_job, job["input"], job["output"], job["volume"], job["copy_video"],
+                TARGET_LUFS, job.get("profile", DEFAULT_PROFILE))
+
+        save_journal(self.journal_path, self.jobs)
+        self.app.set_status(f"🔄 Batch: {len(queued)} video(s) queued", "#93c5fd")
+        self.after(BATCH_POLL_MS, self.poll)
+
+    def poll(self):
+        changed = False
+
+        for index, future in list(self.futures.items()):
+            job = self.jobs[index]
+
+            if future.done():
+                del self.futures[index]
+                error = None if future.cancelled() else future.exception()
+                if future.cancelled() or isinstance(error, ExportCancelled):
+                    job["status"] = "cancelled"
+                elif error is not None:
+                    job["status"] = "failed"
+                    job["error"] = str(error)
+                else:
+                    job["status"] = "done"
+                    job["seconds"] = future.result()
+            elif future.running() and job["status"] == "queued":
+                job["status"] = "running"
+            else:
+                continue
+
+            changed = True
+            self.update_row(index)
+
+        self.update_summary()
+        if changed:
+            save_journal(self.journal_path, self.jobs)
+
+        if self.futures:
+            self.after(BATCH_POLL_MS, self.poll)
+        else:
+            self.pool.shutdown()
+            self.pool = None
+            self.app.set_status("✅ Batch finished", "#6ee787")
+
+    def cancel_job(self, index):
+        job = self.jobs[index]
+        future = self.futures.get(index)
+
+        if future is None:
+            if job["status"] == "queued":
+                job["status"] = "cancelled"
+                self.update_row(index)
+                self.update_summary()
+        elif not future.cancel():
+            # Already running in a worker: it checks for this file.
+            open(job["output"] + ".cancel", "w").close()
+
+    def on_close(self):
+        if self.pool is not None:
+            for index, future in self.futures.items():
+                job = self.jobs[index]
+                if not future.cancel():
+                    open(job["output"] + ".cancel", "w").close()
+                # Left as queued so the next Start offers to resume them.
+                job["status"] = "queued"
+            save_journal(self.journal_path, self.jobs)
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+        self.probe_pool.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
 
 class VideoVolumeChangerApp(ctk.CTk):
+    EXPORT_STAGES = {
+        "copy": "Writing audio",
+        "audio": "Encoding audio",
+        "video": "Encoding video",
+        "segments": "Encoding segments",
+        "calibrate": "Calibrating encoder",
+    }
+
     def __init__(self):
         super().__init__()
 
@@ -23,6 +552,17 @@ class VideoVolumeChangerApp(ctk.CTk):
         self.video_path = None
         self.output_folder = None
         self.volume_percent = tk.IntVar(value=100)
+        self.copy_video = tk.BooleanVar(value=True)
+        self.parallel_export = tk.BooleanVar(value=EXPORT_SEGMENTS > 1)
+        # Only used when the video is re-encoded.
+        self.encode_profile = tk.StringVar(value=DEFAULT_PROFILE.title())
+        self.batch_window = None
+
+        self.player = None
+        self.playing = False
+        self.play_index = 0
+        self.shown_index = None
+        self.preview_image = None
 
         self.video_duration = "00:00:00"
         self.video_resolution = "-"
@@ -31,6 +571,8 @@ class VideoVolumeChangerApp(ctk.CTk):
         self.video_audio = "-"
 
         self.build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.refresh_preview()
 
     def build_ui(self):
         self.configure(fg_color="#07111f")
@@ -78,6 +620,7 @@ class VideoVolumeChangerApp(ctk.CTk):
             ("📁  Open Video", self.select_video),
             ("🔊  Change Volume", self.focus_volume),
             ("📄  Export", self.export_video_start),
+            ("📚  Batch", self.open_batch),
             ("ℹ️  About", self.show_about),
         ]
 
@@ -125,6 +668,7 @@ class VideoVolumeChangerApp(ctk.CTk):
         self.create_preview_section()
         self.create_file_info_section()
         self.create_volume_section()
+        self.create_waveform_section()
         self.create_output_section()
 
     def section_title(self, parent, text):
@@ -170,16 +714,17 @@ class VideoVolumeChangerApp(ctk.CTk):
         )
         controls.pack(fill="x", padx=16, pady=14)
 
-        play_btn = ctk.CTkButton(
+        self.play_btn = ctk.CTkButton(
             controls,
             text="▶",
             width=48,
             height=40,
             corner_radius=8,
             fg_color="#1b2a44",
-            hover_color="#263855"
+            hover_color="#263855",
+            command=self.toggle_play
         )
-        play_btn.pack(side="left", padx=(0, 10))
+        self.play_btn.pack(side="left", padx=(0, 10))
 
         stop_btn = ctk.CTkButton(
             controls,
@@ -188,22 +733,24 @@ class VideoVolumeChangerApp(ctk.CTk):
             height=40,
             corner_radius=8,
             fg_color="#1b2a44",
-            hover_color="#263855"
+            hover_color="#263855",
+            command=self.stop_preview
         )
         stop_btn.pack(side="left", padx=(0, 14))
 
-        self.fake_progress = ctk.CTkSlider(
+        self.seek_slider = ctk.CTkSlider(
             controls,
             from_=0,
-            to=100,
-            number_of_steps=100,
+            to=1000,
+            number_of_steps=1000,
             progress_color="#8b5cf6",
             button_color="#a78bfa",
-            button_hover_color="#c4b5fd"
+            button_hover_color="#c4b5fd",
+            command=self.on_seek
         )
-        self.fake_progress.set(20)
-        self.fake_progress.pack(side="left", fill="x",
-                                expand=True, padx=(0, 14))
+        self.seek_slider.set(0)
+        self.seek_slider.pack(side="left", fill="x",
+                              expand=True, padx=(0, 14))
 
         self.time_label = ctk.CTkLabel(
             controls,
@@ -239,6 +786,7 @@ class VideoVolumeChangerApp(ctk.CTk):
             self.info_box, "▣ Resolution:", "-")
         self.size_label = self.info_row(self.info_box, "💾 Size:", "-")
         self.audio_label = self.info_row(self.info_box, "🔊 Audio:", "-")
+        self.loudness_label = self.info_row(self.info_box, "📈 Loudness:", "-")
 
     def info_row(self, parent, label_text, value_text):
         row = ctk.CTkFrame(parent, fg_color="transparent")
@@ -356,6 +904,43 @@ class VideoVolumeChangerApp(ctk.CTk):
             )
             btn.pack(side="left", expand=True, fill="x", padx=5)
 
+        self.auto_level_btn = ctk.CTkButton(
+            self.volume_box,
+            text=f"🎚 Auto Level ({TARGET_LUFS:g} LUFS)",
+            command=self.auto_level,
+            height=42,
+            fg_color="#15233a",
+            hover_color="#6d28d9",
+            border_width=1,
+            border_color="#7c3aed",
+            corner_radius=8,
+            font=("Segoe UI", 14, "bold")
+        )
+        self.auto_level_btn.pack(fill="x", padx=27, pady=(8, 4))
+
+    def create_waveform_section(self):
+        waveform_container = ctk.CTkFrame(
+            self.right_panel,
+            fg_color="#101c31",
+            border_width=1,
+            border_color="#263855",
+            corner_radius=12
+        )
+        waveform_container.pack(fill="x", pady=(0, 14))
+
+        self.waveform_canvas = tk.Canvas(
+            waveform_container,
+            height=WAVEFORM_HEIGHT,
+            bg="#101c31",
+            highlightthickness=0
+        )
+        self.waveform_canvas.pack(fill="x", padx=12, pady=8)
+        self.waveform_canvas.bind("<Configure>", lambda event: self.draw_waveform())
+
+        self.waveform_levels = None
+        self.waveform_message = "Waveform appears here"
+        self.waveform_playhead = None
+
     def create_output_section(self):
         output_container = ctk.CTkFrame(
             self.right_panel,
@@ -444,6 +1029,55 @@ class VideoVolumeChangerApp(ctk.CTk):
         )
         browse_folder_btn.pack(side="right")
 
+        profile_row = ctk.CTkFrame(output_container, fg_color="transparent")
+        profile_row.pack(fill="x", padx=22, pady=6)
+
+        ctk.CTkLabel(
+            profile_row,
+            text="Encoder:",
+            width=110,
+            anchor="w",
+            font=("Segoe UI", 14),
+            text_color="#dbe5f5"
+        ).pack(side="left")
+
+        self.profile_selector = ctk.CTkSegmentedButton(
+            profile_row,
+            values=[name.title() for name in ENCODE_PROFILES] + ["Auto"],
+            variable=self.encode_profile,
+            height=34,
+            font=("Segoe UI", 13),
+            fg_color="#15233a",
+            selected_color="#7c3aed",
+            selected_hover_color="#6d28d9",
+            unselected_color="#15233a",
+            unselected_hover_color="#263855",
+            text_color="white"
+        )
+        self.profile_selector.pack(side="left", padx=(10, 0))
+
+        self.copy_video_check = ctk.CTkCheckBox(
+            output_container,
+            text="⚡ Keep original video (only re-encode audio)",
+            variable=self.copy_video,
+            font=("Segoe UI", 14),
+            text_color="#dbe5f5",
+            fg_color="#7c3aed",
+            hover_color="#6d28d9"
+        )
+        self.copy_video_check.pack(anchor="w", padx=22, pady=(6, 0))
+
+        self.parallel_export_check = ctk.CTkCheckBox(
+            output_container,
+            text=f"🧩 Split long re-encodes across {EXPORT_SEGMENTS} cores",
+            variable=self.parallel_export,
+            font=("Segoe UI", 14),
+            text_color="#dbe5f5",
+            fg_color="#7c3aed",
+            hover_color="#6d28d9"
+        )
+        self.parallel_export_check.pack(anchor="w", padx=22, pady=(6, 0))
+
         self.export_btn = ctk.CTkButton(
             output_container,
             text="⬆  Export Video",
@@ -488,6 +1122,13 @@ class VideoVolumeChangerApp(ctk.CTk):
     def focus_volume(self):
         self.volume_slider.focus()
 
+    def open_batch(self):
+        if self.batch_window is not None and self.batch_window.winfo_exists():
+            self.batch_window.focus()
+            return
+
+        self.batch_window = BatchWindow(self)
+
     def show_about(self):
         messagebox.showinfo(
             "About",
@@ -525,55 +1166,317 @@ class VideoVolumeChangerApp(ctk.CTk):
         self.set_status("✅ Video loaded", "#6ee787")
 
     def load_video_info(self, path):
+        # What the file system knows is shown at once; the rest is filled
+        # in by video_info_ready() when the probe thread returns.
+        file_size_mb = os.path.getsize(path) / (1024 * 1024)
+        self.video_size = f"{file_size_mb:.1f} MB"
+
+        ext = os.path.splitext(path)[1].replace(".", "").upper()
+        self.video_format = ext
+
+        self.file_name_label.configure(text=os.path.basename(path))
+        self.format_label.configure(text=self.video_format)
+        self.size_label.configure(text=self.video_size)
+        for label in (self.duration_label, self.resolution_label,
+                      self.audio_label, self.loudness_label):
+            label.configure(text="…")
+
+        self.preview_label.configure(
+            text=f"Video Selected\n\n{os.path.basename(path)}\n\nReading video..."
+        )
+
+        thread = threading.Thread(
+            target=self.probe_video,
+            args=(path,),
+            daemon=True
+        )
+        thread.start()
+
+    def probe_video(self, path):
         try:
-            clip = VideoFileClip(path)
+            info = cached_probe(path)
+            self.after(0, self.video_info_ready, path, info)
+        except Exception as e:
+            self.after(0, self.video_info_failed, path, str(e))
+
+    def video_info_ready(self, path, info):
+        if path != self.video_path:
+            return
 
-            duration_seconds = int(clip.duration or 0)
-            self.video_duration = self.format_time(duration_seconds)
+        duration = info["duration"] or 0
+        self.video_duration = self.format_time(int(duration))
+        self.duration_label.configure(text=self.video_duration)
+        self.time_label.configure(text=f"00:00:00 / {self.video_duration}")
+
+        if info["width"]:
+            self.video_resolution = f"{info['width']} x {info['height']}"
+        else:
+            self.video_resolution = "-"
+        self.resolution_label.configure(text=self.video_resolution)
+
+        if info["audio_channels"]:
+            self.video_audio = "Audio detected"
+            self.loudness_label.configure(text="…")
+            self.load_waveform(path)
+        else:
+            self.video_audio = "No audio track"
+            self.loudness_label.configure(text="-")
+            self.waveform_levels = None
+            self.waveform_message = "No audio track"
+            self.draw_waveform()
+        self.audio_label.configure(text=self.video_audio)
+
+        if info["width"]:
+            self.preview_label.configure(
+                text=f"Video Selected\n\n{os.path.basename(path)}\n\nLoading preview..."
+            )
+            self.open_preview(path, (info["width"], info["height"]), duration)
 
-            width, height = clip.size
-            self.video_resolution = f"{width} x {height}"
+    def video_info_failed(self, path, error_message):
+        if path != self.video_path:
+            return
 
-            file_size_mb = os.path.getsize(path) / (1024 * 1024)
-            self.video_size = f"{file_size_mb:.1f} MB"
+        for label in (self.duration_label, self.resolution_label,
+                      self.audio_label, self.loudness_label):
+            label.configure(text="-")
+        self.set_status("❌ Could not read video", "#f87171")
+        messagebox.showerror("Error", f"Could not read video:\n{error_message}")
 
-            ext = os.path.splitext(path)[1].replace(".", "").upper()
-            self.video_format = ext
+    def load_waveform(self, path):
+        self.waveform_levels = None
+        self.waveform_message = "Analyzing audio..."
+        self.draw_waveform()
 
-            if clip.audio is None:
-                self.video_audio = "No audio track"
-            else:
-                self.video_audio = "Audio detected"
+        thread = threading.Thread(
+            target=self.measure_waveform,
+            args=(path,),
+            daemon=True
+        )
+        thread.start()
 
-            clip.close()
+    def measure_waveform(self, path):
+        try:
+            analysis, envelope = cached_audio(path)
+            levels = envelope_levels(envelope)
+            self.after(0, self.waveform_ready, path, analysis, levels)
+        except Exception as e:
+            self.after(0, self.waveform_failed, path, str(e))
+
+    def waveform_ready(self, path, analysis, levels):
+        if path != self.video_path:
+            return
 
-            self.file_name_label.configure(text=os.path.basename(path))
-            self.duration_label.configure(text=self.video_duration)
-            self.format_label.configure(text=self.video_format)
-            self.resolution_label.configure(text=self.video_resolution)
-            self.size_label.configure(text=self.video_size)
-            self.audio_label.configure(text=self.video_audio)
+        self.show_loudness(analysis)
+        self.waveform_levels = levels
+        self.draw_waveform()
 
-            self.time_label.configure(text=f"00:00:00 / {self.video_duration}")
+    def waveform_failed(self, path, error_message):
+        if path != self.video_path:
+            return
 
-            self.preview_label.configure(
-                text=f"Video Selected\n\n{os.path.basename(path)}\n\nPreview area"
+        self.waveform_message = f"Waveform unavailable: {error_message}"
+        self.draw_waveform()
+
+    def draw_waveform(self):
+        canvas = self.waveform_canvas
+        canvas.delete("all")
+        self.waveform_playhead = None
+
+        width = canvas.winfo_width()
+        height = WAVEFORM_HEIGHT
+        middle = height / 2
+        if self.waveform_levels is None or width < 2:
+            canvas.create_text(
+                width / 2, middle,
+                text=self.waveform_message,
+                fill="#b8c4d9",
+                font=("Segoe UI", 12)
             )
+            return
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not read video:\n{e}")
+        gain = self.volume_percent.get() / 100
+        mins, maxs = envelope_columns(self.waveform_levels, width)
+        mins, maxs = mins * gain, maxs * gain
+
+        # Columns the chosen gain would clip get a red band.
+        clipped = (maxs >= 1) | (mins <= -1)
+        for start, end in true_runs(clipped):
+            canvas.create_rectangle(start, 0, end, height, fill="#7f1d1d", width=0)
+
+        scale = middle - 2
+        x = np.arange(width)
+        tops = middle - np.clip(maxs, -1, 1) * scale
+        bottoms = middle - np.clip(mins, -1, 1) * scale
+        outline = np.concatenate([
+            np.stack([x, tops], axis=1),
+            np.stack([x, bottoms], axis=1)[::-1],
+        ])
+        canvas.create_polygon(outline.ravel().tolist(), fill="#8b5cf6", outline="")
+        canvas.create_line(0, middle, width, middle, fill="#334663")
+
+        self.move_waveform_playhead()
+
+    def move_waveform_playhead(self):
+        if self.player is None or self.waveform_levels is None:
+            return
+
+        canvas = self.waveform_canvas
+        x = canvas.winfo_width() * self.play_index / max(self.player.last_frame, 1)
+        if self.waveform_playhead is None:
+            self.waveform_playhead = canvas.create_line(
+                x, 0, x, WAVEFORM_HEIGHT, fill="white")
+        else:
+            canvas.coords(self.waveform_playhead, x, 0, x, WAVEFORM_HEIGHT)
+
+    def open_preview(self, path, size, duration):
+        if self.player is not None:
+            self.player.close()
+
+        self.player = PreviewDecoder(path, size, duration)
+        self.playing = False
+        self.play_index = 0
+        self.shown_index = None
+        self.play_btn.configure(text="▶")
+        self.seek_slider.set(0)
+
+    def refresh_preview(self):
+        self.after(1000 // PREVIEW_FPS, self.refresh_preview)
+
+        player = self.player
+        if player is None:
+            return
+
+        if self.playing:
+            if self.play_index >= player.last_frame:
+                self.playing = False
+                self.play_btn.configure(text="▶")
+            elif player.get(self.play_index + 1) is not None:
+                self.play_index += 1
+                player.seek(self.play_index)
+            # otherwise the decoder is behind: hold this frame and wait
+
+        if self.play_index == self.shown_index:
+            return
+
+        frame = player.get(self.play_index)
+        if frame is None:
+            return
+
+        self.preview_image = ctk.CTkImage(
+            light_image=frame, dark_image=frame, size=frame.size)
+        self.preview_label.configure(image=self.preview_image, text="")
+        self.shown_index = self.play_index
+
+        seconds = self.play_index / PREVIEW_FPS
+        self.time_label.configure(
+            text=f"{self.format_time(int(seconds))} / {self.video_duration}")
+        if self.playing and player.last_frame:
+            self.seek_slider.set(1000 * self.play_index / player.last_frame)
+        self.move_waveform_playhead()
+
+    def toggle_play(self):
+        if self.player is None:
+            return
+
+        if not self.playing and self.play_index >= self.player.last_frame:
+            self.play_index = 0
+            self.player.seek(0)
+
+        self.playing = not self.playing
+        self.play_btn.configure(text="⏸" if self.playing else "▶")
+
+    def stop_preview(self):
+        if self.player is None:
+            return
+
+        self.playing = False
+        self.play_btn.configure(text="▶")
+        self.play_index = 0
+        self.player.seek(0)
+        self.seek_slider.set(0)
+
+    def on_seek(self, value):
+        if self.player is None:
+            return
+
+        seconds = float(value) / 1000 * self.player.last_frame / PREVIEW_FPS
+        seconds = self.player.snap(seconds)
+        self.play_index = min(round(seconds * PREVIEW_FPS), self.player.last_frame)
+        self.player.seek(self.play_index)
+
+    def on_close(self):
+        if self.player is not None:
+            self.player.close()
+        self.destroy()
 
     def on_volume_change(self, value):
         value = int(float(value))
         self.volume_percent.set(value)
         self.big_volume_label.configure(text=f"{value}%")
         self.update_output_name()
+        self.draw_waveform()
+
+    def auto_level(self):
+        if not self.video_path:
+            messagebox.showerror("Error", "Please select a video first.")
+            return
+
+        self.auto_level_btn.configure(state="disabled")
+        self.set_status("🔄 Analyzing audio loudness...", "#93c5fd")
+
+        thread = threading.Thread(
+            target=self.analyze_audio,
+            args=(self.video_path,),
+            daemon=True
+        )
+        thread.start()
+
+    def analyze_audio(self, path):
+        try:
+            analysis = cached_loudness(path)
+            self.after(0, self.auto_level_done, path, analysis)
+        except Exception as e:
+            self.after(0, self.auto_level_failed, str(e))
+
+    def auto_level_done(self, path, analysis):
+        self.auto_level_btn.configure(state="normal")
+        if path != self.video_path:
+            return
+
+        self.show_loudness(analysis)
+        if analysis["lufs"] is None:
+            self.set_status("⚠ The audio track is silent", "#fbbf24")
+            return
+
+        gain = auto_gain_db(analysis)
+        self.set_volume(auto_volume_percent(analysis))
+        limited = gain < TARGET_LUFS - analysis["lufs"]
+        self.set_status(
+            f"✅ Auto level: {gain:+.1f} dB"
+            + (" (limited by peaks)" if limited else ""),
+            "#6ee787"
+        )
+
+    def auto_level_failed(self, error_message):
+        self.auto_level_btn.configure(state="normal")
+        self.set_status("❌ Loudness analysis failed", "#f87171")
+        messagebox.showerror("Auto Level", error_message)
+
+    def show_loudness(self, analysis):
+        if analysis["lufs"] is None:
+            self.loudness_label.configure(text="Silent")
+            return
+
+        self.loudness_label.configure(
+            text=f"{analysis['lufs']:.1f} LUFS · peak {analysis['peak_db']:.1f} dBFS"
+        )
 
     def set_volume(self, value):
         self.volume_slider.set(value)
         self.volume_percent.set(value)
         self.big_volume_label.configure(text=f"{value}%")
         self.update_output_name()
+        self.draw_waveform()
 
     def update_output_name(self):
         if not self.video_path:
@@ -637,48 +1540,50 @@ class VideoVolumeChangerApp(ctk.CTk):
         output_path = os.path.join(output_folder, output_file)
 
         self.export_btn.configure(state="disabled", text="Processing...")
-        self.progress.set(0.2)
+        self.progress.set(0)
         self.set_status("🔄 Processing video...", "#93c5fd")
 
         thread = threading.Thread(
             target=self.export_video,
-            args=(self.video_path, output_path, self.volume_percent.get()),
+            args=(self.video_path, output_path,
+                  self.volume_percent.get(), self.copy_video.get(),
+                  EXPORT_SEGMENTS if self.parallel_export.get() else 1,
+                  self.encode_profile.get().lower()),
             daemon=True
         )
         thread.start()
 
-    def export_video(self, input_path, output_path, volume_percent):
+    def export_video(self, input_path, output_path, volume_percent, copy_video=True,
+                     segments=1, profile=DEFAULT_PROFILE):
         try:
-            video = VideoFileClip(input_path)
-
-            if video.audio is None:
-                self.after(0, self.export_failed,
-                           "This video has no audio track.")
-                return
-
-            volume_factor = volume_percent / 100
-
-            new_audio = video.audio.with_volume_scaled(volume_factor)
-            final_video = video.with_audio(new_audio)
-
-            self.after(0, lambda: self.progress.set(0.5))
-
-            final_video.write_videofile(
-                output_path,
-                codec="libx264",
-                audio_codec="aac",
-                fps=video.fps,
-                logger=None
+            export_file(
+                input_path, output_path, volume_percent / 100, copy_video,
+                segments=segments,
+                profile=profile,
+                on_progress=lambda progress: self.after(0, self.show_export_progress, progress)
             )
 
-            video.close()
-            final_video.close()
-
             self.after(0, self.export_success, output_path)
 
         except Exception as e:
             self.after(0, self.export_failed, str(e))
 
+    def show_export_progress(self, progress):
+        if progress["percent"] is not None:
+            self.progress.set(progress["percent"] / 100)
+
+        stage = self.EXPORT_STAGES.get(progress["stage"], "Processing")
+        parts = [f"🔄 {stage}"]
+        if progress["percent"] is not None:
+            parts[0] += f" {progress['percent']:.0f}%"
+        if progress["fps"]:
+            parts.append(f"{progress['fps']:.0f} fps")
+        if progress["mb_per_s"]:
+            parts.append(f"{progress['mb_per_s']:.1f} MB/s")
+        if progress["eta"] is not None:
+            parts.append(f"ETA {self.format_time(int(progress['eta']))}")
+        self.set_status("  ·  ".join(parts), "#93c5fd")
+
     def export_success(self, output_path):
         self.progress.set(1)
         self.export_btn.configure(state="normal", text="⬆  Export Video")
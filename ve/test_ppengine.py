@@ -0,0 +1,300 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import ppengine
+
+
+def test_batch_job_cleans_up_when_volume_analysis_fails(tmp_path, monkeypatch):
+    output = str(tmp_path / "out.mp4")
+    open(output + ".cancel", "w").close()
+
+    def broken(*args):
+        raise ValueError("Could not read media")
+
+    monkeypatch.setattr(ppengine, "resolve_volume", broken)
+    with pytest.raises(ValueError):
+        ppengine.run_batch_job(str(tmp_path / "in.mp4"), output, "auto", True)
+    assert not os.path.exists(output + ".cancel")
+
+
+def test_calibration_keeps_only_finished_timings(tmp_path, monkeypatch):
+    info = {"duration": 60.0, "width": 1280, "height": 720, "fps": 30.0}
+    monkeypatch.setattr(ppengine, "cached_probe", lambda path: info)
+    monkeypatch.setattr(ppengine, "CALIBRATION_FILE", str(tmp_path / "calibration.json"))
+    monkeypatch.setattr(ppengine.os, "cpu_count", lambda: 1)
+
+    calls = []
+
+    def flaky(path, start, length, preset, threads, should_cancel=None):
+        calls.append(preset)
+        return None if len(calls) == 1 else 120.0
+
+    monkeypatch.setattr(ppengine, "time_encode", flaky)
+    ppengine.calibrate("in.mp4")
+    stored = ppengine.read_cached_json(ppengine.CALIBRATION_FILE)
+    timings = stored[ppengine.calibration_key(info)]
+    assert "veryfast|1" not in timings
+    assert None not in timings.values()
+
+    # The failed preset is measured again; the others come from the cache.
+    calls.clear()
+    ppengine.calibrate("in.mp4")
+    assert calls == ["veryfast"]
+
+
+def ffmpeg(*args):
+    return subprocess.run([ppengine.FFMPEG_BINARY, "-hide_banner", *args],
+                          capture_output=True, text=True, errors="replace")
+
+
+def count_frames(path):
+    result = ffmpeg("-i", path, "-map", "0:v:0", "-f", "null", "-")
+    return int(re.findall(r"frame=\s*(\d+)", result.stderr)[-1])
+
+
+@pytest.fixture
+def clip(tmp_path, monkeypatch):
+    """24 s of 25 fps test video with a keyframe every 2 s, plus a tone."""
+    monkeypatch.setattr(ppengine, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(ppengine, "TELEMETRY_LOG", str(tmp_path / "exports.jsonl"))
+    path = str(tmp_path / "clip.mp4")
+    try:
+        result = ffmpeg("-f", "lavfi", "-i", "testsrc=size=320x240:rate=25:duration=24",
+                        "-f", "lavfi", "-i", "sine=frequency=440:duration=24",
+                        "-c:v", "libx264", "-preset", "ultrafast", "-g", "50",
+                        "-c:a", "aac", "-shortest", path)
+    except OSError:
+        pytest.skip("ffmpeg is not available")
+    if result.returncode:
+        pytest.skip("ffmpeg cannot encode the test clip")
+    return path
+
+
+def test_segment_bounds_snap_to_keyframes():
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0, 12.0, 14.0, 16.0, 18.0, 20.0, 22.0]
+    assert ppengine.segment_bounds(keyframes, 24.0, 2) == [0.0, 12.0, 24.0]
+    assert ppengine.segment_bounds(keyframes, 24.0, 4) == [0.0, 12.0, 24.0]
+    assert ppengine.segment_bounds(keyframes, 9.0, 4) == [0.0, 9.0]
+
+
+def test_segmented_export_keeps_every_frame(clip, tmp_path):
+    output = str(tmp_path / "out.mp4")
+    settings = ppengine.ENCODE_PROFILES["speed"]
+    assert ppengine.export_segmented(clip, output, 0.5, 2, settings)
+    assert count_frames(output) == count_frames(clip) == 600
+    assert ppengine.probe_media(output)["audio_codec"] == "aac"
+
+
+def stream_crcs(path, stream):
+    """Per-packet size and CRC of one stream, copied without decoding."""
+    result = ffmpeg("-i", path, "-map", f"0:{stream}:0", "-c", "copy", "-f", "framecrc", "-")
+    return [line.split(",")[-2:] for line in result.stdout.splitlines()
+            if line and not line.startswith("#")]
+
+
+def test_audio_only_export_copies_the_video(clip, tmp_path):
+    output = str(tmp_path / "out.mp4")
+    assert ppengine.export_audio_only(clip, output, 0.5)
+
+    video = stream_crcs(clip, "v")
+    assert len(video) == 600 and stream_crcs(output, "v") == video
+    before, _ = ppengine.measure_audio(clip)
+    after, _ = ppengine.measure_audio(output)
+    assert after["rms_db"] == pytest.approx(before["rms_db"] - 6.02, abs=0.3)
+
+
+def test_audio_only_export_reports_a_refused_remux(clip, tmp_path):
+    output = str(tmp_path / "missing" / "out.mp4")
+    assert ppengine.export_audio_only(clip, output, 0.5) is False
+    assert not os.path.exists(output)
+
+
+def test_audio_only_export_skips_codecs_mp4_cannot_hold(tmp_path, monkeypatch):
+    monkeypatch.setattr(ppengine, "probe_streams", lambda path: ("mjpeg", 2))
+    monkeypatch.setattr(ppengine, "run_ffmpeg", lambda *args: pytest.fail("ffmpeg was run"))
+    assert ppengine.export_audio_only("in.avi", str(tmp_path / "out.mp4"), 0.5) is False
+
+
+def tone(tmp_path, name, source):
+    path = str(tmp_path / name)
+    try:
+        result = ffmpeg("-f", "lavfi", "-i", source, "-c:a", "pcm_s16le", path)
+    except OSError:
+        pytest.skip("ffmpeg is not available")
+    if result.returncode:
+        pytest.skip("ffmpeg cannot write the test tone")
+    return path
+
+
+def test_sine_loudness_matches_ebur128(tmp_path, monkeypatch):
+    monkeypatch.setattr(ppengine, "CACHE_DIR", str(tmp_path / "cache"))
+    # A full-scale 997 Hz sine in one channel is -3.01 LUFS; this one is
+    # 1/8 of full scale (-18.06 dB) and turned down a further 17 dB.
+    path = tone(tmp_path, "sine.wav", "sine=frequency=997:duration=10,volume=-17dB")
+    analysis, envelope = ppengine.measure_audio(path)
+    assert analysis["lufs"] == pytest.approx(-38.06, abs=0.05)
+    assert analysis["duration"] == pytest.approx(10.0, abs=0.01)
+    assert len(envelope) == 10 * ppengine.LOUDNESS_RATE // ppengine.WAVEFORM_BIN
+
+    report = ffmpeg("-i", path, "-af", "ebur128", "-f", "null", "-").stderr
+    reference = float(re.findall(r"I:\s+(-?[\d.]+) LUFS", report)[-1])
+    assert analysis["lufs"] == pytest.approx(reference, abs=0.1)
+
+
+def test_silence_is_gated_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(ppengine, "CACHE_DIR", str(tmp_path / "cache"))
+    with np.errstate(all="raise"):
+        assert ppengine.gated_loudness(np.zeros(50)) is None
+        assert ppengine.gated_loudness(np.zeros(0)) is None
+        # 4 s at -20 LUFS then 4 s at -60.7: the quiet blocks are above the
+        # absolute gate but fall to the relative one. Only the three 400 ms
+        # blocks straddling the change (3/4, 1/2 and 1/4 loud) pull it down.
+        loud = np.full(40, 10 ** ((-20 + 0.691) / 10))
+        assert ppengine.gated_loudness(np.concatenate([loud, np.full(40, 1e-6)])) == -20.17
+
+        path = tone(tmp_path, "silence.wav", "anullsrc=r=48000:cl=mono:d=3")
+        analysis, _ = ppengine.measure_audio(path)
+    assert analysis["lufs"] is None and analysis["peak_db"] is None
+    assert ppengine.auto_gain_db(analysis) == 0.0
+    assert ppengine.auto_volume_percent(analysis) == 100
+
+
+def test_auto_gain_stops_at_the_peak_ceiling():
+    # reaches the target when the peaks allow it
+    assert ppengine.auto_gain_db({"lufs": -22.0, "peak_db": -12.0}) == 6.0
+    # otherwise stops with the peak at PEAK_CEILING_DB
+    assert ppengine.auto_gain_db({"lufs": -30.0, "peak_db": -3.0}) == 2.0
+    # loud input is turned down to the target
+    assert ppengine.auto_gain_db({"lufs": -8.0, "peak_db": -0.1}) == -8.0
+    assert ppengine.auto_gain_db({"lufs": -20.0, "peak_db": None}, target=-23.0) == -3.0
+    # very quiet input is capped at MAX_VOLUME
+    assert ppengine.auto_volume_percent({"lufs": -70.0, "peak_db": -60.0}) == ppengine.MAX_VOLUME
+
+
+def test_probe_cache_follows_size_and_mtime(clip, monkeypatch):
+    probes = []
+    real_probe = ppengine.probe_media
+    monkeypatch.setattr(ppengine, "probe_media",
+                        lambda path: probes.append(path) or real_probe(path))
+
+    first = ppengine.cached_probe(clip)
+    assert ppengine.cached_probe(clip) == first
+    assert len(probes) == 1
+    assert first["video_codec"] == "h264" and first["audio_channels"] == 1
+
+    st = os.stat(clip)
+    os.utime(clip, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    ppengine.cached_probe(clip)
+    assert len(probes) == 2
+
+    with open(clip, "ab") as f:
+        f.write(b"\0" * 16)
+    os.utime(clip, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    ppengine.cached_probe(clip)
+    assert len(probes) == 3
+    ppengine.cached_probe(clip)
+    assert len(probes) == 3
+
+
+def json_lines(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_cli_prints_one_json_object_per_line(clip, tmp_path, capsys):
+    missing = str(tmp_path / "missing.mp4")
+    template = os.path.join(str(tmp_path), "out", "{stem}_{volume}.mp4")
+    code = ppengine.main([clip, missing, "--volume", "50", "--output", template])
+
+    events = json_lines(capsys.readouterr().out)
+    assert code == 1
+    by_kind = {}
+    for event in events:
+        by_kind.setdefault(event["event"], []).append(event)
+
+    assert by_kind["start"][0]["output"] == os.path.join(str(tmp_path), "out", "clip_50.mp4")
+    assert by_kind["done"][0]["bytes"] == os.path.getsize(by_kind["done"][0]["output"])
+    assert by_kind["progress"][-1]["percent"] == 100.0
+    assert [e["input"] for e in by_kind["error"]] == [missing]
+    assert events[-1] == {"event": "summary", "files": 2, "done": 1, "failed": 1,
+                          "seconds": events[-1]["seconds"]}
+
+
+PROGRESS = """\
+frame=0
+out_time_us=N/A
+total_size=N/A
+progress=continue
+frame=50
+out_time_us=2000000
+total_size=40960
+progress=continue
+frame=100
+out_time_us=4000000
+total_size=81920
+progress=end
+frame=101
+out_time_us=4040000
+"""
+
+
+def test_progress_blocks_are_parsed_whole(tmp_path):
+    script = tmp_path / "fake_ffmpeg.py"
+    script.write_text(f"import sys\nsys.stdout.write({PROGRESS!r})\n")
+    blocks = []
+    code, errors = ppengine.run_ffmpeg([sys.executable, str(script)], None,
+                                       on_block=lambda block: blocks.append(dict(block)))
+
+    assert code == 0 and errors == ""
+    # the unterminated block after progress=end is never reported
+    assert [b["progress"] for b in blocks] == ["continue", "continue", "end"]
+    assert [ppengine.block_counters(b) for b in blocks] == [
+        None, (2.0, 50, 40960), (4.0, 100, 81920)]
+
+
+def test_meter_reports_progress_and_eta(monkeypatch):
+    clock = iter([0.0, 0.0, 1.0, 1.2, 4.0])
+    monkeypatch.setattr(ppengine.time, "perf_counter", lambda: next(clock))
+    events = []
+    meter = ppengine.ProgressMeter(10.0, events.append, frame_rate=25,
+                                   input_bytes=10 * 1024 * 1024, interval=0.5)
+    meter.start_stage("copy")
+    meter.update(2.5)
+    meter.update(3.0)  # 0.2 s later, inside the interval: dropped
+    meter.update(10.0, bytes_out=1024, final=True)
+
+    assert len(events) == 2
+    first, last = events
+    assert first["stage"] == "copy" and first["percent"] == 25.0
+    assert first["frame"] == 62  # no frame counter: worked out from the time
+    assert first["speed"] == 2.5 and first["eta"] == 3.0
+    assert first["mb_per_s"] == 2.5
+    assert last["percent"] == 100.0 and last["eta"] == 0.0
+    assert last["frame"] == 250 and last["bytes_out"] == 1024
+
+
+def test_segments_use_calibrated_threads(clip, tmp_path, monkeypatch):
+    commands = []
+
+    def fake_ffmpeg(command, output_path, should_cancel=None, on_block=None):
+        commands.append(command)
+        return 0, ""
+
+    monkeypatch.setattr(ppengine, "run_ffmpeg", fake_ffmpeg)
+    settings = {"preset": "veryfast", "crf": 23, "threads": 3}
+    with pytest.raises(RuntimeError):  # the faked parts cannot be joined
+        ppengine.export_segmented(clip, str(tmp_path / "out.mp4"), 0.5, 2, settings)
+    video = [c for c in commands if "-threads" in c]
+    assert len(video) == 2
+    assert all(c[c.index("-threads") + 1] == "3" for c in video)
+
+
+def test_failed_segment_reports_ffmpeg_errors(clip, tmp_path):
+    settings = {"preset": "no-such-preset", "crf": 23}
+    with pytest.raises(RuntimeError, match=r"could not encode part\d+\.mp4: .*no-such-preset"):
+        ppengine.export_segmented(clip, str(tmp_path / "out.mp4"), 0.5, 2, settings)